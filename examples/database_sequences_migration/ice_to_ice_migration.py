@@ -0,0 +1,27 @@
+import icebreaker
+from icebreaker import IceMigration
+
+# MIGRATE ALL "SHARED" FOLDERS FROM ONE ICE INSTANCE TO ANOTHER.
+# If the script is interrupted, run it again: the journal file records what
+# has already been migrated, and the migration resumes from there.
+
+source = icebreaker.IceClient("../api_tokens/admin.yaml")
+destination = icebreaker.IceClient("../api_tokens/local_update.yaml")
+migration = IceMigration(
+    source,
+    destination,
+    journal="migration_journal.sqlite",
+    max_workers=8,
+    copy_samples=False,
+)
+report = migration.migrate_collection("SHARED")
+print(
+    "%d entries migrated (%.1f entries/s), %d failed."
+    % (
+        report["entries_migrated"],
+        report["entries_per_second"],
+        report["entries_failed"],
+    )
+)
+for source_id, error in report["errors"]:
+    print("Entry", source_id, error)
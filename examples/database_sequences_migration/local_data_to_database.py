@@ -49,6 +49,6 @@ for folder in collection_folders:
             )
         parts_ids.append(part_infos["id"])
         new_ice.attach_record_to_part(
-            ice_part_id=part_infos["id"], record_text=record_text
+            ice_record_id=part_infos["recordId"], record_text=record_text
         )
-        new_ice.add_to_folder(parts_ids, folders_ids=[folder_id])
+    new_ice.add_to_folder(parts_ids, folders_ids=[folder_id])
@@ -1,21 +1,119 @@
+import copy
 import json
+import threading
+import time
 import yaml
 from io import StringIO
+from types import MappingProxyType
+from itertools import islice, count as count_from
 
 import requests
 import requests_cache
 import proglog
+import pandas
 
 from Bio import SeqIO
 
 
-from .tools import did_you_mean, ice_genbank_to_record, sanitize_well_name
+from .tools import (
+    did_you_mean,
+    ice_genbank_to_record,
+    sanitize_well_name,
+    json_loads,
+    iter_json_items,
+    iter_parallel,
+    iter_parallel_processes,
+    ice_genbank_pair_to_record,
+)
+from .tables import format_entries
+from .pagination import PaginationCursor, PaginatedIterator
+from .record_hashes import record_content_hash
+from .link_graph import PartLinkGraph
+from .folder_catalog import FolderCatalog, FolderMembershipIndex
+
+
+def _is_empty(value):
+    """Return True for None and NaN values (e.g. empty DataFrame cells)."""
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _none_if_empty(value):
+    return None if _is_empty(value) else value
+
+
+class _ResponseItems:
+    """Iterator over the items of a streamed JSON response.
+
+    The ``releases`` functions (which return the request's HTTP session to
+    the pool) are called once, when the items are exhausted, when the iterator is closed or garbage-collected, or
+    with ``error=True`` if the body could not be read.
+    """
+
+    def __init__(self, response, items_path, fields, releases=()):
+        self.response = response
+        self.releases = list(releases)
+        if getattr(response, "from_cache", False):
+            source = response.content
+        else:
+            response.raw.decode_content = True
+            source = response.raw
+        self.items = iter_json_items(source, items_path, fields=fields)
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self.items)
+        except StopIteration:
+            self.close()
+            raise
+        except Exception:
+            self.close(error=True)
+            raise
+
+    def close(self, error=False):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.response.close()
+        finally:
+            for release in reversed(self.releases):
+                release(error=error)
+
+    def __del__(self):
+        self.close()
 
 
 class IceClient:
-    """Session to easily interact with an ICE instance."""
+    """Session to easily interact with an ICE instance.
+
+    The client is thread-safe and can be shared by the threads of a server:
+    each request uses an HTTP session checked out from the client's pool of
+    sessions (which share the client's cache), and the authentication state
+    is immutable, replaced as a whole when the token or session ID changes.
+    See also ``IceClientPool``.
+
+    At most ``max_idle_sessions`` sessions are kept open between requests.
+    Use ``close()`` (or the client as a context manager) to close them.
+    """
 
-    def __init__(self, config, cache=None, logger="bar", verbose=False):
+    max_idle_sessions = 16
+
+    def __init__(
+        self,
+        config,
+        cache=None,
+        logger="bar",
+        verbose=False,
+        record_hashes=None,
+        folders_ttl=300,
+        rate_limiter=None,
+        concurrency_limiter=None,
+        scheduler=None,
+    ):
         """Initializes an instance and a connection to an ICE instance.
         
         Examples
@@ -51,23 +149,62 @@ class IceClient:
         logger
           Either None for no logging, 'bar' for progress bar logging (useful
           in notebooks), or a custom Proglog logging object.
+
+        record_hashes
+          Optional store of the content hashes of the records attached to
+          parts, e.g. ``record_hashes.LocalRecordHashStore("hashes.sqlite")``
+          or ``record_hashes.CustomFieldRecordHashStore(...)``. It is updated
+          at every record upload, and allows to skip the upload of unchanged
+          records (see ``attach_record_to_part``).
+
+        folders_ttl
+          Time in seconds during which the folders of the PERSONAL and
+          SHARED collections are cached by ``self.folder_catalog`` (used for
+          folder name and type lookups), before being fetched again.
+
+        rate_limiter
+          Optional ``rate_limiting.RateLimiter`` limiting the rate of the
+          requests sent to ICE, e.g. ``RateLimiter(rate=20)``. It is shared
+          by all threads using the client (and possibly other processes).
+
+        concurrency_limiter
+          Optional ``concurrency.AdaptiveConcurrencyLimiter`` adapting the
+          number of concurrent requests to the latency and errors of ICE.
+
+        scheduler
+          Optional ``scheduling.RequestScheduler`` sending the interactive
+          requests before the bulk requests (made in parallel by bulk
+          methods) when the client is shared.
         """
         if isinstance(config, str):
             with open(config, "r") as f:
                 config = next(yaml.load_all(f.read()))
         self.verbose = verbose
+        self.record_hashes = record_hashes
+        self.folder_catalog = FolderCatalog(self, ttl=folders_ttl)
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.scheduler = scheduler
         self.root = config["root"].strip("/")
         self.logger = proglog.default_bar_logger(logger)
         self.logger.ignore_bars_under = 2
+        self.cache = None
         if cache is not None:
-            self.session = requests_cache.CachedSession(backend=cache)
-        else:
-            self.session = requests.Session()
-        self.session.headers = headers = {}
+            session = requests_cache.CachedSession(backend=cache)
+            self.cache = session.cache
+            self._close_session(session)
+        self._idle_sessions = []
+        self._session = None
+        self._sessions_lock = threading.Lock()
+        self.metrics_lock = threading.Lock()
+        self.requests_metrics = dict(requests=0, errors=0, time=0.0)
+        self.auth_headers = MappingProxyType({})
         self.session_infos = {}
         if "session_id" in config:
-            headers["X-ICE-Authentication-SessionId"] = config["session_id"]
-            self.session_infos.update(config.get("session_infos", {}))
+            self.auth_headers = MappingProxyType(
+                {"X-ICE-Authentication-SessionId": config["session_id"]}
+            )
+            self.session_infos = dict(config.get("session_infos", {}))
         if "client" in config:
             self.set_api_token(config["client"], config["token"])
         elif "password" in config:
@@ -83,9 +220,91 @@ class IceClient:
         """
         return self.request("GET", "config/site")["version"]
 
-    def get_plates_list(self, limit=100000):
-        """Return a list of plates in the database."""
-        return self.request("GET", "samples/locations?limit=%d" % limit)
+    def get_plates_list(self, limit=100000, as_iterator=False, fields=None):
+        """Return a list of plates in the database.
+
+        All plates are requested at once. For instances with many plates,
+        prefer the paginated ``get_plates``.
+
+        Parameters
+        ----------
+
+        limit
+          Maximal number of plates to return.
+
+        as_iterator
+          If True, an iterator is returned, which yields the plates as they
+          are decoded from the (streamed) ICE response.
+
+        fields
+          If provided, only these fields of each plate are kept.
+        """
+        plates = self.request(
+            "GET",
+            "samples/locations",
+            params=dict(limit=limit),
+            response_type="json_items",
+            fields=fields,
+        )
+        return plates if as_iterator else list(plates)
+
+    def get_plates(
+        self,
+        as_iterator=False,
+        limit=None,
+        batch_size=100,
+        output="dicts",
+        fields=None,
+        max_workers=1,
+    ):
+        """Return a list or iterator over the plates in the database.
+
+        Contrary to ``get_plates_list``, the plates are fetched page by page
+        (in parallel if ``max_workers`` is above 1), which is faster and
+        lighter on ICE for instances with many plates.
+
+        Parameters
+        ----------
+
+        as_iterator
+          If true, an iterator is returned instead of a list.
+
+        limit
+          If provided, only the nth first plates are considered.
+
+        batch_size
+          How many plates should be pulled from ICE at the same time.
+
+        output, fields
+          See ``get_folder_entries``.
+
+        max_workers
+          Number of pages fetched concurrently from ICE.
+        """
+
+        def fetch_page(offset):
+            return self.request(
+                "GET",
+                "samples/locations",
+                params=dict(offset=offset, limit=batch_size),
+                response_type="json_items",
+                fields=fields,
+            )
+
+        iterator = self._iter_pages(
+            fetch_page,
+            batch_size,
+            count=limit,
+            stop_at_short_page=True,
+            max_workers=max_workers,
+        )
+        return self._format_entries_output(
+            iterator,
+            limit=limit,
+            as_iterator=as_iterator,
+            output=output,
+            fields=fields,
+        )
 
     def request_site_infos(self):
         return self.request("GET", "site")
@@ -102,10 +321,9 @@ class IceClient:
 
         >>> ice_client.set_api_token('icebot', 'werouh4E4boubSFSDF=')
         """
-        self.session.headers.update(
+        self.auth_headers = MappingProxyType(
             {"X-ICE-API-Token-Client": client, "X-ICE-API-Token": token}
         )
-        self.session.headers.pop("X-ICE-Authentication-SessionId", None)
         self.session_infos = {"api_token": token, "api_client": client}
 
     def get_new_session_id(self, email, password):
@@ -117,11 +335,109 @@ class IceClient:
         data = dict(email=email, password=password)
         response = self.request("POST", "accesstokens", data=data)
         session_id = response["sessionId"]
-        self.session.headers["X-ICE-Authentication-SessionId"] = session_id
-        self.session.headers.pop("X-ICE-API-Token-Client", None)
-        self.session.headers.pop("X-ICE-API-Token", None)
+        self.auth_headers = MappingProxyType(
+            {"X-ICE-Authentication-SessionId": session_id}
+        )
         self.session_infos = response
 
+    def _new_session(self):
+        if self.cache is not None:
+            session = requests_cache.CachedSession(backend=self.cache)
+        else:
+            session = requests.Session()
+        session.headers = {}
+        return session
+
+    def _checkout_session(self):
+        """Return an idle HTTP session of the pool, or a new session."""
+        with self._sessions_lock:
+            if len(self._idle_sessions):
+                return self._idle_sessions.pop()
+        return self._new_session()
+
+    def _return_session(self, session):
+        """Put a session back in the pool (or close it if the pool is full)."""
+        with self._sessions_lock:
+            if len(self._idle_sessions) < self.max_idle_sessions:
+                self._idle_sessions.append(session)
+                return
+        self._close_session(session)
+
+    @staticmethod
+    def _close_session(session):
+        """Close the connections of a session, but not the shared cache."""
+        if isinstance(session, requests_cache.CachedSession):
+            requests.Session.close(session)
+        else:
+            session.close()
+
+    @property
+    def session(self):
+        """HTTP session with the client's authentication headers.
+
+        This session is kept for the scripts sending their own requests to
+        ICE (e.g. ``ice.session.get(url)``). It is not used by the client's
+        methods, which use a pool of sessions (see ``request``), and it is
+        closed by ``close()``.
+        """
+        with self._sessions_lock:
+            if self._session is None:
+                self._session = self._new_session()
+            session = self._session
+        for header in list(session.headers):
+            if header.startswith("X-ICE-"):
+                session.headers.pop(header)
+        session.headers.update(self.auth_headers)
+        return session
+
+    def close(self):
+        """Close the idle HTTP sessions of the client.
+
+        The client can still be used afterwards (new sessions are opened).
+        """
+        with self._sessions_lock:
+            sessions, self._idle_sessions = self._idle_sessions, []
+            if self._session is not None:
+                sessions.append(self._session)
+                self._session = None
+        for session in sessions:
+            self._close_session(session)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def copy(self):
+        """Return a new client, created without any request to ICE.
+
+        The new client shares this client's authentication, cache, limiters,
+        scheduler and metrics, but has its own pool of HTTP sessions. Later
+        authentication changes (``set_api_token``...) on one of the clients
+        don't affect the other.
+        """
+        new_client = copy.copy(self)
+        new_client._idle_sessions = []
+        new_client._session = None
+        new_client._sessions_lock = threading.Lock()
+        return new_client
+
+    def get_metrics(self):
+        """Return the requests statistics of the client and its limiters.
+
+        The result has keys "requests" (number of requests, errors and
+        total time in seconds) and, if the client has them, "rate_limiter",
+        "concurrency_limiter" and "scheduler".
+        """
+        with self.metrics_lock:
+            metrics = dict(requests=dict(self.requests_metrics))
+        for name in ["rate_limiter", "concurrency_limiter", "scheduler"]:
+            component = getattr(self, name)
+            if component is not None:
+                metrics[name] = component.get_metrics()
+        return metrics
+
     def request(
         self,
         method,
@@ -130,6 +446,8 @@ class IceClient:
         data=None,
         files=None,
         response_type="json",
+        items_path="",
+        fields=None,
     ):
         """Make a request to the ICE server.
 
@@ -167,29 +485,58 @@ class IceClient:
         
         response_type
           Use "json" if you expect JSON to be returned, or "file" if
-          you are expecting a file.
-
+          you are expecting a file. Use "json_items" to stream the response
+          and get an iterator over the items of a JSON array, decoded
+          incrementally (when ijson is installed).
+
+        items_path
+          For ``response_type="json_items"``, dot-separated path to the
+          array in the JSON response, e.g. "entries". Use "" (default) for
+          responses which are a JSON array.
+
+        fields
+          For ``response_type="json_items"``, only these fields of each item
+          are kept (all fields are kept if None).
         """
 
         url = self._endpoint_to_url(endpoint)
-        if files is None:
-            headers = {
-                "Accept": "application/json",
-                "Content-Type": "application/json;charset=UTF-8",
-            }
-            headers.update(self.session.headers)
-
-            response = self.session.request(
-                method,
-                url,
-                params=params,
-                headers=headers,
-                data=json.dumps(data),
+        # A streamed body is read as the caller iterates over the items, and
+        # the caller may make other requests meanwhile. So the body is only
+        # streamed if no concurrency or scheduling slot would be held during
+        # that time.
+        stream = (
+            (response_type == "json_items")
+            and (self.concurrency_limiter is None)
+            and (self.scheduler is None)
+        )
+        start_time = time.time()
+        releases = []
+        if self.scheduler is not None:
+            request_class = self.scheduler.acquire()
+            scheduled_time = time.time()
+        try:
+            response = self._limited_request(
+                method, endpoint, url, params, data, files, stream, releases
             )
+        except BaseException:
+            for release in reversed(releases):
+                release(error=True)
+            raise
+        finally:
+            if self.scheduler is not None:
+                latency = time.time() - scheduled_time
+                self.scheduler.release(request_class, latency=latency)
+        if stream and (response.status_code == 200):
+            # The session is returned once the response body has been read.
+            items = _ResponseItems(response, items_path, fields, releases)
         else:
-            response = self.session.request(
-                method, url, data=data, files=files
-            )
+            for release in reversed(releases):
+                release()
+        with self.metrics_lock:
+            metrics = self.requests_metrics
+            metrics["requests"] += 1
+            metrics["errors"] += response.status_code != 200
+            metrics["time"] += time.time() - start_time
         if self.verbose:
             print(
                 method,
@@ -199,7 +546,13 @@ class IceClient:
             )
         if response.status_code == 200:
             if response_type == "json":
-                return response.json()
+                return json_loads(response.content)
+            if response_type == "json_items":
+                if stream:
+                    return items
+                return iter_json_items(
+                    response.content, items_path, fields=fields
+                )
             if response_type == "file":
                 return response.content
             if response_type == "raw":
@@ -218,6 +571,179 @@ class IceClient:
                 )
             )
 
+    def _limited_request(
+        self, method, endpoint, url, params, data, files, stream, releases
+    ):
+        """Send a request within the rate and concurrency limits.
+
+        The concurrency slot is released when the response is received, so
+        the response must not be streamed when there is a concurrency
+        limiter. See ``_send_request`` for ``releases``.
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(method, endpoint, files=files)
+        limiter = self.concurrency_limiter
+        if limiter is None:
+            return self._send_request(
+                method, url, params, data, files, stream, releases
+            )
+        limiter.acquire()
+        start_time = time.time()
+        try:
+            response = self._send_request(
+                method, url, params, data, files, stream, releases
+            )
+        except Exception:
+            limiter.release(time.time() - start_time, error=True)
+            raise
+        error = (response.status_code >= 500) or (response.status_code == 429)
+        limiter.release(time.time() - start_time, error=error)
+        return response
+
+    def _send_request(
+        self, method, url, params, data, files, stream, releases
+    ):
+        """Send a request with a session of the pool.
+
+        The session is returned to the pool at once, or, for streamed
+        responses, by a function appended to ``releases``.
+        """
+        if files is not None:
+            kwargs = dict(data=data, files=files)
+            headers = dict(self.auth_headers)
+        else:
+            kwargs = dict(params=params, data=json.dumps(data), stream=stream)
+            headers = {
+                "Accept": "application/json",
+                "Content-Type": "application/json;charset=UTF-8",
+            }
+            headers.update(self.auth_headers)
+        session = self._checkout_session()
+        try:
+            response = session.request(method, url, headers=headers, **kwargs)
+        except BaseException:
+            self._return_session(session)
+            raise
+        if stream:
+            releases.append(lambda error=False: self._return_session(session))
+        else:
+            self._return_session(session)
+        return response
+
+    def _iter_pages(
+        self,
+        fetch_page,
+        batch_size,
+        count=None,
+        stop_at_short_page=None,
+        max_workers=1,
+        start=0,
+    ):
+        """Yield the items of successive pages of a paginated ICE listing.
+
+        Parameters
+        ----------
+
+        fetch_page
+          Function ``fetch_page(offset)`` returning an iterable over the
+          items of the page starting at that offset.
+
+        batch_size
+          Number of items per page.
+
+        count
+          Total (or maximal) number of items, if known. If None, pages are
+          fetched until a page has less than ``batch_size`` items.
+
+        stop_at_short_page
+          If True, the iteration stops at the first page with less than
+          ``batch_size`` items. Defaults to True when ``count`` is None.
+
+        max_workers
+          If above 1, that many pages are fetched concurrently (ahead of the
+          consumer). Items are still yielded in order.
+
+        start
+          Offset of the first item to yield.
+        """
+        if stop_at_short_page is None:
+            stop_at_short_page = count is None
+        if count is None:
+            offsets = count_from(start, batch_size)
+        else:
+            offsets = range(start, count, batch_size)
+        offsets = self.logger.iter_bar(batch=offsets)
+        if max_workers > 1:
+            pages = iter_parallel(
+                lambda offset: list(fetch_page(offset)),
+                offsets,
+                max_workers=max_workers,
+            )
+        else:
+            pages = (fetch_page(offset) for offset in offsets)
+        try:
+            for page in pages:
+                n_items = 0
+                for item in page:
+                    n_items += 1
+                    yield item
+                if stop_at_short_page and (n_items < batch_size):
+                    return
+        finally:
+            pages.close()
+
+    @staticmethod
+    def _get_cursor(cursor, method, parameters, batch_size):
+        """Return a new cursor, or check that a cursor fits the query.
+
+        ``cursor`` can be None (new iteration), a PaginationCursor, or its
+        dict or JSON representation.
+        """
+        parameters = json.loads(json.dumps(parameters))
+        if cursor is None:
+            return PaginationCursor(method, parameters, batch_size=batch_size)
+        if isinstance(cursor, str):
+            cursor = PaginationCursor.from_json(cursor)
+        elif isinstance(cursor, dict):
+            cursor = PaginationCursor.from_dict(cursor)
+        if (cursor.method, cursor.parameters) != (method, parameters):
+            raise ValueError(
+                "Cursor %s cannot be used for %s with parameters %s"
+                % (cursor, method, parameters)
+            )
+        return cursor
+
+    def _format_entries_output(
+        self,
+        iterator,
+        limit=None,
+        as_iterator=False,
+        output="dicts",
+        fields=None,
+        cursor=None,
+    ):
+        """Truncate and convert an entries iterator into the required output.
+
+        This is used by all methods returning paginated lists of entries.
+        See ``tables.format_entries`` for the different outputs. If a cursor
+        is provided, iterators are returned as PaginatedIterator objects
+        updating that cursor.
+        """
+        if limit is not None:
+            iterator = islice(iterator, limit)
+        if output in ("dataframe", "arrow"):
+            if as_iterator:
+                raise ValueError(
+                    "as_iterator cannot be used with output=%s" % output
+                )
+            return format_entries(iterator, output=output, fields=fields)
+        iterator = format_entries(iterator, output=output, fields=fields)
+        if not as_iterator:
+            return list(iterator)
+        if cursor is not None:
+            return PaginatedIterator(iterator, cursor)
+        return iterator
+
     # PARTS
 
     def get_part_samples(self, id):
@@ -318,6 +844,19 @@ class IceClient:
     def get_location_samples(self, location_id):
         return self.request("GET", "samples/location/%s" % location_id)
 
+    def get_location_samples_many(self, location_ids, max_workers=4):
+        """Return a dict ``{location_id: samples}`` for many locations.
+
+        The samples of the different locations (e.g. plates obtained with
+        ``get_plates``) are fetched concurrently.
+        """
+        location_ids = list(location_ids)
+        samples = iter_parallel(
+            self.get_location_samples, location_ids, max_workers=max_workers
+        )
+        samples = self.logger.iter_bar(location=samples)
+        return dict(zip(location_ids, samples))
+
     def get_sequence(self, id, format="genbank"):
         """Return genbank text for the entity with that id."""
         endpoint = "file/%s/sequence/%s" % (id, format)
@@ -328,23 +867,113 @@ class IceClient:
         genbank = self.get_sequence(id, format="genbank")
         return ice_genbank_to_record(genbank)
 
+    def iter_sequences(
+        self, ids, format="genbank", max_workers=4, ordered=True
+    ):
+        """Iterate over ``(id, sequence_text)`` for many entities.
+
+        The sequences are downloaded concurrently, and yielded in the order
+        of ``ids`` (or as soon as downloaded if ``ordered`` is False). The
+        text is None for entities without sequence.
+        """
+
+        def get_sequence(id):
+            try:
+                return id, self.get_sequence(id, format=format)
+            except IOError:
+                return id, None
+
+        return iter_parallel(
+            get_sequence, ids, max_workers=max_workers, ordered=ordered
+        )
+
+    def iter_records(
+        self, ids, max_workers=4, processes=None, chunk_size=20, ordered=True
+    ):
+        """Iterate over ``(id, biopython_record)`` for many entities.
+
+        The Genbank texts are downloaded concurrently by ``max_workers``
+        threads, and parsed by a pool of processes, so that parsing is not
+        limited by the GIL and runs while downloads continue. The record is
+        None for entities without sequence.
+
+        Parameters
+        ----------
+
+        ids
+          An iterable of entity IDs.
+
+        max_workers
+          Number of records downloaded concurrently.
+
+        processes
+          Number of processes parsing the records (default: number of
+          CPUs). Use 0 to parse the records in the calling thread, which is
+          faster for small numbers of records.
+
+        chunk_size
+          Number of Genbank texts sent at once to a process.
+
+        ordered
+          If True, the records are yielded in the order of ``ids``. Else,
+          they are yielded as soon as they are parsed.
+        """
+        genbanks = self.iter_sequences(
+            ids, max_workers=max_workers, ordered=ordered
+        )
+        if processes == 0:
+            return (ice_genbank_pair_to_record(pair) for pair in genbanks)
+        return iter_parallel_processes(
+            ice_genbank_pair_to_record,
+            genbanks,
+            processes=processes,
+            chunk_size=chunk_size,
+            ordered=ordered,
+        )
+
+    def get_records(self, ids, max_workers=4, processes=None, chunk_size=20):
+        """Return a list of the biopython records of many entities.
+
+        See ``iter_records`` for a description of the parameters. The list
+        contains None for entities without sequence.
+        """
+        records = self.iter_records(
+            ids,
+            max_workers=max_workers,
+            processes=processes,
+            chunk_size=chunk_size,
+        )
+        return [record for (id, record) in self.logger.iter_bar(id=records)]
+
     def get_part_infos(self, id):
         """Return infos (name, creation date...) for the part with that id."""
         return self.request("GET", "parts/%s" % id)
 
-    def _folder_parts_names_to_ids(self, folder_ids, must_contain=None):
-        parts_names_ids = {}
+    def _folder_parts_names_to_ids(
+        self, folder_ids, must_contain=None, max_workers=4
+    ):
+        """Return ``{name: set_of_ids}`` for the parts of the folders.
+
+        The folders are listed concurrently.
+        """
         if not isinstance(folder_ids, (list, tuple)):
             folder_ids = [folder_ids]
-        for folder_id in folder_ids:
-            entries = self.get_folder_entries(
-                folder_id=folder_id, must_contain=must_contain
+
+        def list_entries(folder_id):
+            return self.get_folder_entries(
+                folder_id=folder_id,
+                must_contain=must_contain,
+                fields=["id", "name"],
             )
+
+        parts_names_ids = {}
+        folders_entries = iter_parallel(
+            list_entries, folder_ids, max_workers=max_workers
+        )
+        for entries in folders_entries:
             for entry in entries:
                 name = entry["name"]
-                if name not in parts_names_ids:
-                    parts_names_ids[name] = []
-                parts_names_ids[name].append(entry["id"])
+                parts_names_ids.setdefault(name, set()).add(entry["id"])
         return parts_names_ids
 
     # FOLDERS
@@ -354,29 +983,15 @@ class IceClient:
         return self.request("GET", "folders/%s" % id)
 
     def get_folder_id(self, name, collection=None):
-        folders_names_ids = self._collection_folders_names_to_ids(collection)
-        if name not in folders_names_ids:
-            error = "No folder named %s." % name
-            suggestions = did_you_mean(name, folders_names_ids)
-            if len(suggestions):
-                error += " Suggestions: %s." % ", ".join(suggestions)
-            raise IOError(error)
-        folder_id = list(set(folders_names_ids[name]))
-        if len(folder_id) > 1:
-            raise IOError(
-                "Found several folders named %s, with IDs %s."
-                % (name, ", ".join([str(d) for d in folder_id]))
-            )
-        return folder_id[0]
+        """Return the ID of the folder with the given name.
+
+        The folders are looked up in ``self.folder_catalog``, so repeated
+        calls don't list the collection folders again. By default, the
+        PERSONAL and SHARED collections are searched.
 
-    def _collection_folders_names_to_ids(self, collection):
-        folders_names_ids = {}
-        for folder in self.get_collection_folders(collection=collection):
-            name = folder["folderName"]
-            if name not in folders_names_ids:
-                folders_names_ids[name] = []
-            folders_names_ids[name].append(folder["id"])
-        return folders_names_ids
+        Raises an IOError if no folder or several folders have this name.
+        """
+        return self.folder_catalog.get_folder_id(name, collection=collection)
 
     def search(
         self,
@@ -388,6 +1003,11 @@ class IceClient:
         entry_types=(),
         field_filters=(),
         sort_field="RELEVANCE",
+        sort_ascending=None,
+        output="dicts",
+        fields=None,
+        max_workers=1,
+        cursor=None,
     ):
         """Return an iterator or list over text search results.
 
@@ -410,26 +1030,68 @@ class IceClient:
         min_score
           Minimal score accepted. The search will be stopped at the first
           occurence of a score below that limit if sort_field is "RELEVANCE".
-        
-        
+
+        sort_field
+          Field by which the results are sorted, e.g. "RELEVANCE" or
+          "MODIFIED".
+
+        sort_ascending
+          If True (resp. False), the results are sorted by increasing (resp.
+          decreasing) value of the sort field. If None, ICE's default order
+          is used.
+
+        output
+          Either "dicts" (default) for entries dicts, "records" for
+          lightweight slotted records, "dataframe" for a pandas DataFrame
+          or "arrow" for a pyarrow Table. Tables are built incrementally,
+          page by page, and are not compatible with ``as_iterator``.
+
+        fields
+          List of the entry fields to keep, e.g. ``["id", "name",
+          "owner.email"]`` (nested fields are separated by dots). Use None to
+          keep all fields.
+
+        max_workers
+          Number of pages fetched concurrently from ICE. Entries are still
+          returned in order.
+
+        cursor
+          A PaginationCursor (or its dict/JSON representation) from a
+          previous iteration with the same parameters, to resume that
+          iteration. When ``as_iterator`` is True, the returned iterator has
+          a ``cursor`` attribute which can be saved for that purpose.
+
         Returns
         -------
         entries_iterator
           An iterator over the successive entries found by the search.
         """
 
-        def request(offset):
-            if limit is not None:
-                retrieve_count = min(batch_size, limit - offset + 1)
-            else:
-                retrieve_count = batch_size
+        cursor_parameters = dict(
+            query=query,
+            min_score=min_score,
+            entry_types=list(entry_types),
+            field_filters=list(field_filters),
+            sort_field=sort_field,
+        )
+        if sort_ascending is not None:
+            cursor_parameters["sort_ascending"] = sort_ascending
+        cursor = self._get_cursor(
+            cursor, "search", cursor_parameters, batch_size=batch_size
+        )
+        batch_size = cursor.batch_size
+
+        def request(offset, retrieve_count):
+            parameters = dict(
+                start=offset,
+                retrieveCount=retrieve_count,
+                sortField=sort_field,
+            )
+            if sort_ascending is not None:
+                parameters["sortAscending"] = sort_ascending
             data = dict(
                 entryTypes=list(entry_types),
-                parameters=dict(
-                    start=offset,
-                    retrieveCount=retrieve_count,
-                    sortField=sort_field,
-                ),
+                parameters=parameters,
                 blastQuery={},
                 queryString=query,
                 fieldFilters=field_filters,
@@ -437,29 +1099,44 @@ class IceClient:
             )
             return self.request("POST", "search", data=data)
 
-        count = request(0)["resultCount"]
-        if limit:
-            count = min(count, limit)
+        # The results of the count request are re-used as the first page.
+        first_page = {}
+        if cursor.count is None:
+            response = request(0, batch_size)
+            first_page[0] = response["results"]
+            count = response["resultCount"]
+            if limit:
+                count = min(count, limit)
+            cursor.count = count
+
+        def fetch_page(offset):
+            retrieve_count = min(batch_size, cursor.count - offset)
+            if offset in first_page:
+                return first_page.pop(offset)[:retrieve_count]
+            return request(offset, retrieve_count)["results"]
 
         def generator():
-            offsets = range(0, count, batch_size)
-            for offset in self.logger.iter_bar(batch=offsets):
-                result = request(offset)
-                for entry in result["results"]:
-                    if float(entry["score"]) < min_score:
-                        return
-                    yield entry["entryInfo"]
-
-        iterator = generator()
-        if as_iterator:
-            if limit is not None:
-                return (entry for i, entry in zip(range(limit), iterator))
-            return iterator
-        else:
-            if limit is not None:
-                return [entry for i, entry in zip(range(limit), iterator)]
-            else:
-                return list(iterator)
+            results = self._iter_pages(
+                fetch_page,
+                batch_size,
+                count=cursor.count,
+                max_workers=max_workers,
+                start=cursor.offset,
+            )
+            for entry in results:
+                if float(entry["score"]) < min_score:
+                    results.close()
+                    return
+                yield entry["entryInfo"]
+
+        return self._format_entries_output(
+            generator(),
+            limit=limit,
+            as_iterator=as_iterator,
+            output=output,
+            fields=fields,
+            cursor=cursor,
+        )
 
     def find_entry_by_name(
         self,
@@ -530,6 +1207,10 @@ class IceClient:
         as_iterator=False,
         limit=None,
         batch_size=15,
+        output="dicts",
+        fields=None,
+        max_workers=1,
+        cursor=None,
     ):
         """Return a list or iterator of all entries in a given ICE folder.
 
@@ -555,39 +1236,80 @@ class IceClient:
         as_iterator
           If true, an iterator is returned instead of a list (useful for
           folders with many parts)
+
+        output
+          Either "dicts" (default) for entries dicts, "records" for
+          lightweight slotted records, "dataframe" for a pandas DataFrame
+          or "arrow" for a pyarrow Table. Tables are built incrementally,
+          page by page, and are not compatible with ``as_iterator``.
+
+        fields
+          List of the entry fields to keep, e.g. ``["id", "name",
+          "owner.email"]`` (nested fields are separated by dots). Use None to
+          keep all fields.
+
+        max_workers
+          Number of pages fetched concurrently from ICE. Entries are still
+          returned in order.
+
+        cursor
+          A PaginationCursor (or its dict/JSON representation) from a
+          previous iteration with the same parameters, to resume that
+          iteration. When ``as_iterator`` is True, the returned iterator has
+          a ``cursor`` attribute which can be saved for that purpose.
         """
+        cursor = self._get_cursor(
+            cursor,
+            "get_folder_entries",
+            dict(folder_id=folder_id, must_contain=must_contain),
+            batch_size=batch_size,
+        )
+        batch_size = cursor.batch_size
         url = "folders/%s/entries" % folder_id
 
-        def request(offset):
+        def request(offset, **kwargs):
             return self.request(
                 "GET",
                 url,
                 params=dict(
                     limit=batch_size, filter=must_contain, offset=offset
                 ),
+                **kwargs
             )
 
-        count = request(0)["count"]
+        def fetch_page(offset):
+            return request(
+                offset,
+                response_type="json_items",
+                items_path="entries",
+                fields=fields,
+            )
 
-        def generator():
-            offsets = range(0, count, batch_size)
-            for offset in self.logger.iter_bar(batch=offsets):
-                result = request(offset)
-                for entry in result["entries"]:
-                    yield entry
-
-        iterator = generator()
-        if as_iterator:
-            if limit is not None:
-                return (entry for i, entry in zip(range(limit), iterator))
-            return iterator
-        else:
-            if limit is not None:
-                return [entry for i, entry in zip(range(limit), iterator)]
-            else:
-                return list(iterator)
+        if cursor.count is None:
+            cursor.count = request(0)["count"]
+        iterator = self._iter_pages(
+            fetch_page,
+            batch_size,
+            count=cursor.count,
+            max_workers=max_workers,
+            start=cursor.offset,
+        )
+        return self._format_entries_output(
+            iterator,
+            limit=limit,
+            as_iterator=as_iterator,
+            output=output,
+            fields=fields,
+            cursor=cursor,
+        )
 
     def get_part_folders(self, part_id):
+        """Return the infos of the folders containing a part.
+
+        To get the folders of many parts, prefer building a
+        ``FolderMembershipIndex``, which lists the entries of all folders
+        concurrently.
+        """
         return self.request("GET", "parts/%s/folders" % part_id)
 
     def get_collection_entries(
@@ -597,38 +1319,164 @@ class IceClient:
         as_iterator=False,
         limit=None,
         batch_size=15,
+        output="dicts",
+        fields=None,
+        max_workers=1,
+        cursor=None,
     ):
-        """Return all entries in a given collection"""
+        """Return all entries in a given collection.
+
+        See ``get_folder_entries`` for a description of the parameters.
+        """
+        cursor = self._get_cursor(
+            cursor,
+            "get_collection_entries",
+            dict(collection=collection, must_contain=must_contain),
+            batch_size=batch_size,
+        )
+        batch_size = cursor.batch_size
         url = "collections/%s/entries" % collection
 
-        def request(offset):
+        def request(offset, **kwargs):
             return self.request(
                 "GET",
                 url,
                 params=dict(
                     limit=batch_size, filter=must_contain, offset=offset
                 ),
+                **kwargs
             )
 
-        count = request(0)["resultCount"]
+        def fetch_page(offset):
+            return request(
+                offset,
+                response_type="json_items",
+                items_path="data",
+                fields=fields,
+            )
 
-        def generator():
-            offsets = range(0, count, batch_size)
-            for offset in self.logger.iter_bar(batch=offsets):
-                result = request(offset)
-                for entry in result["data"]:
-                    yield entry
-
-        iterator = generator()
-        if as_iterator:
-            if limit is not None:
-                return (entry for i, entry in zip(range(limit), iterator))
-            return iterator
-        else:
-            if limit is not None:
-                return [entry for i, entry in zip(range(limit), iterator)]
-            else:
-                return list(iterator)
+        if cursor.count is None:
+            cursor.count = request(0)["resultCount"]
+        iterator = self._iter_pages(
+            fetch_page,
+            batch_size,
+            count=cursor.count,
+            max_workers=max_workers,
+            start=cursor.offset,
+        )
+        return self._format_entries_output(
+            iterator,
+            limit=limit,
+            as_iterator=as_iterator,
+            output=output,
+            fields=fields,
+            cursor=cursor,
+        )
+
+    def crawl_collection(
+        self,
+        collection,
+        ignored_folders=(),
+        fields=None,
+        memberships=False,
+        batch_size=100,
+        max_workers=4,
+    ):
+        """Iterate over the entries of all folders of a collection, once.
+
+        The pages of all folders are fetched concurrently (a bounded number
+        at a time) and each entry is yielded only once, even when it is in
+        several folders. By default, only the IDs of the entries already
+        seen are kept in memory. With ``memberships=True``, the
+        folders are listed twice (doubling the number of requests) and a
+        ``FolderMembershipIndex`` of all the collection's entries is kept
+        in memory during the crawl, so memory use grows with the number of
+        entries.
+
+        Examples
+        --------
+
+        >>> for entry in ice.crawl_collection("SHARED", ["ARCHIVE"]):
+        >>>     print(entry["name"])
+        >>> entries = ice.crawl_collection("SHARED", memberships=True)
+        >>> for entry in entries:
+        >>>     print(entry["name"], entry["folders"])
+
+        Parameters
+        ----------
+
+        collection
+          Collection to crawl, e.g. "SHARED" or "PERSONAL".
+
+        ignored_folders
+          ID or name, or list of IDs or names, of the folders of the
+          collection to skip.
+
+        fields
+          List of the entry fields to keep (see ``get_folder_entries``), or
+          None for all fields.
+
+        memberships
+          If True, each entry gets a "folders" field with the sorted IDs of
+          all the crawled folders containing it. This requires a first pass
+          listing the IDs of the entries of all folders (one request per
+          page, as for the main pass), and an in-memory index of all the
+          folders' entries. Defaults to False.
+
+        batch_size
+          Number of entries per page.
+
+        max_workers
+          Number of pages fetched concurrently.
+        """
+        if isinstance(ignored_folders, (str, int)):
+            ignored_folders = (ignored_folders,)
+        folders = [
+            folder
+            for folder in self.get_collection_folders(collection)
+            if (folder["id"] not in ignored_folders)
+            and (folder["folderName"] not in ignored_folders)
+        ]
+        pages = [
+            (folder["id"], offset)
+            for folder in folders
+            for offset in range(0, folder["count"], batch_size)
+        ]
+        if (fields is not None) and ("id" not in fields):
+            fields = list(fields) + ["id"]
+
+        def iter_pages(fields):
+            def fetch_page(page):
+                folder_id, offset = page
+                entries = self.request(
+                    "GET",
+                    "folders/%s/entries" % folder_id,
+                    params=dict(limit=batch_size, offset=offset),
+                    response_type="json_items",
+                    items_path="entries",
+                    fields=fields,
+                )
+                return folder_id, list(entries)
+
+            return iter_parallel(fetch_page, pages, max_workers=max_workers)
+
+        index = None
+        if memberships:
+            index = FolderMembershipIndex()
+            for folder_id, entries in iter_pages(["id"]):
+                index.add_entries(folder_id, [e["id"] for e in entries])
+        seen = set()
+        for folder_id, entries in self.logger.iter_bar(
+            page=iter_pages(fields)
+        ):
+            for entry in entries:
+                if entry["id"] in seen:
+                    continue
+                seen.add(entry["id"])
+                if memberships:
+                    folders_ids = index.get_part_folders_ids(entry["id"])
+                    entry["folders"] = folders_ids or [folder_id]
+                yield entry
 
     # COLLECTIONS
 
@@ -639,9 +1487,11 @@ class IceClient:
         FEATURED PERSONAL SHARED DRAFTS PENDING DELETED
         """
         if isinstance(collection, tuple):
-            return sum(
-                [self.get_collection_folders(c) for c in collection], []
-            )
+            return [
+                folder
+                for c in collection
+                for folder in self.get_collection_folders(c)
+            ]
         return self.request("GET", "collections/%s/folders" % collection)
 
     def change_user_password(self, new_password, user_id="session_user"):
@@ -658,6 +1508,24 @@ class IceClient:
         """Get a list of all permissions attached to a part"""
         return self.request("GET", "parts/%s/permissions" % id)
 
+    def create_part_permission(
+        self, part_id, group_id=None, user_id=None, can_write=False
+    ):
+        """Add a new permission for the given part.
+
+        See ``create_folder_permission`` for a description of the
+        parameters.
+        """
+        data = dict(
+            article="GROUP" if group_id is not None else "ACCOUNT",
+            typeId=part_id,
+            articleId=group_id if group_id is not None else user_id,
+            type="WRITE_ENTRY" if can_write else "READ_ENTRY",
+        )
+        return self.request(
+            "POST", "parts/%s/permissions" % part_id, data=data
+        )
+
     def delete_part_permission(self, part_id, permission_id):
         """Delete a permission for a given part."""
         url = "parts/%s/permissions/%s" % (part_id, permission_id)
@@ -673,7 +1541,11 @@ class IceClient:
         return self.session_infos["id"]
 
     def restrict_part_to_user(self, part_id, user_id="current_user"):
-        """Remove all permissions that are not from the given user."""
+        """Remove all permissions that are not from the given user.
+
+        To restrict many parts at once, see
+        ``permissions.PermissionsMatrix.restrict_to``.
+        """
         if user_id == "current_user":
             user_id = self.get_session_user_id()
         for permission in self.get_part_permissions(part_id):
@@ -752,16 +1624,27 @@ class IceClient:
 
     def create_folder(self, name):
         """Create a folder with the given name."""
-        return self.request("POST", "folders", data=dict(folderName=name))
+        folder = self.request("POST", "folders", data=dict(folderName=name))
+        self.folder_catalog.add_folder(folder, collection="PERSONAL")
+        return folder
 
     def delete_folder(self, folder_id, folder_type="auto"):
         """Delete a folder by id.
-        
+
+        With ``folder_type="auto"``, the type of the folder (e.g. PRIVATE or
+        SHARED) is fetched from ICE, as the type cached by
+        ``self.folder_catalog`` may have changed (e.g. if the folder was
+        shared since).
         """
         if folder_type == "auto":
-            folder_type = self.get_folder_infos(folder_id)["type"]
-            url = "folders/%s?type=%s" % (folder_id, folder_type)
-        return self.request("DELETE", url)
+            folder_infos = self.folder_catalog.get_folder_infos(
+                folder_id, refresh=True
+            )
+            folder_type = folder_infos["type"]
+        url = "folders/%s?type=%s" % (folder_id, folder_type)
+        result = self.request("DELETE", url)
+        self.folder_catalog.remove_folder(folder_id)
+        return result
 
     def create_folder_permission(
         self, folder_id, group_id=None, user_id=None, can_write=False
@@ -791,6 +1674,10 @@ class IceClient:
             "POST", "folders/%s/permissions" % folder_id, data=data
         )
 
+    def get_folder_permissions(self, folder_id):
+        """Get a list of all permissions attached to a folder."""
+        return self.request("GET", "folders/%s/permissions" % folder_id)
+
     def delete_folder_permission(self, folder_id, permission_id):
         """Remove a permission attached to a given folder."""
         url = "folders/%s/permissions/%s" % (folder_id, permission_id)
@@ -814,10 +1701,13 @@ class IceClient:
         
         folder_ids
           List of folder IDs that can be provided instead of the ``folders``
-          infos list.
+          infos list. Their infos are read from ``self.folder_catalog``.
         """
         if len(folders_ids):
-            folders = [self.get_folder_infos(fid) for fid in folders_ids]
+            folders = [
+                self.folder_catalog.get_folder_infos(folder_id)
+                for folder_id in folders_ids
+            ]
         data = dict(
             destination=list(folders),
             entries=list(entries_ids),
@@ -843,6 +1733,8 @@ class IceClient:
         record_text=None,
         filename="auto",
         record_format="genbank",
+        skip_unchanged=False,
+        replace_existing=False,
     ):
         """Attach a BioPython record or raw text record to a part
         
@@ -869,7 +1761,33 @@ class IceClient:
         
         record_format
           When providing a fasta format in record_text, set this to "fasta".
+
+        skip_unchanged
+          If True, the record is not uploaded (and None is returned) when its
+          content hash is the same as the one in the client's
+          ``record_hashes`` store for that part. Requires ``ice_part_id``.
+
+        replace_existing
+          If True and the part already has a sequence, the part's record is
+          deleted before the new one is uploaded (ICE doesn't replace it
+          otherwise). Requires ``ice_part_id``.
         """
+        record_hash = None
+        if (self.record_hashes is not None) and (ice_part_id is not None):
+            record_hash = record_content_hash(
+                record=record,
+                record_text=record_text,
+                record_format=record_format,
+            )
+            if skip_unchanged and (
+                self.record_hashes.get(ice_part_id) == record_hash
+            ):
+                return None
+        elif skip_unchanged:
+            raise ValueError(
+                "skip_unchanged requires a ice_part_id and a client with "
+                "a record_hashes store."
+            )
         typedata = {
             "fasta": {
                 "extension": "fa",
@@ -881,8 +1799,15 @@ class IceClient:
             },
         }[record_format]
 
-        if ice_record_id is None:
-            ice_record_id = self.get_part_infos(ice_part_id)["recordId"]
+        if (ice_record_id is None) or replace_existing:
+            if ice_part_id is None:
+                raise ValueError(
+                    "Provide a ice_part_id to find or replace the record."
+                )
+            infos = self.get_part_infos(ice_part_id)
+            ice_record_id = infos["recordId"]
+            if replace_existing and infos.get("hasSequence"):
+                self.delete_part_record(ice_part_id)
 
         if record is not None:
             stringio = StringIO()
@@ -893,19 +1818,216 @@ class IceClient:
         if filename == "auto":
             filename = "uploaded_with_icebreaker." + typedata["extension"]
 
-        return self.request(
+        response = self.request(
             "POST",
             "file/sequence",
             data={"entryType": "PART", "entryRecordId": ice_record_id},
             files={"file": (filename, record_text, typedata["mimetype"])},
             response_type="raw",
         )
+        if record_hash is not None:
+            self.record_hashes.set(ice_part_id, record_hash)
+        return response
+
+    def sync_records(self, records, max_workers=4):
+        """Upload the records of many parts, skipping unchanged records.
+
+        This requires a client with a ``record_hashes`` store (see
+        ``IceClient``). Only the records whose content hash differs from the
+        stored hash are uploaded, replacing the parts' previous records.
+
+        Parameters
+        ----------
+
+        records
+          A dict ``{part_id: record}`` where each record is either a
+          Biopython record or a Genbank text.
+
+        max_workers
+          Number of records processed concurrently.
+
+        Returns
+        -------
+
+        report
+          A pandas DataFrame with columns "part_id", "uploaded" (False for
+          unchanged records) and "error".
+        """
+
+        def sync(part_id_and_record):
+            part_id, record = part_id_and_record
+            is_text = isinstance(record, (str, bytes))
+            try:
+                response = self.attach_record_to_part(
+                    ice_part_id=part_id,
+                    record=None if is_text else record,
+                    record_text=record if is_text else None,
+                    skip_unchanged=True,
+                    replace_existing=True,
+                )
+                return [part_id, response is not None, None]
+            except Exception as err:
+                return [part_id, False, str(err)]
+
+        results = iter_parallel(
+            sync, list(records.items()), max_workers=max_workers
+        )
+        results = list(self.logger.iter_bar(record=results))
+        return pandas.DataFrame(
+            results, columns=["part_id", "uploaded", "error"]
+        )
+
+    def register_parts_bulk(
+        self,
+        parts,
+        folder_id=None,
+        max_workers=4,
+        chunk_size=50,
+    ):
+        """Create many parts, with their records, and add them to a folder.
+
+        Part creation and record upload are run concurrently for the
+        different parts (the record is attached using the ``recordId``
+        returned at part creation), while the created parts are added to
+        the folder chunk by chunk, with one request per chunk.
+
+        Examples
+        --------
+
+        >>> parts = [
+        >>>     dict(name="pGFP", type="PLASMID", markers=["KanR"],
+        >>>          record=gfp_record),
+        >>>     dict(name="promoter_1", description="A promoter.",
+        >>>          record_text=genbank_text),
+        >>> ]
+        >>> report = ice.register_parts_bulk(parts, folder_id=12)
+
+        Parameters
+        ----------
+
+        parts
+          A list of dicts or a pandas DataFrame, with one row per part.
+          Rows must have a "name" and can have fields "type" ("PART" by
+          default, or "PLASMID"), "description", "pi", "markers" (plasmids
+          only), "parameters" (list of (name, value) custom fields),
+          "record" (Biopython record), "record_text" (Genbank or FASTA text),
+          "record_format" ("genbank" by default, or "fasta") and
+          "attributes" (dict of other ICE fields).
+
+        folder_id
+          ID of the folder in which to add all the created parts.
+
+        max_workers
+          Number of parts being registered concurrently.
+
+        chunk_size
+          Number of parts added to the folder at the same time.
+
+        Returns
+        -------
+
+        report
+          A pandas DataFrame with one row per part and columns "name",
+          "part_id", "record_attached", "added_to_folder" and "error".
+        """
+        if isinstance(parts, pandas.DataFrame):
+            parts = parts.to_dict("records")
+        parts = list(parts)
+        folders = []
+        if folder_id is not None:
+            folders = [self.get_folder_infos(folder_id)]
+
+        def register(part):
+            result = dict(
+                name=part["name"],
+                part_id=None,
+                record_attached=False,
+                added_to_folder=False,
+                error=None,
+            )
+            try:
+                part_id, record_id = self._create_part_from_row(part)
+                result["part_id"] = part_id
+                record = _none_if_empty(part.get("record"))
+                record_text = _none_if_empty(part.get("record_text"))
+                if (record is not None) or (record_text is not None):
+                    self.attach_record_to_part(
+                        ice_record_id=record_id,
+                        record=record,
+                        record_text=record_text,
+                        record_format=(
+                            _none_if_empty(part.get("record_format"))
+                            or "genbank"
+                        ),
+                    )
+                    result["record_attached"] = True
+            except Exception as err:
+                result["error"] = str(err)
+            return result
+
+        def add_chunk_to_folder(chunk):
+            parts_ids = [r["part_id"] for r in chunk if r["part_id"]]
+            if not (len(folders) and len(parts_ids)):
+                return
+            try:
+                self.add_to_folder(parts_ids, folders=folders)
+            except Exception as err:
+                for result in chunk:
+                    if result["part_id"] and result["error"] is None:
+                        result["error"] = "Folder: %s" % err
+                return
+            for result in chunk:
+                result["added_to_folder"] = result["part_id"] is not None
+
+        results, chunk = [], []
+        registrations = iter_parallel(register, parts, max_workers=max_workers)
+        for result in self.logger.iter_bar(part=registrations):
+            results.append(result)
+            chunk.append(result)
+            if len(chunk) == chunk_size:
+                add_chunk_to_folder(chunk)
+                chunk = []
+        add_chunk_to_folder(chunk)
+        columns = ["name", "part_id", "record_attached", "added_to_folder"]
+        return pandas.DataFrame(results, columns=columns + ["error"])
+
+    def _create_part_from_row(self, part):
+        """Create a part from a ``register_parts_bulk`` row.
+
+        Returns the ID and record ID of the new part.
+        """
+        attributes = _none_if_empty(part.get("attributes")) or {}
+        parameters = _none_if_empty(part.get("parameters")) or ()
+        common = dict(
+            name=part["name"],
+            pi=_none_if_empty(part.get("pi")) or "unknown",
+            parameters=parameters,
+        )
+        if _none_if_empty(part.get("type")) == "PLASMID":
+            response = self.create_plasmid(
+                markers=_none_if_empty(part.get("markers")) or ("None",),
+                description=(
+                    _none_if_empty(part.get("description")) or "A plasmid."
+                ),
+                **dict(common, **attributes)
+            )
+        else:
+            response = self.create_part(
+                description=(
+                    _none_if_empty(part.get("description")) or "A part."
+                ),
+                **dict(common, **attributes)
+            )
+        return response["id"], response["recordId"]
 
     def delete_part_record(self, part_id):
         """Remove the record attached to a part."""
-        return self.request(
+        response = self.request(
             "DELETE", "parts/%s/sequence" % part_id, response_type="raw"
         )
+        if self.record_hashes is not None:
+            self.record_hashes.delete(part_id)
+        return response
 
     def get_user_groups(self, user_id="session_id"):
         """List all groups a user (this user by default) is part of."""
@@ -931,7 +2053,15 @@ class IceClient:
             )
 
     def trash_parts(self, part_ids, visible="OK", remove_parts_links=False):
-        """Place the list of IDed parts in the trash."""
+        """Place the list of IDed parts in the trash.
+
+        For many parts, prefer ``trash_parts_bulk``, which removes the links
+        concurrently and reports the outcome for each part.
+
+        With ``remove_parts_links=True``, an ``IOError`` is raised (and no
+        part is trashed) if a link cannot be removed, see
+        ``remove_all_part_links``.
+        """
         if remove_parts_links:
             for part_id in self.logger.iter_bar(entry=part_ids):
                 self.remove_all_part_links(part_id=part_id)
@@ -942,6 +2072,136 @@ class IceClient:
             response_type="raw",
         )
 
+    def trash_parts_bulk(
+        self,
+        part_ids,
+        visible="OK",
+        remove_parts_links=True,
+        max_workers=4,
+        chunk_size=100,
+        dry_run=False,
+    ):
+        """Place many parts in the trash, after removing their links.
+
+        The links of all parts are fetched concurrently, each existing link
+        is removed with a single request (concurrently), and the parts are
+        trashed by chunks. A part is only trashed if all its links could be
+        removed.
+
+        Parameters
+        ----------
+
+        part_ids
+          List of the IDs (or part numbers) of the parts to trash. The
+          report's "part_id" column contains these IDs as provided.
+
+        visible
+          Visibility status sent with the trash request.
+
+        remove_parts_links
+          If True, the parent/child links of the parts are removed first.
+
+        max_workers
+          Number of concurrent requests.
+
+        chunk_size
+          Number of parts trashed with each request.
+
+        dry_run
+          If True, only the links are fetched, and the report shows what
+          would be done, without modifying anything in ICE.
+
+        Returns
+        -------
+
+        report
+          A pandas DataFrame with one row per part and columns "part_id",
+          "links" (number of links of the part), "links_removed", "trashed"
+          and "error".
+        """
+        part_ids = list(part_ids)
+        results = {
+            part_id: dict(
+                part_id=part_id,
+                links=0,
+                links_removed=0,
+                trashed=False,
+                error=None,
+            )
+            for part_id in part_ids
+        }
+        columns = ["part_id", "links", "links_removed", "trashed", "error"]
+        # The part IDs can be strings or part numbers, while the links and
+        # the trash requests use ICE's integer IDs.
+        ice_ids = {part_id: part_id for part_id in part_ids}
+        if remove_parts_links:
+
+            def get_part_infos(part_id):
+                try:
+                    return part_id, self.get_part_infos(part_id), None
+                except IOError as err:
+                    return part_id, dict(id=part_id), "Infos: %s" % err
+
+            def parts_infos():
+                results_iterator = iter_parallel(
+                    get_part_infos, part_ids, max_workers=max_workers
+                )
+                for part_id, infos, error in self.logger.iter_bar(
+                    part=results_iterator
+                ):
+                    results[part_id]["error"] = error
+                    ice_ids[part_id] = infos["id"]
+                    yield infos
+
+            graph = PartLinkGraph.from_parts_infos(parts_infos())
+            for part_id in part_ids:
+                part_links = graph.get_part_links(ice_ids[part_id])
+                results[part_id]["links"] = len(part_links)
+        if remove_parts_links and not dry_run:
+            requested_ids = {
+                ice_id: part_id for part_id, ice_id in ice_ids.items()
+            }
+            links_report = graph.unlink_all(
+                self,
+                [ice_ids[p] for p in part_ids if results[p]["error"] is None],
+                max_workers=max_workers,
+            )
+            for link in links_report.itertuples():
+                for ice_id in (link.parent_id, link.child_id):
+                    if ice_id not in requested_ids:
+                        continue
+                    part_id = requested_ids[ice_id]
+                    if pandas.isnull(link.error):
+                        results[part_id]["links_removed"] += 1
+                    elif results[part_id]["error"] is None:
+                        results[part_id]["error"] = "Unlink: %s" % link.error
+        if dry_run:
+            return pandas.DataFrame(list(results.values()), columns=columns)
+
+        to_trash = [p for p in part_ids if results[p]["error"] is None]
+        chunks = [
+            to_trash[i : i + chunk_size]
+            for i in range(0, len(to_trash), chunk_size)
+        ]
+
+        def trash_chunk(chunk):
+            try:
+                self.trash_parts(
+                    [ice_ids[part_id] for part_id in chunk], visible=visible
+                )
+                return chunk, None
+            except IOError as err:
+                return chunk, str(err)
+
+        trashed_chunks = iter_parallel(
+            trash_chunk, chunks, max_workers=max_workers
+        )
+        for chunk, error in self.logger.iter_bar(chunk=trashed_chunks):
+            for part_id in chunk:
+                results[part_id]["trashed"] = error is None
+                results[part_id]["error"] = error and ("Trash: %s" % error)
+        return pandas.DataFrame(list(results.values()), columns=columns)
+
     def find_parts_by_custom_field_value(self, parameter, value):
         """Find all parts whose (extra) field "parameter" is set to "value" """
         results = []
@@ -1028,8 +2288,16 @@ class IceClient:
     # Legacy and super-experimental stuff
 
     def get_known_markers(self, token=""):
-        url = "search/filter?field=SELECTION_MARKERS&token=%s" % token
-        return self.request(url)
+        """Return the selection markers used in ICE which contain a token.
+
+        To find which parts carry a given marker (or feature), see
+        ``features.write_features_table``.
+        """
+        return self.request(
+            "GET",
+            "search/filter",
+            params=dict(field="SELECTION_MARKERS", token=token),
+        )
 
     def __get_part_id(
         self, name, folder_id=None, collection=None, use_filter=False
@@ -1060,11 +2328,8 @@ class IceClient:
           very long but next searches will be instantaneous)
         """
         if collection is not None:
-            folder_id = tuple(
-                sorted(
-                    [f["id"] for f in self.get_collection_folders(collection)]
-                )
-            )
+            folders = self.folder_catalog.get_collection_folders(collection)
+            folder_id = tuple(sorted([f["id"] for f in folders]))
 
         parts_names_ids = self._folder_parts_names_to_ids(
             folder_id, must_contain=name if use_filter else None
@@ -1101,26 +2366,37 @@ class IceClient:
         )
         return self.request("DELETE", url, response_type="raw")
 
-    def remove_all_part_links(self, part_id=None, linked_parts=None):
-        if part_id is not None:
-            linked_parts = self.get_part_infos(part_id)["linkedParts"]
-        for linked_part in self.logger.iter_bar(linked_part=linked_parts):
-            for link_type in ["CHILD", "PARENT"]:
-                try:
-                    self.unlink_parts(
-                        part_id, linked_part["id"], link_type=link_type
-                    )
-                except:
-                    pass
-
-    def __get_collection_entries(self, collection, ignored_folders=()):
-        """Return all entries in a given collection"""
-        return sum(
-            [
-                self.get_folder_entries(f)
-                for f in self.get_collection_folders(collection)
-                if f not in ignored_folders
-            ],
-            [],
-        )
+    def remove_all_part_links(self, part_id, linked_parts=None, parents=None):
+        """Remove all the parent/child links of a part.
+
+        Each link is removed with a single request in its known direction.
+        To remove the links of many parts at once, see
+        ``link_graph.PartLinkGraph.unlink_all``.
+
+        Note that, contrary to previous versions (where ``part_id`` was
+        optional and the failed unlinkings were silently ignored),
+        ``part_id`` is required and an ``IOError`` is raised as soon as a
+        link cannot be removed. As a consequence ``trash_parts`` with
+        ``remove_parts_links=True`` stops (without trashing any part) at the
+        first link which cannot be removed.
+
+        Parameters
+        ----------
+
+        part_id
+          ID of the part whose links should be removed.
+
+        linked_parts, parents
+          Lists of the children and parents of the part (dicts with an
+          "id" field, as in ``get_part_infos``). If both are None, they are
+          obtained with ``get_part_infos``.
+        """
+        if (linked_parts is None) and (parents is None):
+            infos = self.get_part_infos(part_id)
+            linked_parts = infos.get("linkedParts") or []
+            parents = infos.get("parents") or []
+        links = [(part_id, child["id"]) for child in linked_parts or []]
+        links += [(parent["id"], part_id) for parent in parents or []]
+        for parent_id, child_id in self.logger.iter_bar(link=links):
+            self.unlink_parts(parent_id, child_id, link_type="CHILD")
 
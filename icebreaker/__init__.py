@@ -4,4 +4,23 @@
 
 from .IceClient import IceClient
 from .utils import (sample_location_string, parse_sample_location)
-from .recipes import find_parts_locations_by_name
\ No newline at end of file
+from .recipes import (find_parts_locations_by_name, download_folder_data,
+                      download_collection_data)
+from .tables import write_entries_table
+from .pagination import PaginationCursor
+from .migration import IceMigration, MigrationJournal
+from .mirror import IceMirror
+from .offline import OfflineIceClient
+from .sequence_store import (SequenceStore, SequenceStoreWriter,
+                             write_sequence_store)
+from .kmer_index import KmerIndex
+from .duplicates import find_duplicate_parts
+from .features import write_features_table, read_features_table
+from .link_graph import PartLinkGraph
+from .permissions import PermissionsMatrix
+from .folder_catalog import FolderCatalog, FolderMembershipIndex
+from .change_feed import ChangeFeed
+from .rate_limiting import RateLimiter
+from .concurrency import AdaptiveConcurrencyLimiter
+from .scheduling import RequestScheduler, request_class
+from .client_pool import IceClientPool
@@ -0,0 +1,219 @@
+"""Feed of the entries created or modified in ICE since the last poll."""
+
+import json
+import os
+import time
+
+
+class ChangeFeed:
+    """Watcher emitting events for new and modified ICE entries.
+
+    Each poll pages through the entries sorted by decreasing modification
+    time, and stops as soon as it reaches the entries already seen at the
+    previous poll (the "watermark"). A poll therefore costs one request
+    (plus one per extra page of changes), however large the collection.
+
+    The events are yielded from the oldest to the newest change, and the
+    watermark is advanced (and saved, if a ``state_path`` is provided) once
+    each event has been consumed, so that an interrupted sync resumes at the
+    first unprocessed change.
+
+    Examples
+    --------
+
+    >>> feed = ChangeFeed(ice, collection="SHARED", state_path="feed.json")
+    >>> for event in feed.poll():
+    >>>     print(event["event"], event["entry_id"])
+    >>> # Or, forever:
+    >>> feed.watch(lims.update, interval=120)
+
+    Parameters
+    ----------
+
+    ice_client
+      The IceClient used for polling.
+
+    collection
+      Collection to watch, e.g. "SHARED". Ignored if ``query`` is provided.
+
+    query
+      If not None, the entries are listed with an ICE search with that
+      query (use "" for all entries), e.g. to restrict the feed to some
+      ``entry_types``.
+
+    entry_types
+      Entry types for the search, e.g. ``("PLASMID",)``.
+
+    sort_field
+      Name of the ICE sort field for the modification time, used in the
+      search parameters or the collection listing.
+
+    state_path
+      Path to a JSON file where the watermark is persisted between polls
+      and between runs.
+
+    start
+      Where the feed starts when there is no saved watermark. Either "now"
+      (the first poll only records the latest modification time and emits
+      no events) or "beginning" (all entries are emitted as created).
+
+    batch_size
+      Number of entries per page.
+    """
+
+    def __init__(
+        self,
+        ice_client,
+        collection="SHARED",
+        query=None,
+        entry_types=(),
+        sort_field="MODIFIED",
+        state_path=None,
+        start="now",
+        batch_size=50,
+    ):
+        if start not in ("now", "beginning"):
+            raise ValueError("start should be 'now' or 'beginning'.")
+        self.ice_client = ice_client
+        self.collection = collection
+        self.query = query
+        self.entry_types = list(entry_types)
+        self.sort_field = sort_field
+        self.state_path = state_path
+        self.start = start
+        self.batch_size = batch_size
+        self.watermark = None
+        self.watermark_ids = set()
+        if (state_path is not None) and os.path.exists(state_path):
+            with open(state_path, "r") as f:
+                state = json.load(f)
+            self.watermark = state["watermark"]
+            self.watermark_ids = set(state["watermark_ids"])
+
+    def save_state(self):
+        """Write the watermark in the state file (if any), atomically."""
+        if self.state_path is None:
+            return
+        state = dict(
+            watermark=self.watermark,
+            watermark_ids=sorted(self.watermark_ids),
+        )
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.state_path)
+
+    def _fetch_page(self, offset, limit):
+        """Return a page of the collection's entries, most recent first."""
+        url = "collections/%s/entries" % self.collection
+        params = dict(
+            offset=offset, limit=limit, sort=self.sort_field, asc="false"
+        )
+        return self.ice_client.request("GET", url, params=params)["data"]
+
+    def _iter_entries(self, batch_size):
+        """Yield the entries, sorted by decreasing modification time.
+
+        Pages are only requested as the entries are consumed.
+        """
+        if self.query is not None:
+            for entry in self.ice_client.search(
+                self.query,
+                batch_size=batch_size,
+                entry_types=self.entry_types,
+                sort_field=self.sort_field,
+                sort_ascending=False,
+                as_iterator=True,
+            ):
+                yield entry
+            return
+        offset = 0
+        while True:
+            page = self._fetch_page(offset, batch_size)
+            for entry in page:
+                yield entry
+            if len(page) < batch_size:
+                return
+            offset += batch_size
+
+    def _iter_changes(self):
+        """Yield the changed entries, from the most recent one."""
+        for entry in self._iter_entries(self.batch_size):
+            modification_time = entry["modificationTime"]
+            if self.watermark is not None:
+                if modification_time < self.watermark:
+                    return
+                if (modification_time == self.watermark) and (
+                    entry["id"] in self.watermark_ids
+                ):
+                    continue
+            yield entry
+
+    def _advance(self, entry):
+        modification_time = entry["modificationTime"]
+        if (self.watermark is None) or (modification_time > self.watermark):
+            self.watermark = modification_time
+            self.watermark_ids = set()
+        if modification_time == self.watermark:
+            self.watermark_ids.add(entry["id"])
+
+    def poll(self):
+        """Yield the events for the entries changed since the last poll.
+
+        Each event is a dict with keys "event" ("created" or "modified"),
+        "entry_id", "modification_time" and "entry" (the entry infos from
+        the listing). An event is only marked as processed when the next
+        event is requested, so events can be re-emitted (never lost) if the
+        consumer crashes.
+        """
+        if (self.watermark is None) and (self.start == "now"):
+            latest_entry = next(self._iter_entries(batch_size=1), None)
+            if latest_entry is not None:
+                self._advance(latest_entry)
+            self.save_state()
+            return
+        previous_watermark = self.watermark
+        changes, seen_ids = [], set()
+        for entry in self._iter_changes():
+            # Entries can be listed twice if others are modified meanwhile.
+            if entry["id"] not in seen_ids:
+                seen_ids.add(entry["id"])
+                changes.append(entry)
+        changes.sort(key=lambda e: (e["modificationTime"], e["id"]))
+        for entry in changes:
+            created = (previous_watermark is None) or (
+                entry.get("creationTime", 0) > previous_watermark
+            )
+            yield dict(
+                event="created" if created else "modified",
+                entry_id=entry["id"],
+                modification_time=entry["modificationTime"],
+                entry=entry,
+            )
+            self._advance(entry)
+            self.save_state()
+
+    def watch(self, callback, interval=60, max_polls=None):
+        """Poll ICE forever (or ``max_polls`` times), calling the callback.
+
+        Parameters
+        ----------
+
+        callback
+          Function ``callback(event)`` called for every event (see
+          ``poll``).
+
+        interval
+          Time in seconds between the start of successive polls.
+
+        max_polls
+          If provided, the watcher stops after that many polls.
+        """
+        polls = 0
+        while (max_polls is None) or (polls < max_polls):
+            poll_start = time.time()
+            for event in self.poll():
+                callback(event)
+            polls += 1
+            if (max_polls is None) or (polls < max_polls):
+                time.sleep(max(0, interval - (time.time() - poll_start)))
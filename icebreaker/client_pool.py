@@ -0,0 +1,109 @@
+"""Pool of IceClients for multi-threaded servers."""
+
+import queue
+import threading
+from contextlib import contextmanager
+
+from .IceClient import IceClient
+
+
+class IceClientPool:
+    """Pool of IceClients sharing one authentication, cache and metrics.
+
+    The first client is created (and authenticated) once. The other clients
+    are copies of it (see ``IceClient.copy``), created on demand, so
+    checking out a client never costs a request to ICE. The pool bounds the
+    number of clients in use at the same time, and each client (used by one
+    thread at a time) keeps its own HTTP sessions open between requests.
+    Use ``close()`` to close the sessions of all clients.
+
+    Examples
+    --------
+
+    >>> pool = IceClientPool("config.yml", size=8, cache="sqlite")
+    >>> # In a request handler:
+    >>> with pool.client() as ice:
+    >>>     ice.get_part_infos(part_id)
+
+    Parameters
+    ----------
+
+    config
+      Configuration of the clients (see ``IceClient``). Can be None if an
+      ``ice_client`` is provided.
+
+    size
+      Maximal number of clients in use at the same time.
+
+    ice_client
+      Optional existing client to use as the first client of the pool.
+
+    **client_kwargs
+      Other parameters of the first client, e.g. ``cache``,
+      ``rate_limiter`` or ``scheduler``, shared by all clients.
+    """
+
+    def __init__(self, config=None, size=8, ice_client=None, **client_kwargs):
+        if ice_client is None:
+            client_kwargs.setdefault("logger", None)
+            ice_client = IceClient(config, **client_kwargs)
+        self.base_client = ice_client
+        self.size = size
+        # Last-in, first-out: the most recently used clients are reused.
+        self.available = queue.LifoQueue()
+        self.available.put(ice_client)
+        self.clients = [ice_client]
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Check out a client, waiting if all clients are in use.
+
+        Raises an IOError if no client is available after ``timeout``
+        seconds.
+        """
+        try:
+            return self.available.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if len(self.clients) < self.size:
+                new_client = self.base_client.copy()
+                self.clients.append(new_client)
+                return new_client
+        try:
+            return self.available.get(timeout=timeout)
+        except queue.Empty:
+            raise IOError("No IceClient available after %s s." % timeout)
+
+    def release(self, ice_client):
+        """Return a checked-out client to the pool."""
+        self.available.put(ice_client)
+
+    @contextmanager
+    def client(self, timeout=None):
+        """Context manager checking out a client, then returning it."""
+        ice_client = self.acquire(timeout=timeout)
+        try:
+            yield ice_client
+        finally:
+            self.release(ice_client)
+
+    def close(self):
+        """Close the HTTP sessions of all the clients of the pool."""
+        with self.lock:
+            clients = list(self.clients)
+        for ice_client in clients:
+            ice_client.close()
+
+    def get_metrics(self):
+        """Return the clients' shared metrics, and the pool usage."""
+        metrics = self.base_client.get_metrics()
+        with self.lock:
+            created = len(self.clients)
+        available = self.available.qsize()
+        metrics["pool"] = dict(
+            size=self.size,
+            clients=created,
+            in_use=created - available,
+        )
+        return metrics
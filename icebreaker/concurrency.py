@@ -0,0 +1,166 @@
+"""Adaptive limitation of the number of concurrent requests sent to ICE."""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limit on the number of in-flight requests, adapted to ICE's health.
+
+    The limit follows an AIMD (additive increase, multiplicative decrease)
+    scheme. It grows by one every ``limit`` successful requests as long as
+    the smoothed latency stays close to the baseline (lowest) latency, and
+    is multiplied by ``backoff`` when the latency rises above
+    ``latency_tolerance`` times the baseline (and by more than
+    ``latency_margin``), or when a request fails (server errors, 429,
+    connection errors).
+
+    Requests above the current limit wait for a slot, so bulk operations
+    can use many threads (e.g. ``max_workers=limiter.max_limit``) and let
+    the limiter decide how many requests are actually sent at once.
+
+    Examples
+    --------
+
+    >>> limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=32)
+    >>> ice = IceClient(config, concurrency_limiter=limiter)
+    >>> ice.get_records(part_ids, max_workers=limiter.max_limit)
+    >>> limiter.get_metrics()["limit"]
+
+    Parameters
+    ----------
+
+    initial_limit
+      Number of concurrent requests allowed at the start.
+
+    min_limit, max_limit
+      Bounds of the limit.
+
+    latency_tolerance
+      Ratio of the smoothed latency to the baseline latency above which
+      the limit is decreased.
+
+    latency_margin
+      Minimal latency increase (in seconds) above the baseline for the
+      limit to be decreased, so that the jitter of very fast requests is
+      ignored.
+
+    backoff
+      Factor applied to the limit on errors and high latencies.
+
+    smoothing
+      Weight of the latest request in the smoothed (moving average)
+      latency.
+    """
+
+    def __init__(
+        self,
+        initial_limit=4,
+        min_limit=1,
+        max_limit=32,
+        latency_tolerance=2.0,
+        latency_margin=0.05,
+        backoff=0.7,
+        smoothing=0.2,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.latency_margin = latency_margin
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.smoothed_latency = None
+        self.baseline_latency = None
+        self.requests = 0
+        self.errors = 0
+        self.decreases = 0
+        self._completions_since_decrease = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Wait for a request slot. Return the time waited."""
+        start = time.time()
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+        return time.time() - start
+
+    def release(self, latency, error=False):
+        """Free a slot, and adapt the limit to the request's outcome."""
+        with self.condition:
+            self.in_flight -= 1
+            self.requests += 1
+            self._completions_since_decrease += 1
+            if error:
+                self.errors += 1
+                self._decrease()
+            else:
+                self._update_latencies(latency)
+                smoothed = self.smoothed_latency
+                baseline = self.baseline_latency
+                too_slow = (smoothed > self.latency_tolerance * baseline) and (
+                    smoothed - baseline > self.latency_margin
+                )
+                if too_slow:
+                    self._decrease()
+                else:
+                    self.limit = min(
+                        self.max_limit, self.limit + 1.0 / int(self.limit)
+                    )
+            self.condition.notify_all()
+
+    def _update_latencies(self, latency):
+        if self.smoothed_latency is None:
+            self.smoothed_latency = self.baseline_latency = latency
+            return
+        self.smoothed_latency += self.smoothing * (
+            latency - self.smoothed_latency
+        )
+        if self.smoothed_latency < self.baseline_latency:
+            self.baseline_latency = self.smoothed_latency
+        else:
+            # Slow drift, so that the baseline follows lasting changes.
+            self.baseline_latency += 0.01 * (
+                self.smoothed_latency - self.baseline_latency
+            )
+
+    def _decrease(self):
+        # At most one decrease per "round" of requests at the current limit,
+        # so that the responses of one slow period don't collapse the limit.
+        if self._completions_since_decrease < int(self.limit):
+            return
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self.decreases += 1
+        self._completions_since_decrease = 0
+
+    @contextmanager
+    def slot(self):
+        """Context manager holding a slot during a request.
+
+        Exceptions raised in the block count as errors.
+        """
+        self.acquire()
+        start = time.time()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            self.release(time.time() - start, error=error)
+
+    def get_metrics(self):
+        """Return a dict with the current limit and requests statistics."""
+        with self.condition:
+            return dict(
+                limit=int(self.limit),
+                in_flight=self.in_flight,
+                requests=self.requests,
+                errors=self.errors,
+                decreases=self.decreases,
+                smoothed_latency=self.smoothed_latency,
+                baseline_latency=self.baseline_latency,
+            )
@@ -0,0 +1,279 @@
+"""Detection of parts with identical or near-identical sequences."""
+
+import hashlib
+from collections import defaultdict
+from itertools import combinations
+
+import numpy
+import pandas
+import proglog
+
+from .kmer_index import _as_array, _reverse_complement, sequence_kmers
+from .sequence_store import genbank_bases
+
+_HASHES_SEEDS = numpy.random.RandomState(42).randint(
+    0, 2 ** 63, size=1024, dtype="uint64"
+)
+
+
+def _mix_hash(values):
+    """Return well-distributed 64-bit hashes of uint64 values (splitmix64)."""
+    values = values.copy()
+    with numpy.errstate(over="ignore"):
+        values ^= values >> numpy.uint64(30)
+        values *= numpy.uint64(0xBF58476D1CE4E5B9)
+        values ^= values >> numpy.uint64(27)
+        values *= numpy.uint64(0x94D049BB133111EB)
+        values ^= values >> numpy.uint64(31)
+    return values
+
+
+def _least_rotation_start(sequence):
+    """Return the start of the lexicographically smallest rotation.
+
+    Uses Booth's algorithm, which is linear in the sequence length.
+    """
+    doubled = sequence + sequence
+    failure = [-1] * len(doubled)
+    k = 0
+    for j in range(1, len(doubled)):
+        i = failure[j - k - 1]
+        while i != -1 and doubled[j] != doubled[k + i + 1]:
+            if doubled[j] < doubled[k + i + 1]:
+                k = j - i - 1
+            i = failure[i]
+        if i == -1 and doubled[j] != doubled[k + i + 1]:
+            if doubled[j] < doubled[k + i + 1]:
+                k = j
+            failure[j - k] = -1
+        else:
+            failure[j - k] = i + 1
+    return k
+
+
+def _smallest_rotation(sequence, k=16, max_candidates=32):
+    """Return the lexicographically smallest rotation of a sequence.
+
+    The smallest rotation starts with the smallest circular k-mer, which
+    is found in vectorized form. The (usually very few) rotations starting
+    with that k-mer are then compared directly. Booth's algorithm is used
+    for sequences with non-ACGT characters or too many candidates.
+    """
+    if len(sequence) == 0:
+        return sequence
+    kmers, positions = sequence_kmers(_as_array(sequence), k, circular=True)
+    if len(kmers) == len(sequence):
+        candidates = positions[kmers == kmers.min()]
+        if len(candidates) <= max_candidates:
+            return min(sequence[i:] + sequence[:i] for i in candidates)
+    start = _least_rotation_start(sequence)
+    return sequence[start:] + sequence[:start]
+
+
+def canonical_sequence(sequence, circular=False):
+    """Return a strand-independent (and rotation-independent) sequence.
+
+    Two parts have the same canonical sequence if and only if their
+    sequences are identical up to reverse-complementation and, for circular
+    parts, up to a change of origin.
+    """
+    sequence = sequence.upper()
+    reverse = _reverse_complement(sequence)
+    if circular:
+        return min(_smallest_rotation(sequence), _smallest_rotation(reverse))
+    return min(sequence, reverse)
+
+
+def sequence_identity_hash(sequence, circular=False):
+    """Return a hash of the canonical sequence and topology of a part."""
+    topology = "circular" if circular else "linear"
+    canonical = topology + ":" + canonical_sequence(sequence, circular)
+    return hashlib.sha1(canonical.encode("ascii")).hexdigest()
+
+
+def minhash_signature(sequence, circular=False, k=16, num_hashes=64):
+    """Return the MinHash signature of the k-mers of both strands.
+
+    The proportion of equal values in the signatures of two sequences is
+    an estimate of the Jaccard similarity of their sets of k-mers. Returns
+    None for sequences without k-mers.
+    """
+    sequence = sequence.upper()
+    forward, _ = sequence_kmers(_as_array(sequence), k, circular)
+    reverse = _as_array(_reverse_complement(sequence))
+    reverse, _ = sequence_kmers(reverse, k, circular)
+    kmers = numpy.unique(numpy.concatenate([forward, reverse]))
+    if len(kmers) == 0:
+        return None
+    seeds = _HASHES_SEEDS[:num_hashes, None]
+    hashes = _mix_hash(kmers.astype("uint64")[None, :] ^ seeds)
+    return hashes.min(axis=1)
+
+
+def _iter_parts_sequences(
+    ice_client, collection, sequence_store, names, max_workers
+):
+    """Yield ``(part_id, sequence, is_circular)`` for all parts."""
+    if sequence_store is not None:
+        for part_id in sequence_store.parts_ids:
+            yield (
+                part_id,
+                sequence_store.get_sequence(part_id),
+                sequence_store.is_circular(part_id),
+            )
+        return
+    entries = ice_client.get_collection_entries(
+        collection,
+        as_iterator=True,
+        batch_size=100,
+        fields=["id", "name"],
+        max_workers=max_workers,
+    )
+
+    def parts_ids():
+        for entry in entries:
+            names[entry["id"]] = entry.get("name")
+            yield entry["id"]
+
+    genbanks = ice_client.iter_sequences(parts_ids(), max_workers=max_workers)
+    for part_id, genbank in genbanks:
+        if genbank is not None:
+            sequence, circular = genbank_bases(genbank)
+            yield part_id, sequence, circular
+
+
+def find_duplicate_parts(
+    ice_client=None,
+    collection="SHARED",
+    sequence_store=None,
+    near_duplicates_threshold=None,
+    kmer_size=16,
+    num_hashes=64,
+    bands=16,
+    max_workers=4,
+    logger="bar",
+):
+    """Find the parts of a collection with identical or similar sequences.
+
+    Identical parts are grouped in a single pass, using a hash of their
+    canonical sequence (see ``canonical_sequence``), which detects the
+    duplicates registered on the other strand or, for circular constructs,
+    with a different origin. Near-duplicates can also be detected by
+    comparing MinHash signatures of the parts' k-mers, with locality
+    sensitive hashing to only compare likely-similar parts.
+
+    Examples
+    --------
+
+    >>> duplicates = find_duplicate_parts(ice, collection="SHARED")
+    >>> duplicates.to_csv("duplicates.csv")
+
+    Parameters
+    ----------
+
+    ice_client, collection
+      The sequences of all parts of the collection are downloaded
+      concurrently from ICE.
+
+    sequence_store
+      Alternatively, a ``SequenceStore`` with the sequences of the parts.
+
+    near_duplicates_threshold
+      If provided (e.g. 0.9), pairs of parts with an estimated k-mer
+      Jaccard similarity above this threshold are also reported.
+
+    kmer_size, num_hashes, bands
+      Parameters of the MinHash signatures. Pairs of parts are compared if
+      they have at least one of ``bands`` bands of their signature in
+      common.
+
+    max_workers
+      Number of sequences downloaded concurrently from ICE.
+
+    logger
+      Either None, "bar" for a progress bar, or a Proglog logger.
+
+    Returns
+    -------
+
+    duplicates
+      A dataframe with one row per duplicate, with columns part_id, name,
+      duplicate_of, duplicate_of_name, kind ("identical" or
+      "near-identical") and similarity. For each group of identical parts,
+      the part with the smallest ID is the one others are duplicates of.
+    """
+    logger = proglog.default_bar_logger(logger)
+    names = {}
+    if sequence_store is not None:
+        names = {
+            part_id: sequence_store.index[str(part_id)][3]
+            for part_id in sequence_store.parts_ids
+        }
+    groups = defaultdict(list)
+    signatures = {}
+    parts_sequences = _iter_parts_sequences(
+        ice_client, collection, sequence_store, names, max_workers
+    )
+    for part_id, sequence, circular in logger.iter_bar(part=parts_sequences):
+        groups[sequence_identity_hash(sequence, circular)].append(part_id)
+        if near_duplicates_threshold is not None:
+            signature = minhash_signature(
+                sequence, circular, k=kmer_size, num_hashes=num_hashes
+            )
+            if signature is not None:
+                signatures[part_id] = signature
+
+    rows = []
+    representatives = {}
+    for parts_ids in groups.values():
+        parts_ids = sorted(parts_ids)
+        for part_id in parts_ids:
+            representatives[part_id] = parts_ids[0]
+        for part_id in parts_ids[1:]:
+            rows.append((part_id, parts_ids[0], "identical", 1.0))
+
+    if near_duplicates_threshold is not None:
+        # Only one part of each group of identical parts is compared
+        signatures = {
+            part_id: signature
+            for part_id, signature in signatures.items()
+            if representatives[part_id] == part_id
+        }
+        rows_per_band = num_hashes // bands
+        buckets = defaultdict(list)
+        for part_id, signature in signatures.items():
+            for band in range(bands):
+                start = band * rows_per_band
+                key = signature[start : start + rows_per_band].tobytes()
+                buckets[(band, key)].append(part_id)
+        compared_pairs = set()
+        for bucket in buckets.values():
+            for pair in combinations(sorted(bucket), 2):
+                if pair in compared_pairs:
+                    continue
+                compared_pairs.add(pair)
+                part_1, part_2 = pair
+                similarity = numpy.mean(
+                    signatures[part_1] == signatures[part_2]
+                )
+                if similarity >= near_duplicates_threshold:
+                    rows.append(
+                        (part_2, part_1, "near-identical", float(similarity))
+                    )
+    rows = [
+        (part_id, names.get(part_id), other, names.get(other), kind, score)
+        for (part_id, other, kind, score) in sorted(
+            rows, key=lambda row: (row[1], row[0])
+        )
+    ]
+    return pandas.DataFrame(
+        rows,
+        columns=[
+            "part_id",
+            "name",
+            "duplicate_of",
+            "duplicate_of_name",
+            "kind",
+            "similarity",
+        ],
+    )
@@ -0,0 +1,189 @@
+"""Columnar tables of the features (annotations) of many ICE records.
+
+A features table has one row per feature, with columns part_id, type,
+label, start, end, strand and qualifiers (JSON). Once written to Parquet,
+queries like "all parts carrying KanR" run locally, without ICE requests.
+"""
+
+import json
+from itertools import islice
+
+import proglog
+
+from .tables import table_writer
+from .tools import ice_genbank_to_record, iter_parallel_processes
+
+FEATURES_COLUMNS = (
+    "part_id",
+    "type",
+    "label",
+    "start",
+    "end",
+    "strand",
+    "qualifiers",
+)
+
+FEATURES_COLUMNS_TYPES = {
+    "part_id": "int",
+    "type": "str",
+    "label": "str",
+    "start": "int",
+    "end": "int",
+    "strand": "int",
+    "qualifiers": "str",
+}
+
+LABEL_QUALIFIERS = ("label", "gene", "product", "name", "note")
+
+
+def feature_label(feature):
+    """Return the label of a Biopython feature, or None."""
+    for qualifier in LABEL_QUALIFIERS:
+        values = feature.qualifiers.get(qualifier, None)
+        if values:
+            return values[0] if isinstance(values, list) else str(values)
+    return None
+
+
+def genbank_features_rows(part_id_and_genbank):
+    """Return the features table rows of a ``(part_id, genbank)`` pair.
+
+    This is a top-level function so that it can run in worker processes.
+    """
+    part_id, genbank = part_id_and_genbank
+    record = ice_genbank_to_record(genbank)
+    return [
+        [
+            part_id,
+            feature.type,
+            feature_label(feature),
+            int(feature.location.start),
+            int(feature.location.end),
+            feature.location.strand,
+            json.dumps(feature.qualifiers, sort_keys=True),
+        ]
+        for feature in record.features
+    ]
+
+
+def write_features_table(
+    target,
+    ice_client=None,
+    parts_ids=None,
+    genbanks=None,
+    processes=None,
+    chunk_size=20,
+    max_workers=4,
+    batch_size=5000,
+    logger="bar",
+):
+    """Write the features of many records in a Parquet (or other) table.
+
+    The records are downloaded concurrently in threads, while their
+    Genbank parsing runs in a pool of processes, and the rows are streamed
+    to the target file by batches.
+
+    Examples
+    --------
+
+    >>> entries = ice.get_collection_entries("SHARED", as_iterator=True)
+    >>> write_features_table("features.parquet", ice,
+    >>>                      parts_ids=(e["id"] for e in entries))
+    >>> read_features_table("features.parquet", label="KanR")
+
+    Parameters
+    ----------
+
+    target
+      Path to the file to write, preferably ``.parquet``. Other formats
+      supported by ``tables.table_writer`` can be used.
+
+    ice_client, parts_ids
+      The records of these parts are downloaded from ICE. The client can
+      also be an OfflineIceClient.
+
+    genbanks
+      Alternatively, an iterable of ``(part_id, genbank_text)``, e.g.
+      ``IceMirror.iter_sequences()``.
+
+    processes
+      Number of processes parsing the records (default: number of CPUs).
+
+    chunk_size
+      Number of records sent at once to a process.
+
+    max_workers
+      Number of records downloaded concurrently from ICE.
+
+    batch_size
+      Number of rows written to the file at the same time.
+
+    logger
+      Either None, "bar" for a progress bar, or a Proglog logger.
+
+    Returns
+    -------
+
+    rows_written
+      The total number of features written.
+    """
+    logger = proglog.default_bar_logger(logger)
+    if genbanks is None:
+        genbanks = ice_client.iter_sequences(
+            parts_ids, max_workers=max_workers
+        )
+    genbanks = (pair for pair in genbanks if pair[1] is not None)
+    records_rows = iter_parallel_processes(
+        genbank_features_rows,
+        genbanks,
+        processes=processes,
+        chunk_size=chunk_size,
+    )
+    rows = (row for rows in logger.iter_bar(part=records_rows) for row in rows)
+    writer = table_writer(
+        target, columns=FEATURES_COLUMNS, columns_types=FEATURES_COLUMNS_TYPES
+    )
+    with writer:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if len(batch) == 0:
+                break
+            writer.write_rows(batch)
+    return writer.rows_written
+
+
+def read_features_table(path, label=None, feature_type=None, part_ids=None):
+    """Return a dataframe of the (matching) features of a Parquet table.
+
+    The filters are applied by pyarrow while reading the file, so only the
+    matching rows are loaded in memory.
+
+    Examples
+    --------
+
+    >>> kanr = read_features_table("features.parquet", label="KanR")
+    >>> parts_with_kanr = set(kanr.part_id)
+
+    Parameters
+    ----------
+
+    path
+      Path to a features table written with ``write_features_table``.
+
+    label, feature_type, part_ids
+      If provided, only the features with this label, this type (e.g.
+      "promoter"), or from these parts are returned.
+    """
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Install pyarrow to read Parquet tables.")
+    filters = []
+    if label is not None:
+        filters.append(("label", "=", label))
+    if feature_type is not None:
+        filters.append(("type", "=", feature_type))
+    if part_ids is not None:
+        filters.append(("part_id", "in", list(part_ids)))
+    table = pyarrow.parquet.read_table(path, filters=filters or None)
+    return table.to_pandas()
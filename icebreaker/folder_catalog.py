@@ -0,0 +1,263 @@
+"""Local caches of the folders of an ICE instance and of their entries."""
+
+import threading
+import time
+
+import proglog
+
+from .tools import did_you_mean, iter_parallel
+
+DEFAULT_COLLECTIONS = ("PERSONAL", "SHARED")
+
+
+class FolderCatalog:
+    """Cache of the folders of some collections, refreshed after a TTL.
+
+    Folder name -> ID and ID -> infos lookups are answered from the cache,
+    without requests, and the cache is re-fetched (one request per
+    collection, concurrently) when it is older than ``ttl`` seconds.
+    Every IceClient has a catalog, ``ice_client.folder_catalog``, which is
+    updated when the client creates or deletes folders.
+
+    Examples
+    --------
+
+    >>> catalog = FolderCatalog(ice, ttl=600)
+    >>> catalog.get_folder_id("PRIMERS", collection="SHARED")
+
+    Parameters
+    ----------
+
+    ice_client
+      The IceClient used to fetch the folders.
+
+    collections
+      The collections whose folders are cached.
+
+    ttl
+      Time in seconds after which the cache is refreshed. Use 0 to always
+      fetch the folders, or None to never refresh automatically.
+    """
+
+    def __init__(self, ice_client, collections=DEFAULT_COLLECTIONS, ttl=300):
+        self.ice_client = ice_client
+        self.collections = tuple(collections)
+        self.ttl = ttl
+        self.last_refresh = None
+        self.folders_by_id = {}
+        self.collections_folders_ids = {}
+        self.lock = threading.RLock()
+
+    def refresh(self):
+        """Re-fetch the folders of all collections of the catalog."""
+
+        def fetch(collection):
+            return collection, self.ice_client.get_collection_folders(
+                collection
+            )
+
+        collections_folders = list(
+            iter_parallel(fetch, self.collections, max_workers=4)
+        )
+        with self.lock:
+            self.folders_by_id = {}
+            self.collections_folders_ids = {}
+            for collection, folders in collections_folders:
+                for folder in folders:
+                    self.folders_by_id[folder["id"]] = folder
+                self.collections_folders_ids[collection] = [
+                    folder["id"] for folder in folders
+                ]
+            self.last_refresh = time.time()
+
+    def _ensure_fresh(self):
+        with self.lock:
+            is_stale = (self.last_refresh is None) or (
+                (self.ttl is not None)
+                and (time.time() - self.last_refresh >= self.ttl)
+            )
+            if is_stale:
+                self.refresh()
+
+    def invalidate(self):
+        """Force a refresh at the next lookup."""
+        with self.lock:
+            self.last_refresh = None
+
+    def get_collection_folders(self, collection):
+        """Return the (cached) list of the folders of a collection."""
+        if collection not in self.collections:
+            return self.ice_client.get_collection_folders(collection)
+        self._ensure_fresh()
+        with self.lock:
+            return [
+                self.folders_by_id[folder_id]
+                for folder_id in self.collections_folders_ids[collection]
+            ]
+
+    def get_folder_infos(self, folder_id, refresh=False):
+        """Return the infos of a folder, fetched from ICE if not cached.
+
+        With ``refresh=True``, the infos are always fetched from ICE (and
+        updated in the cache), e.g. before relying on the folder's type.
+        """
+        self._ensure_fresh()
+        with self.lock:
+            folder = self.folders_by_id.get(folder_id, None)
+        if refresh or (folder is None):
+            folder = self.ice_client.get_folder_infos(folder_id)
+            with self.lock:
+                self.folders_by_id[folder_id] = folder
+        return folder
+
+    def get_folder_id(self, name, collection=None):
+        """Return the ID of the folder with the given name.
+
+        Parameters
+        ----------
+
+        name
+          Name of the folder.
+
+        collection
+          Collection (or tuple of collections) of the folder. By default,
+          all the collections of the catalog are searched.
+
+        If no folder has this name, the catalog is refreshed once (unless
+        it just was) in case the folder was created since the last refresh.
+        Raises an IOError if no folder or several folders have this name.
+        """
+        if collection is None:
+            collection = self.collections
+        if not isinstance(collection, (tuple, list)):
+            collection = [collection]
+        last_refresh = self.last_refresh
+        folders, folder_ids = self._find_folders(name, collection)
+        if (len(folder_ids) == 0) and (self.last_refresh == last_refresh):
+            self.refresh()
+            folders, folder_ids = self._find_folders(name, collection)
+        if len(folder_ids) == 0:
+            error = "No folder named %s." % name
+            names = set(f["folderName"] for f in folders)
+            suggestions = did_you_mean(name, names)
+            if len(suggestions):
+                error += " Suggestions: %s." % ", ".join(suggestions)
+            raise IOError(error)
+        if len(folder_ids) > 1:
+            raise IOError(
+                "Found several folders named %s, with IDs %s."
+                % (name, ", ".join([str(d) for d in folder_ids]))
+            )
+        return folder_ids[0]
+
+    def _find_folders(self, name, collections):
+        """Return the collections' folders and the IDs of those named so."""
+        folders = [
+            folder
+            for collection in collections
+            for folder in self.get_collection_folders(collection)
+        ]
+        folder_ids = sorted(
+            set(f["id"] for f in folders if f["folderName"] == name)
+        )
+        return folders, folder_ids
+
+    def add_folder(self, folder, collection="PERSONAL"):
+        """Add a (newly created) folder to the catalog."""
+        with self.lock:
+            self.folders_by_id[folder["id"]] = folder
+            if collection in self.collections_folders_ids:
+                self.collections_folders_ids[collection].append(folder["id"])
+
+    def remove_folder(self, folder_id):
+        """Remove a (deleted) folder from the catalog."""
+        with self.lock:
+            self.folders_by_id.pop(folder_id, None)
+            for folders_ids in self.collections_folders_ids.values():
+                if folder_id in folders_ids:
+                    folders_ids.remove(folder_id)
+
+
+class FolderMembershipIndex:
+    """Index of which parts are in which folders.
+
+    The entries of all folders are listed concurrently, after which the
+    folders of any part are known without requests.
+
+    Examples
+    --------
+
+    >>> index = FolderMembershipIndex.from_collection(ice, "SHARED")
+    >>> index.get_part_folders_ids(1234)
+
+    Parameters
+    ----------
+
+    folders_entries
+      A dict ``{folder_id: [entry_id, ...]}``.
+    """
+
+    def __init__(self, folders_entries=None):
+        self.folders_entries = {}
+        self.parts_folders = {}
+        for folder_id, entries_ids in (folders_entries or {}).items():
+            self.add_entries(folder_id, entries_ids)
+
+    @classmethod
+    def from_folders(
+        cls, ice_client, folder_ids, max_workers=4, logger=None
+    ):
+        """Build the index of the given folders (listed concurrently)."""
+        logger = proglog.default_bar_logger(logger)
+
+        def list_entries(folder_id):
+            entries = ice_client.get_folder_entries(
+                folder_id, batch_size=100, fields=["id"]
+            )
+            return folder_id, [entry["id"] for entry in entries]
+
+        folders_entries = iter_parallel(
+            list_entries, folder_ids, max_workers=max_workers
+        )
+        return cls(dict(logger.iter_bar(folder=folders_entries)))
+
+    @classmethod
+    def from_collection(
+        cls, ice_client, collection="SHARED", max_workers=4, logger=None
+    ):
+        """Build the index of all folders of a collection."""
+        folders = ice_client.folder_catalog.get_collection_folders(collection)
+        return cls.from_folders(
+            ice_client,
+            [folder["id"] for folder in folders],
+            max_workers=max_workers,
+            logger=logger,
+        )
+
+    def add_entries(self, folder_id, entries_ids):
+        """Record that some entries are in a folder."""
+        folder_entries = self.folders_entries.setdefault(folder_id, set())
+        for entry_id in entries_ids:
+            folder_entries.add(entry_id)
+            self.parts_folders.setdefault(entry_id, set()).add(folder_id)
+
+    def remove_entries(self, folder_id, entries_ids):
+        """Record that some entries were removed from a folder."""
+        for entry_id in entries_ids:
+            self.folders_entries.get(folder_id, set()).discard(entry_id)
+            self.parts_folders.get(entry_id, set()).discard(folder_id)
+
+    def get_part_folders_ids(self, part_id):
+        """Return the sorted IDs of the indexed folders containing a part."""
+        return sorted(self.parts_folders.get(part_id, ()))
+
+    def get_parts_folders_ids(self, part_ids):
+        """Return a dict ``{part_id: [folder_id, ...]}`` for many parts."""
+        return {
+            part_id: self.get_part_folders_ids(part_id)
+            for part_id in part_ids
+        }
+
+    def get_folder_entries_ids(self, folder_id):
+        """Return the sorted IDs of the entries of an indexed folder."""
+        return sorted(self.folders_entries.get(folder_id, ()))
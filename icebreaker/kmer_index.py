@@ -0,0 +1,265 @@
+"""Local k-mer index of part sequences, for fast subsequence search."""
+
+import numpy
+import proglog
+
+from .sequence_store import genbank_bases
+
+_CODES = numpy.full(256, 4, dtype="uint8")
+for _code, _base in enumerate("ACGT"):
+    _CODES[ord(_base)] = _CODES[ord(_base.lower())] = _code
+
+_COMPLEMENTS = str.maketrans("ATGCatgc", "TACGtacg")
+
+
+def _reverse_complement(sequence):
+    return sequence.translate(_COMPLEMENTS)[::-1]
+
+
+def _as_array(sequence):
+    """Return an uppercase uint8 array of a string, bytes or array."""
+    if isinstance(sequence, str):
+        sequence = sequence.upper().encode("ascii")
+    return numpy.frombuffer(sequence, dtype="uint8")
+
+
+def sequence_kmers(sequence, k, circular=False):
+    """Return the 2-bit encoded k-mers of a sequence, and their positions.
+
+    ``sequence`` is a uint8 array (see ``_as_array``). The k-mers are
+    uint32 integers for k <= 16, else uint64. The k-mers containing
+    non-ACGT characters are discarded. For circular sequences, the k-mers
+    spanning the origin are included.
+    """
+    dtype = "uint32" if k <= 16 else "uint64"
+    length = len(sequence)
+    if circular and length > 0:
+        extra = numpy.resize(sequence, k - 1)
+        sequence = numpy.concatenate([sequence, extra])
+    n_kmers = length if circular else len(sequence) - k + 1
+    if n_kmers <= 0:
+        return numpy.zeros(0, dtype=dtype), numpy.zeros(0, dtype="int32")
+    codes = _CODES[sequence]
+    kmers = numpy.zeros(n_kmers, dtype=dtype)
+    for i in range(k):
+        kmers <<= 2
+        kmers |= (codes[i : i + n_kmers] & 3).astype(dtype)
+    # Discard the k-mers containing non-ACGT characters
+    invalid = numpy.concatenate([[0], numpy.cumsum(codes == 4)])
+    valid = (invalid[k : k + n_kmers] - invalid[:n_kmers]) == 0
+    positions = numpy.arange(n_kmers, dtype="int32")
+    return kmers[valid], positions[valid]
+
+
+class KmerIndex:
+    """Index of the k-mers of many part sequences.
+
+    The index answers "which parts contain this subsequence, and where" in
+    a few milliseconds: the rarest k-mer of the query is looked up in a
+    sorted array of all k-mers, and the candidate locations are verified
+    with vectorized comparisons. Both strands are searched, and the k-mers
+    spanning the origin of circular sequences are indexed.
+
+    Parts can be added, updated or removed at any time, the sorted array is
+    rebuilt at the next query.
+
+    Examples
+    --------
+
+    >>> store = SequenceStore("shared_collection")
+    >>> index = KmerIndex.from_sequence_store(store)
+    >>> index.find("ATGCGTAGTCGTAGCTAGCTAG")
+    >>> # => [{"part_id": 1234, "position": 850, "strand": -1}, ...]
+
+    Parameters
+    ----------
+
+    k
+      Length of the indexed k-mers (at most 32). Queries must be at least
+      ``k`` bases long. Small values make bigger candidates lists, large
+      values use more memory (k-mers above 16 are stored on 64 bits).
+    """
+
+    def __init__(self, k=12):
+        if not 1 <= k <= 32:
+            raise ValueError("k should be between 1 and 32, not %s." % k)
+        self.k = k
+        self.dtype = "uint32" if k <= 16 else "uint64"
+        self.parts = {}
+        self._sorted = None
+
+    # BUILDING THE INDEX
+
+    @classmethod
+    def from_sequence_store(cls, store, k=12, logger=None):
+        """Return the index of all parts of a ``SequenceStore``."""
+        index = cls(k=k)
+        logger = proglog.default_bar_logger(logger)
+        for part_id in logger.iter_bar(part=store.parts_ids):
+            index.add(
+                part_id,
+                store.get_array(part_id),
+                circular=store.is_circular(part_id),
+            )
+        return index
+
+    def add(self, part_id, sequence, circular=False):
+        """Add (or replace) a part in the index.
+
+        ``sequence`` is a string, or uppercase bytes or uint8 array (for
+        instance from ``SequenceStore.get_array``, which is not copied).
+        """
+        sequence = _as_array(sequence)
+        kmers, positions = sequence_kmers(sequence, self.k, circular)
+        self.parts[part_id] = (sequence, circular, kmers, positions)
+        self._sorted = None
+
+    def remove(self, part_id):
+        """Remove a part from the index (if it is in the index)."""
+        if self.parts.pop(part_id, None) is not None:
+            self._sorted = None
+
+    def add_genbanks(self, genbanks):
+        """Add or update parts from an iterable of ``(part_id, genbank)``.
+
+        Parts with a ``None`` Genbank (no sequence) are removed.
+        """
+        for part_id, genbank in genbanks:
+            if genbank is None:
+                self.remove(part_id)
+            else:
+                sequence, circular = genbank_bases(genbank)
+                self.add(part_id, sequence, circular=circular)
+
+    def update_from_ice(self, ice_client, parts_ids, max_workers=4):
+        """Add or update parts, with sequences downloaded from ICE.
+
+        Use it to refresh the parts created or modified since the index
+        was built (see e.g. ``IceMirror.sync``).
+        """
+        genbanks = ice_client.iter_sequences(
+            parts_ids, max_workers=max_workers
+        )
+        self.add_genbanks(genbanks)
+
+    def _get_sorted_arrays(self):
+        if self._sorted is None:
+            self.parts_order = list(self.parts)
+            parts = [self.parts[part_id] for part_id in self.parts_order]
+            kmers = numpy.concatenate(
+                [numpy.zeros(0, self.dtype)] + [p[2] for p in parts]
+            )
+            positions = numpy.concatenate(
+                [numpy.zeros(0, "int32")] + [p[3] for p in parts]
+            )
+            parts_indices = numpy.repeat(
+                numpy.arange(len(parts), dtype="int32"),
+                [len(p[2]) for p in parts],
+            )
+            order = numpy.argsort(kmers, kind="stable")
+            self._sorted = (
+                kmers[order],
+                parts_indices[order],
+                positions[order],
+            )
+        return self._sorted
+
+    # QUERIES
+
+    def _find_on_strand(self, query):
+        kmers, parts_indices, positions = self._get_sorted_arrays()
+        query_array = _as_array(query)
+        query_kmers, offsets = sequence_kmers(query_array, self.k)
+        if len(query_kmers) == 0:
+            raise ValueError(
+                "The query should contain at least one stretch of %d ACGT "
+                "bases." % self.k
+            )
+        # Verification only needs the candidates of the query's rarest k-mer
+        starts = numpy.searchsorted(kmers, query_kmers, side="left")
+        ends = numpy.searchsorted(kmers, query_kmers, side="right")
+        rarest = numpy.argmin(ends - starts)
+        hits = slice(starts[rarest], ends[rarest])
+        candidate_parts = parts_indices[hits]
+        candidate_starts = positions[hits] - offsets[rarest]
+
+        query_length = len(query_array)
+        window = numpy.arange(query_length)
+        matches = []
+        for part_index in numpy.unique(candidate_parts):
+            part_id = self.parts_order[part_index]
+            sequence, circular, _, _ = self.parts[part_id]
+            length = len(sequence)
+            part_starts = candidate_starts[candidate_parts == part_index]
+            if circular:
+                if query_length > length:
+                    continue
+                part_starts = part_starts % length
+                extended = numpy.concatenate(
+                    [sequence, sequence[: query_length - 1]]
+                )
+            else:
+                part_starts = part_starts[
+                    (part_starts >= 0)
+                    & (part_starts + query_length <= length)
+                ]
+                extended = sequence
+            if len(part_starts) == 0:
+                continue
+            windows = extended[part_starts[:, None] + window]
+            found = (windows == query_array).all(axis=1)
+            for start in numpy.unique(part_starts[found]):
+                matches.append((part_id, int(start)))
+        return matches
+
+    def find(self, subsequence, both_strands=True):
+        """Return all the occurences of a subsequence in the indexed parts.
+
+        Parameters
+        ----------
+
+        subsequence
+          A sequence of at least ``k`` bases.
+
+        both_strands
+          If True, the reverse complement of the subsequence is also
+          searched.
+
+        Returns
+        -------
+
+        matches
+          A list of dicts ``{part_id:, position:, strand:}`` where position
+          is the (0-based) start of the match on the part's sequence, and
+          strand is -1 for matches of the reverse-complement. Matches on
+          circular parts can span the origin.
+        """
+        subsequence = subsequence.upper()
+        matches = [
+            dict(part_id=part_id, position=position, strand=1)
+            for part_id, position in self._find_on_strand(subsequence)
+        ]
+        reverse = _reverse_complement(subsequence)
+        if both_strands and (reverse != subsequence):
+            matches += [
+                dict(part_id=part_id, position=position, strand=-1)
+                for part_id, position in self._find_on_strand(reverse)
+            ]
+        return sorted(
+            matches, key=lambda m: (m["part_id"], m["position"], m["strand"])
+        )
+
+    def find_parts(self, subsequence, both_strands=True):
+        """Return the IDs of the parts containing the subsequence."""
+        matches = self.find(subsequence, both_strands=both_strands)
+        parts_ids = []
+        for match in matches:
+            if match["part_id"] not in parts_ids:
+                parts_ids.append(match["part_id"])
+        return parts_ids
+
+    def __len__(self):
+        return len(self.parts)
+
+    def __contains__(self, part_id):
+        return part_id in self.parts
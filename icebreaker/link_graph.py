@@ -0,0 +1,276 @@
+"""Local graph of the parent/child links between ICE parts."""
+
+from collections import deque
+
+import numpy
+import pandas
+import proglog
+
+from .tools import iter_parallel
+
+
+class PartLinkGraph:
+    """Graph of the parent/child links of ICE parts, queried locally.
+
+    In ICE, a part's infos list its children (``linkedParts``) and its
+    parents (``parents``). The graph stores each link once, as a
+    ``(parent_id, child_id)`` edge, in compressed adjacency arrays. The
+    ancestors, descendants and connected components of parts are computed
+    locally, and cached until the graph changes.
+
+    Examples
+    --------
+
+    >>> graph = PartLinkGraph.from_collection(ice, "SHARED")
+    >>> graph.get_descendants(backbone_id)
+    >>> graph.unlink_all(ice, part_ids=[1234, 1235])
+
+    Parameters
+    ----------
+
+    edges
+      An iterable of ``(parent_id, child_id)`` links.
+    """
+
+    def __init__(self, edges=()):
+        self.edges = set((parent, child) for (parent, child) in edges)
+        self._arrays = None
+        self._cache = {}
+
+    # BUILDING THE GRAPH
+
+    @classmethod
+    def from_parts_infos(cls, parts_infos):
+        """Build a graph from the infos of parts (``get_part_infos``)."""
+        edges = set()
+        for infos in parts_infos:
+            for child in infos.get("linkedParts") or []:
+                edges.add((infos["id"], child["id"]))
+            for parent in infos.get("parents") or []:
+                edges.add((parent["id"], infos["id"]))
+        return cls(edges)
+
+    @classmethod
+    def from_parts(cls, ice_client, part_ids, max_workers=4, logger=None):
+        """Build the graph of the links of some parts, fetched from ICE.
+
+        The infos of the parts are fetched concurrently.
+        """
+        logger = proglog.default_bar_logger(logger)
+        parts_infos = iter_parallel(
+            ice_client.get_part_infos, part_ids, max_workers=max_workers
+        )
+        return cls.from_parts_infos(logger.iter_bar(part=parts_infos))
+
+    @classmethod
+    def from_collection(
+        cls, ice_client, collection="SHARED", max_workers=4, logger="bar"
+    ):
+        """Build the graph of the links of all parts of a collection."""
+        entries = ice_client.get_collection_entries(
+            collection,
+            as_iterator=True,
+            batch_size=100,
+            fields=["id"],
+            max_workers=max_workers,
+        )
+        part_ids = (entry["id"] for entry in entries)
+        return cls.from_parts(
+            ice_client, part_ids, max_workers=max_workers, logger=logger
+        )
+
+    def _changed(self):
+        self._arrays = None
+        self._cache = {}
+
+    def _get_arrays(self):
+        """Return the nodes and the (CSR) children and parents arrays."""
+        if self._arrays is None:
+            edges = sorted(self.edges)
+            nodes = sorted(set(node for edge in edges for node in edge))
+            node_indices = {node: i for i, node in enumerate(nodes)}
+            parents = numpy.array(
+                [node_indices[p] for (p, c) in edges], dtype="int64"
+            )
+            children = numpy.array(
+                [node_indices[c] for (p, c) in edges], dtype="int64"
+            )
+
+            def adjacency(sources, targets):
+                order = numpy.argsort(sources, kind="stable")
+                counts = numpy.bincount(sources, minlength=len(nodes))
+                indptr = numpy.concatenate([[0], numpy.cumsum(counts)])
+                return indptr, targets[order]
+
+            self._arrays = dict(
+                nodes=nodes,
+                node_indices=node_indices,
+                children=adjacency(parents, children),
+                parents=adjacency(children, parents),
+            )
+        return self._arrays
+
+    # QUERIES
+
+    def _neighbours(self, part_id, direction):
+        arrays = self._get_arrays()
+        index = arrays["node_indices"].get(part_id, None)
+        if index is None:
+            return []
+        indptr, indices = arrays[direction]
+        neighbours = indices[indptr[index] : indptr[index + 1]]
+        return [arrays["nodes"][i] for i in neighbours]
+
+    def get_children(self, part_id):
+        """Return the IDs of the children of a part."""
+        return self._neighbours(part_id, "children")
+
+    def get_parents(self, part_id):
+        """Return the IDs of the parents of a part."""
+        return self._neighbours(part_id, "parents")
+
+    def _traverse(self, part_ids, directions):
+        """Return the set of nodes reachable from the parts (excluded)."""
+        key = (tuple(sorted(part_ids)), directions)
+        if key not in self._cache:
+            arrays = self._get_arrays()
+            node_indices = arrays["node_indices"]
+            starts = [node_indices[p] for p in part_ids if p in node_indices]
+            seen = set(starts)
+            queue = deque(starts)
+            while len(queue):
+                index = queue.popleft()
+                for direction in directions:
+                    indptr, indices = arrays[direction]
+                    neighbours = indices[indptr[index] : indptr[index + 1]]
+                    for neighbour in neighbours.tolist():
+                        if neighbour not in seen:
+                            seen.add(neighbour)
+                            queue.append(neighbour)
+            nodes = arrays["nodes"]
+            self._cache[key] = set(nodes[i] for i in seen) - set(part_ids)
+        return self._cache[key]
+
+    def get_descendants(self, part_id):
+        """Return the IDs of all the descendants of a part."""
+        return self._traverse([part_id], ("children",))
+
+    def get_ancestors(self, part_id):
+        """Return the IDs of all the ancestors of a part."""
+        return self._traverse([part_id], ("parents",))
+
+    def get_connected_component(self, part_id):
+        """Return the IDs of all parts linked to a part, directly or not.
+
+        The part itself is included.
+        """
+        linked = self._traverse([part_id], ("children", "parents"))
+        return linked | set([part_id])
+
+    def get_connected_components(self):
+        """Return the list of all connected components (sets of IDs)."""
+        if "components" not in self._cache:
+            components = []
+            seen = set()
+            for node in self._get_arrays()["nodes"]:
+                if node not in seen:
+                    component = self.get_connected_component(node)
+                    seen.update(component)
+                    components.append(component)
+            self._cache["components"] = components
+        return self._cache["components"]
+
+    def get_part_links(self, part_id):
+        """Return the list of ``(parent_id, child_id)`` links of a part."""
+        return [(part_id, c) for c in self.get_children(part_id)] + [
+            (p, part_id) for p in self.get_parents(part_id)
+        ]
+
+    def __len__(self):
+        return len(self._get_arrays()["nodes"])
+
+    def __contains__(self, part_id):
+        return part_id in self._get_arrays()["node_indices"]
+
+    # BULK LINK OPERATIONS
+
+    def _apply_links(self, ice_client, links, method_name, max_workers):
+        method = getattr(ice_client, method_name)
+
+        def apply(link):
+            parent_id, child_id = link
+            try:
+                method(parent_id, child_id, link_type="CHILD")
+                return parent_id, child_id, None
+            except IOError as err:
+                return parent_id, child_id, str(err)
+
+        results = list(
+            ice_client.logger.iter_bar(
+                link=iter_parallel(apply, links, max_workers=max_workers)
+            )
+        )
+        return pandas.DataFrame(
+            results, columns=["parent_id", "child_id", "error"]
+        )
+
+    def link(self, ice_client, links, max_workers=4):
+        """Create parent/child links in ICE, concurrently.
+
+        Parameters
+        ----------
+
+        ice_client
+          The IceClient used to create the links.
+
+        links
+          A list of ``(parent_id, child_id)`` pairs.
+
+        max_workers
+          Number of links created concurrently.
+
+        Returns
+        -------
+
+        report
+          A dataframe with columns parent_id, child_id and error (None if
+          the link was created). The graph is updated with the created
+          links.
+        """
+        links = [link for link in links if tuple(link) not in self.edges]
+        report = self._apply_links(
+            ice_client, links, "link_parts", max_workers
+        )
+        created = report[report.error.isnull()]
+        self.edges.update(
+            zip(created.parent_id.tolist(), created.child_id.tolist())
+        )
+        self._changed()
+        return report
+
+    def unlink(self, ice_client, links, max_workers=4):
+        """Remove parent/child links in ICE, concurrently.
+
+        Each link is removed with a single request, as its direction is
+        known. See ``link`` for a description of the parameters and of the
+        returned report.
+        """
+        report = self._apply_links(
+            ice_client, links, "unlink_parts", max_workers
+        )
+        removed = report[report.error.isnull()]
+        self.edges.difference_update(
+            zip(removed.parent_id.tolist(), removed.child_id.tolist())
+        )
+        self._changed()
+        return report
+
+    def unlink_all(self, ice_client, part_ids, max_workers=4):
+        """Remove all the links of the given parts in ICE, concurrently.
+
+        See ``link`` for the returned report.
+        """
+        links = set()
+        for part_id in part_ids:
+            links.update(self.get_part_links(part_id))
+        return self.unlink(ice_client, sorted(links), max_workers=max_workers)
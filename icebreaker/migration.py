@@ -0,0 +1,463 @@
+"""Migration of folders, entries, records and samples between ICE instances.
+
+The journal is only ever accessed from the thread running the migration:
+reader and writer threads only do ICE requests.
+"""
+
+import sqlite3
+import time
+
+import proglog
+
+from .tools import iter_parallel
+from .utils import parse_sample_location
+
+# Write steps of an entry migration, in order. The journal's status of a
+# partially migrated entry is the last step completed.
+WRITE_STEPS = ("created", "custom_fields", "record", "samples")
+
+
+class MigrationJournal:
+    """Durable record of the items already migrated to the destination.
+
+    The journal is a SQLite database mapping source IDs to destination IDs
+    for folders and entries, and recording which entries were added to which
+    folders. It is what makes migrations resumable and idempotent.
+
+    Parameters
+    ----------
+
+    path
+      Path to the SQLite file (created if it doesn't exist), or ":memory:".
+    """
+
+    def __init__(self, path="ice_migration_journal.sqlite"):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS folders (
+                source_id INTEGER PRIMARY KEY,
+                destination_id INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                source_id INTEGER PRIMARY KEY,
+                destination_id INTEGER,
+                status TEXT NOT NULL,
+                error TEXT
+            );
+            CREATE TABLE IF NOT EXISTS folder_entries (
+                source_folder_id INTEGER NOT NULL,
+                source_entry_id INTEGER NOT NULL,
+                PRIMARY KEY (source_folder_id, source_entry_id)
+            );
+            """
+        )
+        self.connection.commit()
+
+    def get_folder(self, source_id):
+        """Return the destination ID of a migrated folder, or None."""
+        row = self.connection.execute(
+            "SELECT destination_id FROM folders WHERE source_id=?",
+            (source_id,),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set_folder(self, source_id, destination_id):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO folders VALUES (?, ?)",
+            (source_id, destination_id),
+        )
+        self.connection.commit()
+
+    def get_entry(self, source_id):
+        """Return the destination ID of a fully migrated entry, or None."""
+        destination_id, status = self.get_entry_state(source_id)
+        return destination_id if status == "done" else None
+
+    def get_entry_state(self, source_id):
+        """Return the (destination_id, status) of an entry.
+
+        The status is None for entries never seen, "error" for entries
+        which could not be created, "done" for fully migrated entries, or
+        the last write step completed on a partially migrated entry (see
+        ``IceMigration``). (None, None) is returned for unknown entries.
+        """
+        row = self.connection.execute(
+            "SELECT destination_id, status FROM entries WHERE source_id=?",
+            (source_id,),
+        ).fetchone()
+        return (None, None) if row is None else tuple(row)
+
+    def set_entry(self, source_id, destination_id, status="done", error=None):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+            (source_id, destination_id, status, error),
+        )
+        self.connection.commit()
+
+    def is_in_folder(self, source_folder_id, source_entry_id):
+        row = self.connection.execute(
+            "SELECT 1 FROM folder_entries "
+            "WHERE source_folder_id=? AND source_entry_id=?",
+            (source_folder_id, source_entry_id),
+        ).fetchone()
+        return row is not None
+
+    def set_in_folder(self, source_folder_id, source_entries_ids):
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO folder_entries VALUES (?, ?)",
+            [(source_folder_id, e) for e in source_entries_ids],
+        )
+        self.connection.commit()
+
+    def get_errors(self):
+        """Return a list of (source_id, error) for the entries with errors.
+
+        This includes the entries migrated with some failed samples.
+        """
+        return self.connection.execute(
+            "SELECT source_id, error FROM entries WHERE error IS NOT NULL"
+        ).fetchall()
+
+    def close(self):
+        self.connection.close()
+
+
+class IceMigration:
+    """Copy folders, entries, records and samples from one ICE to another.
+
+    Entries are read from the source and written to the destination by
+    concurrent pipelines (a pool of readers feeding a pool of writers), and
+    added to the destination folders by chunks. Every migrated item is
+    recorded in a ``MigrationJournal``, so an interrupted migration can be
+    run again: it resumes where it stopped and never duplicates entries.
+
+    An entry's destination ID is journaled as soon as the entry is created,
+    then the entry's status is updated after each write step (custom fields,
+    record, samples). When an entry failed after its creation, running the
+    migration again only completes its remaining steps. A sample which
+    can't be copied is reported as an error of its entry, but doesn't
+    prevent the other samples from being copied.
+
+    Examples
+    --------
+
+    >>> source = icebreaker.IceClient("source_config.yml")
+    >>> destination = icebreaker.IceClient("destination_config.yml")
+    >>> migration = IceMigration(source, destination, "journal.sqlite")
+    >>> migration.migrate_collection("SHARED")
+    >>> print(migration.report())
+
+    Parameters
+    ----------
+
+    source, destination
+      IceClient instances connected to the source and destination ICE.
+
+    journal
+      A MigrationJournal or the path to its SQLite file.
+
+    max_workers
+      Number of concurrent readers (and of concurrent writers).
+
+    chunk_size
+      Number of entries added to a destination folder at the same time.
+
+    copy_records, copy_custom_fields, copy_samples
+      Which data should be migrated in addition to the entries' infos.
+      Samples are re-created in the destination at the same plate/well
+      locations.
+
+    logger
+      Either None, "bar" for a progress bar, or a Proglog logger.
+    """
+
+    def __init__(
+        self,
+        source,
+        destination,
+        journal="ice_migration_journal.sqlite",
+        max_workers=4,
+        chunk_size=50,
+        copy_records=True,
+        copy_custom_fields=True,
+        copy_samples=False,
+        logger="bar",
+    ):
+        self.source = source
+        self.destination = destination
+        if isinstance(journal, str):
+            journal = MigrationJournal(journal)
+        self.journal = journal
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.copy_records = copy_records
+        self.copy_custom_fields = copy_custom_fields
+        self.copy_samples = copy_samples
+        self.logger = proglog.default_bar_logger(logger)
+        self.stats = dict(
+            entries_migrated=0,
+            entries_skipped=0,
+            entries_failed=0,
+            records_copied=0,
+            samples_copied=0,
+            samples_failed=0,
+            folders_created=0,
+            elapsed_time=0.0,
+        )
+
+    def migrate_collection(self, collection="SHARED", folders_names=None):
+        """Migrate all folders of a source collection (or only some)."""
+        folders = self.source.get_collection_folders(collection)
+        if folders_names is not None:
+            folders = [f for f in folders if f["folderName"] in folders_names]
+        for folder in self.logger.iter_bar(folder=folders):
+            self.migrate_folder(folder)
+        return self.report()
+
+    def migrate_folder(self, folder):
+        """Migrate a folder and all its entries.
+
+        ``folder`` is either a source folder ID or a folder infos dict.
+        """
+        if not isinstance(folder, dict):
+            folder = self.source.get_folder_infos(folder)
+        start_time = time.time()
+        destination_folder = self._get_destination_folder(folder)
+        entries = self.source.get_folder_entries(
+            folder["id"], as_iterator=True, max_workers=self.max_workers
+        )
+
+        def entries_to_migrate():
+            # The journal is only accessed from this (main) thread. Entries
+            # already migrated via another folder are only added to this one.
+            for entry in entries:
+                if not self.journal.is_in_folder(folder["id"], entry["id"]):
+                    yield entry, self.journal.get_entry_state(entry["id"])
+
+        def journal_created_entries(results):
+            # Runs in the main thread, as the writers pull their inputs.
+            for result in results:
+                if result.get("just_created"):
+                    self.journal.set_entry(
+                        result["source_id"],
+                        result["destination_id"],
+                        status="created",
+                    )
+                yield result
+
+        read_entries = iter_parallel(
+            self._read_entry,
+            entries_to_migrate(),
+            max_workers=self.max_workers,
+        )
+        created_entries = iter_parallel(
+            self._create_entry, read_entries, max_workers=self.max_workers
+        )
+        written_entries = iter_parallel(
+            self._write_entry,
+            journal_created_entries(created_entries),
+            max_workers=self.max_workers,
+        )
+        chunk = []
+        for result in self.logger.iter_bar(entry=written_entries):
+            self._record_entry_result(result)
+            if result["destination_id"] is not None:
+                chunk.append(result)
+            if len(chunk) == self.chunk_size:
+                self._add_to_folder(folder, destination_folder, chunk)
+                chunk = []
+        self._add_to_folder(folder, destination_folder, chunk)
+        self.stats["elapsed_time"] += time.time() - start_time
+        return destination_folder
+
+    def _get_destination_folder(self, folder):
+        destination_id = self.journal.get_folder(folder["id"])
+        if destination_id is None:
+            destination_folder = self.destination.create_folder(
+                folder["folderName"]
+            )
+            self.journal.set_folder(folder["id"], destination_folder["id"])
+            self.stats["folders_created"] += 1
+            return destination_folder
+        return self.destination.get_folder_infos(destination_id)
+
+    def _read_entry(self, entry_and_state):
+        """Fetch all the source data of an entry (run in reader threads)."""
+        entry, (destination_id, status) = entry_and_state
+        result = dict(
+            source_id=entry["id"],
+            destination_id=destination_id,
+            status=status,
+            error=None,
+        )
+        if status == "done":
+            result["skipped"] = True
+            return result
+        if (destination_id is None) or (status not in WRITE_STEPS):
+            # Never created, or failed before its creation: start over.
+            result.update(destination_id=None, status=None)
+        try:
+            result["infos"] = self.source.get_part_infos(entry["id"])
+            if self.copy_records and result["infos"].get("hasSequence"):
+                result["genbank"] = self.source.get_sequence(entry["id"])
+            if self.copy_custom_fields:
+                result["custom_fields"] = (
+                    self.source.get_part_custom_fields_list(entry["id"])
+                )
+            if self.copy_samples:
+                result["samples"] = self.source.get_part_samples(entry["id"])
+        except Exception as err:
+            result["error"] = "Read error: %s" % err
+        return result
+
+    def _create_entry(self, result):
+        """Create the entry in the destination (run in writer threads)."""
+        if result.get("skipped") or (result["error"] is not None):
+            return result
+        if result["destination_id"] is not None:
+            return result
+        infos = result["infos"]
+        common = dict(
+            name=infos["name"],
+            description=infos.get("shortDescription") or "",
+            pi=infos.get("principalInvestigator") or "unknown",
+        )
+        try:
+            if infos.get("type") == "PLASMID":
+                response = self.destination.create_plasmid(
+                    markers=infos.get("selectionMarkers") or ("None",),
+                    **common
+                )
+            else:
+                response = self.destination.create_part(**common)
+        except Exception as err:
+            result["error"] = "Write error: %s" % err
+            return result
+        result["destination_id"] = response["id"]
+        result["record_id"] = response.get("recordId")
+        result["status"] = "created"
+        result["just_created"] = True
+        return result
+
+    def _write_entry(self, result):
+        """Complete the entry's remaining write steps (in writer threads).
+
+        The steps are "custom_fields", "record" and "samples", and
+        ``result["status"]`` is set to the last step completed.
+        """
+        if result.get("skipped") or (result["error"] is not None):
+            return result
+        remaining_steps = WRITE_STEPS[WRITE_STEPS.index(result["status"]) :]
+        destination_id = result["destination_id"]
+        step = None
+        try:
+            for step in remaining_steps[1:]:
+                if step == "custom_fields":
+                    self._write_custom_fields(result)
+                elif step == "record" and result.get("genbank"):
+                    # After a resume, the record ID is found from the part ID.
+                    self.destination.attach_record_to_part(
+                        ice_record_id=result.get("record_id"),
+                        ice_part_id=destination_id,
+                        record_text=result["genbank"],
+                    )
+                    result["record_copied"] = True
+                elif step == "samples":
+                    self._write_samples(result)
+                result["status"] = step
+        except Exception as err:
+            result["error"] = "Write error (%s): %s" % (step, err)
+        return result
+
+    def _write_custom_fields(self, result):
+        """Copy the entry's custom fields.
+
+        For an entry created by a previous run, the fields written before
+        that run stopped are already in the destination, and are skipped.
+        """
+        destination_id = result["destination_id"]
+        fields = result.get("custom_fields", [])
+        if fields and not result.get("just_created"):
+            existing_fields = set(
+                (field["name"], field["value"])
+                for field in self.destination.get_part_custom_fields_list(
+                    destination_id
+                )
+            )
+            fields = [
+                field
+                for field in fields
+                if (field["name"], field["value"]) not in existing_fields
+            ]
+        for field in fields:
+            self.destination.set_part_custom_field(
+                destination_id, field["name"], field["value"]
+            )
+
+    def _write_samples(self, result):
+        """Copy the entry's samples, recording the errors of each sample."""
+        sample_errors = []
+        result["samples_copied"] = 0
+        for sample in result.get("samples", []):
+            try:
+                location = parse_sample_location(sample)
+                plate = [v for k, v in location.items() if k != "WELL"][0]
+                self.destination.create_part_sample(
+                    result["destination_id"],
+                    plate_name=plate,
+                    well=location["WELL"],
+                    assert_sample_created=False,
+                )
+                result["samples_copied"] += 1
+            except Exception as err:
+                sample_errors.append("Sample %s: %s" % (sample.get("id"), err))
+        result["sample_errors"] = sample_errors
+
+    def _record_entry_result(self, result):
+        """Record the outcome of an entry migration (in the main thread)."""
+        if result.get("skipped"):
+            self.stats["entries_skipped"] += 1
+            return
+        self.stats["records_copied"] += int(result.get("record_copied", 0))
+        self.stats["samples_copied"] += result.get("samples_copied", 0)
+        if result["error"] is not None:
+            self.stats["entries_failed"] += 1
+            self.journal.set_entry(
+                result["source_id"],
+                result["destination_id"],
+                status=result["status"] or "error",
+                error=result["error"],
+            )
+            # An incomplete entry is not added to folders until completed:
+            result["destination_id"] = None
+            return
+        sample_errors = result.get("sample_errors", [])
+        self.stats["samples_failed"] += len(sample_errors)
+        self.stats["entries_migrated"] += 1
+        self.journal.set_entry(
+            result["source_id"],
+            result["destination_id"],
+            status="done",
+            error="; ".join(sample_errors) if sample_errors else None,
+        )
+
+    def _add_to_folder(self, folder, destination_folder, results):
+        if len(results) == 0:
+            return
+        self.destination.add_to_folder(
+            [r["destination_id"] for r in results],
+            folders=[destination_folder],
+        )
+        self.journal.set_in_folder(
+            folder["id"], [r["source_id"] for r in results]
+        )
+
+    def report(self):
+        """Return a dict of migration statistics, including throughput."""
+        report = dict(self.stats)
+        elapsed = max(report["elapsed_time"], 1e-6)
+        processed = report["entries_migrated"] + report["entries_skipped"]
+        report["entries_per_second"] = processed / elapsed
+        report["errors"] = self.journal.get_errors()
+        return report
@@ -0,0 +1,433 @@
+"""Local SQLite mirror of the entries of an ICE collection."""
+
+import json
+import sqlite3
+import time
+
+import proglog
+
+from .tools import iter_parallel
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    infos TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    type TEXT,
+    modification_time INTEGER,
+    infos TEXT
+);
+CREATE TABLE IF NOT EXISTS folder_entries (
+    folder_id INTEGER NOT NULL,
+    entry_id INTEGER NOT NULL,
+    PRIMARY KEY (folder_id, entry_id)
+);
+CREATE TABLE IF NOT EXISTS custom_fields (
+    entry_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    entry_id INTEGER NOT NULL,
+    infos TEXT
+);
+CREATE TABLE IF NOT EXISTS sequences (
+    entry_id INTEGER PRIMARY KEY,
+    genbank TEXT
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_name ON entries (name);
+CREATE INDEX IF NOT EXISTS entries_type ON entries (type);
+CREATE INDEX IF NOT EXISTS entries_modification_time
+    ON entries (modification_time);
+CREATE INDEX IF NOT EXISTS folder_entries_entry ON folder_entries (entry_id);
+CREATE INDEX IF NOT EXISTS custom_fields_entry ON custom_fields (entry_id);
+CREATE INDEX IF NOT EXISTS custom_fields_name_value
+    ON custom_fields (name, value);
+CREATE INDEX IF NOT EXISTS samples_entry ON samples (entry_id);
+"""
+
+
+class IceMirror:
+    """Local SQLite copy of the folders, entries and records of a collection.
+
+    The first ``sync()`` loads everything. The next ones only re-fetch the
+    details (part infos, custom fields, samples, sequence) of the entries
+    whose modification time changed since the previous sync.
+
+    An entry whose details can't be fetched (e.g. a part not readable by
+    the user) is reported in the sync's errors and kept unchanged in the
+    mirror (or not added to it), so it is retried at the next sync.
+
+    Examples
+    --------
+
+    >>> mirror = IceMirror("shared.sqlite", ice_client, collection="SHARED")
+    >>> mirror.sync()
+    >>> mirror.find_entries(name="pGFP")
+    >>> mirror.get_sequence(1234)
+
+    Parameters
+    ----------
+
+    path
+      Path to the SQLite database file (created if needed).
+
+    ice_client
+      The IceClient used for syncing. Can be None for read-only use of an
+      existing mirror.
+
+    collection
+      The ICE collection to mirror, e.g. "SHARED". Defaults to the
+      collection of the existing mirror, or "SHARED" for a new mirror.
+
+    max_workers
+      Number of entries whose details are fetched concurrently.
+
+    batch_size
+      Number of entries per request when listing the folders' entries.
+
+    sync_sequences, sync_samples, sync_custom_fields
+      Which entry details should be mirrored.
+
+    logger
+      Either None, "bar" for a progress bar, or a Proglog logger.
+    """
+
+    def __init__(
+        self,
+        path,
+        ice_client=None,
+        collection=None,
+        max_workers=4,
+        batch_size=1000,
+        sync_sequences=True,
+        sync_samples=True,
+        sync_custom_fields=True,
+        logger="bar",
+    ):
+        self.path = path
+        self.ice_client = ice_client
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.sync_sequences = sync_sequences
+        self.sync_samples = sync_samples
+        self.sync_custom_fields = sync_custom_fields
+        self.logger = proglog.default_bar_logger(logger)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        if collection is None:
+            collection = self._get_state("collection", "SHARED")
+        self.collection = collection
+
+    # SYNC
+
+    def _get_state(self, key, default=None):
+        row = self.connection.execute(
+            "SELECT value FROM sync_state WHERE key=?", (key,)
+        ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def _set_state(self, key, value):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO sync_state VALUES (?, ?)",
+            (key, json.dumps(value)),
+        )
+
+    @property
+    def watermark(self):
+        """Highest entry modification time seen at the last sync."""
+        return self._get_state("watermark")
+
+    def sync(self, full=False):
+        """Update the mirror from ICE.
+
+        Parameters
+        ----------
+
+        full
+          If True, the details of all entries are re-fetched. Otherwise only
+          the entries modified since the last sync (or never mirrored) are.
+
+        Returns
+        -------
+
+        stats
+          A dict with the number of folders, entries, updated and removed
+          entries, the sync duration, and a list ``errors`` of
+          ``(entry_id, error_message)`` for the entries which couldn't be
+          updated.
+        """
+        try:
+            return self._sync(full=full)
+        except BaseException:
+            # Fatal errors don't leave a half-updated mirror.
+            self.connection.rollback()
+            raise
+
+    def _sync(self, full):
+        start_time = time.time()
+        watermark = None if full else self.watermark
+        ice = self.ice_client
+        folders = ice.get_collection_folders(self.collection)
+        self.connection.execute("DELETE FROM folders")
+        self.connection.execute("DELETE FROM folder_entries")
+        self.connection.executemany(
+            "INSERT INTO folders VALUES (?, ?, ?)",
+            [(f["id"], f["folderName"], json.dumps(f)) for f in folders],
+        )
+
+        known_times = dict(
+            self.connection.execute(
+                "SELECT id, modification_time FROM entries"
+            ).fetchall()
+        )
+        entries_ids = set()
+        entries_to_update = []
+        for folder in self.logger.iter_bar(folder=folders):
+            entries = ice.get_folder_entries(
+                folder["id"],
+                as_iterator=True,
+                batch_size=self.batch_size,
+                fields=["id", "modificationTime", "name", "type"],
+                max_workers=self.max_workers,
+            )
+            memberships = []
+            for entry in entries:
+                memberships.append((folder["id"], entry["id"]))
+                if entry["id"] in entries_ids:
+                    continue
+                entries_ids.add(entry["id"])
+                is_new = entry["id"] not in known_times
+                if is_new or (watermark is None) or (
+                    entry.get("modificationTime") != known_times[entry["id"]]
+                ):
+                    entries_to_update.append(entry)
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO folder_entries VALUES (?, ?)",
+                memberships,
+            )
+
+        # Entries which are no longer in the collection are removed.
+        removed_ids = [(i,) for i in set(known_times) - entries_ids]
+        for table, column in [
+            ("entries", "id"),
+            ("custom_fields", "entry_id"),
+            ("samples", "entry_id"),
+            ("sequences", "entry_id"),
+        ]:
+            self.connection.executemany(
+                "DELETE FROM %s WHERE %s=?" % (table, column), removed_ids
+            )
+
+        details = iter_parallel(
+            self._fetch_entry_details,
+            entries_to_update,
+            max_workers=self.max_workers,
+        )
+        errors = []
+        for entry, details, error in self.logger.iter_bar(entry=details):
+            if error is None:
+                self._store_entry(entry, *details)
+                continue
+            # The entry keeps its previous modification time (if any), so
+            # it will be updated at the next sync.
+            errors.append((entry["id"], error))
+            if entry["id"] not in known_times:
+                self.connection.execute(
+                    "DELETE FROM folder_entries WHERE entry_id=?",
+                    (entry["id"],),
+                )
+
+        (watermark,) = self.connection.execute(
+            "SELECT MAX(modification_time) FROM entries"
+        ).fetchone()
+        if watermark is not None:
+            self._set_state("watermark", watermark)
+        self._set_state("last_sync", time.time())
+        self._set_state("collection", self.collection)
+        self.connection.commit()
+        return dict(
+            folders=len(folders),
+            entries=len(entries_ids),
+            updated_entries=len(entries_to_update) - len(errors),
+            removed_entries=len(removed_ids),
+            errors=errors,
+            duration=time.time() - start_time,
+        )
+
+    def _fetch_entry_details(self, entry):
+        """Fetch the details of an entry (run in worker threads).
+
+        Returns ``(entry, details, error)`` where details is a tuple
+        ``(infos, fields, samples, genbank)``, or None if the error message
+        is not None.
+        """
+        ice = self.ice_client
+        try:
+            infos = ice.get_part_infos(entry["id"])
+            fields = samples = genbank = None
+            if self.sync_custom_fields:
+                fields = ice.get_part_custom_fields_list(entry["id"])
+            if self.sync_samples:
+                samples = ice.get_part_samples(entry["id"])
+            if self.sync_sequences and infos.get("hasSequence", True):
+                try:
+                    genbank = ice.get_sequence(entry["id"])
+                except IOError:
+                    genbank = None
+        except Exception as err:
+            return entry, None, str(err)
+        return entry, (infos, fields, samples, genbank), None
+
+    def _store_entry(self, entry, infos, fields, samples, genbank):
+        entry_id = entry["id"]
+        infos = dict(entry, **infos)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+            (
+                entry_id,
+                infos.get("name"),
+                infos.get("type"),
+                entry.get("modificationTime"),
+                json.dumps(infos),
+            ),
+        )
+        if fields is not None:
+            self.connection.execute(
+                "DELETE FROM custom_fields WHERE entry_id=?", (entry_id,)
+            )
+            self.connection.executemany(
+                "INSERT INTO custom_fields VALUES (?, ?, ?)",
+                [(entry_id, f["name"], f.get("value")) for f in fields],
+            )
+        if samples is not None:
+            self.connection.execute(
+                "DELETE FROM samples WHERE entry_id=?", (entry_id,)
+            )
+            self.connection.executemany(
+                "INSERT INTO samples VALUES (?, ?)",
+                [(entry_id, json.dumps(s)) for s in samples],
+            )
+        if self.sync_sequences:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sequences VALUES (?, ?)",
+                (entry_id, genbank),
+            )
+
+    # QUERIES
+
+    def get_entry_infos(self, entry_id):
+        """Return the part infos of an entry, or None if not mirrored."""
+        row = self.connection.execute(
+            "SELECT infos FROM entries WHERE id=?", (entry_id,)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def find_entries(self, name=None, entry_type=None, custom_fields=None):
+        """Return the infos of the entries matching all given criteria.
+
+        Parameters
+        ----------
+
+        name
+          Exact name of the entries.
+
+        entry_type
+          Type of the entries, e.g. "PLASMID".
+
+        custom_fields
+          Dict ``{field_name: value}`` of custom field values.
+        """
+        query = "SELECT infos FROM entries WHERE 1"
+        parameters = []
+        if name is not None:
+            query += " AND name=?"
+            parameters.append(name)
+        if entry_type is not None:
+            query += " AND type=?"
+            parameters.append(entry_type)
+        for field_name, value in (custom_fields or {}).items():
+            query += (
+                " AND id IN (SELECT entry_id FROM custom_fields"
+                " WHERE name=? AND value=?)"
+            )
+            parameters += [field_name, value]
+        rows = self.connection.execute(query, parameters).fetchall()
+        return [json.loads(infos) for (infos,) in rows]
+
+    def get_folders(self):
+        """Return the infos of all mirrored folders."""
+        rows = self.connection.execute("SELECT infos FROM folders")
+        return [json.loads(infos) for (infos,) in rows]
+
+    def get_folder_infos(self, folder_id):
+        """Return the infos of a mirrored folder, or None."""
+        row = self.connection.execute(
+            "SELECT infos FROM folders WHERE id=?", (folder_id,)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def get_entries_names(self):
+        """Return the list of the names of all mirrored entries."""
+        rows = self.connection.execute("SELECT name FROM entries")
+        return [name for (name,) in rows]
+
+    def get_folder_entries_ids(self, folder_id):
+        """Return the IDs of the entries in a mirrored folder."""
+        rows = self.connection.execute(
+            "SELECT entry_id FROM folder_entries WHERE folder_id=? "
+            "ORDER BY entry_id",
+            (folder_id,),
+        )
+        return [entry_id for (entry_id,) in rows]
+
+    def get_entry_folders_ids(self, entry_id):
+        """Return the IDs of the mirrored folders containing an entry."""
+        rows = self.connection.execute(
+            "SELECT folder_id FROM folder_entries WHERE entry_id=?",
+            (entry_id,),
+        )
+        return [folder_id for (folder_id,) in rows]
+
+    def get_custom_fields(self, entry_id):
+        """Return a list ``[{name:, value:}, ...]`` of custom fields."""
+        rows = self.connection.execute(
+            "SELECT name, value FROM custom_fields WHERE entry_id=?",
+            (entry_id,),
+        )
+        return [dict(name=name, value=value) for (name, value) in rows]
+
+    def get_samples(self, entry_id):
+        """Return the list of samples (dicts) of an entry."""
+        rows = self.connection.execute(
+            "SELECT infos FROM samples WHERE entry_id=?", (entry_id,)
+        )
+        return [json.loads(infos) for (infos,) in rows]
+
+    def get_sequence(self, entry_id):
+        """Return the Genbank text of an entry, or None."""
+        row = self.connection.execute(
+            "SELECT genbank FROM sequences WHERE entry_id=?", (entry_id,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def iter_sequences(self):
+        """Iterate over all ``(entry_id, genbank_text)`` in the mirror."""
+        rows = self.connection.execute(
+            "SELECT entry_id, genbank FROM sequences "
+            "WHERE genbank IS NOT NULL ORDER BY entry_id"
+        )
+        for entry_id, genbank in rows:
+            yield entry_id, genbank
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,225 @@
+"""Read-only IceClient replacement serving data from a local IceMirror."""
+
+from itertools import islice
+
+import proglog
+
+from .mirror import IceMirror
+from .tables import format_entries
+from .tools import did_you_mean, ice_genbank_to_record
+
+
+class OfflineIceClient:
+    """Read-only client with the read methods of IceClient, served locally.
+
+    All data comes from an ``IceMirror`` snapshot, so scripts written for
+    IceClient can run without network access (or latency). If a
+    ``fallback`` IceClient is provided, items missing from the snapshot are
+    requested from the live ICE instance.
+
+    Examples
+    --------
+
+    >>> ice = OfflineIceClient("shared_mirror.sqlite")
+    >>> ice.get_record(1234)
+    >>> entry, error = ice.find_entry_by_name("pGFP")
+
+    Parameters
+    ----------
+
+    mirror
+      An IceMirror, or the path to the SQLite file of a mirror.
+
+    fallback
+      Optional IceClient used when an item is not in the mirror.
+
+    logger
+      Either None, "bar" for a progress bar, or a Proglog logger.
+    """
+
+    def __init__(self, mirror, fallback=None, logger=None):
+        if isinstance(mirror, str):
+            mirror = IceMirror(mirror, logger=None)
+        self.mirror = mirror
+        self.fallback = fallback
+        self.logger = proglog.default_bar_logger(logger)
+        self.logger.ignore_bars_under = 2
+
+    def _missing(self, method_name, *args, **kwargs):
+        if self.fallback is None:
+            raise IOError(
+                "%s%s: not found in the local snapshot." % (method_name, args)
+            )
+        return getattr(self.fallback, method_name)(*args, **kwargs)
+
+    # PARTS
+
+    def get_part_infos(self, id):
+        """Return infos (name, creation date...) for the part with that id."""
+        infos = self.mirror.get_entry_infos(id)
+        if infos is None:
+            return self._missing("get_part_infos", id)
+        return infos
+
+    def get_sequence(self, id, format="genbank"):
+        """Return genbank text for the entity with that id."""
+        genbank = None
+        if format == "genbank":
+            genbank = self.mirror.get_sequence(id)
+        if genbank is None:
+            return self._missing("get_sequence", id, format=format)
+        return genbank
+
+    def get_record(self, id):
+        """Return a biopython record for the entity with that id."""
+        return ice_genbank_to_record(self.get_sequence(id))
+
+    def iter_sequences(
+        self, ids, format="genbank", max_workers=None, ordered=True
+    ):
+        """Iterate over ``(id, sequence_text)`` for many entities.
+
+        The text is None for entities without sequence in the snapshot (or
+        in the fallback client).
+        """
+        for id in ids:
+            try:
+                yield id, self.get_sequence(id, format=format)
+            except IOError:
+                yield id, None
+
+    def get_part_samples(self, id):
+        """Return a list of samples (dicts) for the entity with that id."""
+        if self.mirror.get_entry_infos(id) is None:
+            return self._missing("get_part_samples", id)
+        return self.mirror.get_samples(id)
+
+    def get_part_custom_fields_list(self, part_id):
+        """Return a list of all custom fields for a given part."""
+        if self.mirror.get_entry_infos(part_id) is None:
+            return self._missing("get_part_custom_fields_list", part_id)
+        return self.mirror.get_custom_fields(part_id)
+
+    def get_part_folders(self, part_id):
+        """Return the infos of the folders containing a part."""
+        if self.mirror.get_entry_infos(part_id) is None:
+            return self._missing("get_part_folders", part_id)
+        folders = {f["id"]: f for f in self.mirror.get_folders()}
+        return [
+            folders[folder_id]
+            for folder_id in self.mirror.get_entry_folders_ids(part_id)
+        ]
+
+    # FOLDERS
+
+    def get_collection_folders(self, collection):
+        """Return a list of folders in the mirrored collection."""
+        if collection != self.mirror.collection:
+            return self._missing("get_collection_folders", collection)
+        return self.mirror.get_folders()
+
+    def get_folder_infos(self, id):
+        """Return infos (dict) on the folder whose id is provided."""
+        infos = self.mirror.get_folder_infos(id)
+        if infos is None:
+            return self._missing("get_folder_infos", id)
+        return infos
+
+    def get_folder_id(self, name, collection=None):
+        """Return the ID of the (mirrored) folder with the given name."""
+        folders = self.mirror.get_folders()
+        folders_ids = [f["id"] for f in folders if f["folderName"] == name]
+        if len(folders_ids) == 1:
+            return folders_ids[0]
+        if len(folders_ids) > 1:
+            raise IOError(
+                "Found several folders named %s, with IDs %s."
+                % (name, ", ".join([str(d) for d in folders_ids]))
+            )
+        if self.fallback is not None:
+            return self.fallback.get_folder_id(name, collection=collection)
+        error = "No folder named %s." % name
+        names = [f["folderName"] for f in folders]
+        suggestions = did_you_mean(name, names)
+        if len(suggestions):
+            error += " Suggestions: %s." % ", ".join(suggestions)
+        raise IOError(error)
+
+    def get_folder_entries(
+        self,
+        folder_id,
+        must_contain=None,
+        as_iterator=False,
+        limit=None,
+        output="dicts",
+        fields=None,
+        **kwargs
+    ):
+        """Return a list or iterator of all entries in a given ICE folder.
+
+        See ``IceClient.get_folder_entries`` for a description of the
+        parameters. Pagination parameters (batch_size, etc.) are ignored.
+        """
+        if self.mirror.get_folder_infos(folder_id) is None:
+            return self._missing(
+                "get_folder_entries",
+                folder_id,
+                must_contain=must_contain,
+                as_iterator=as_iterator,
+                limit=limit,
+                output=output,
+                fields=fields,
+                **kwargs
+            )
+        entries_ids = self.mirror.get_folder_entries_ids(folder_id)
+        iterator = (self.mirror.get_entry_infos(i) for i in entries_ids)
+        if must_contain is not None:
+            iterator = (
+                e
+                for e in iterator
+                if (must_contain in str(e["id"]))
+                or (must_contain in e.get("name", ""))
+            )
+        if limit is not None:
+            iterator = islice(iterator, limit)
+        if output in ("dataframe", "arrow"):
+            return format_entries(iterator, output=output, fields=fields)
+        iterator = format_entries(iterator, output=output, fields=fields)
+        return iterator if as_iterator else list(iterator)
+
+    # SEARCH
+
+    def find_entry_by_name(
+        self,
+        name,
+        limit=10,
+        min_score=0,
+        strict_search=False,
+        entry_types=("PART", "PLASMID"),
+    ):
+        """Find an entry (id and other infos) by its exact name.
+
+        Returns the same ``(entry_info, error)`` tuples as
+        ``IceClient.find_entry_by_name``.
+        """
+        entries = [
+            e
+            for e in self.mirror.find_entries(name=name)
+            if e.get("type") in entry_types
+        ]
+        if len(entries) > 1:
+            return None, ("Multiple matches", [e["id"] for e in entries])
+        if len(entries) == 1:
+            return entries[0], None
+        if self.fallback is not None:
+            return self.fallback.find_entry_by_name(
+                name,
+                limit=limit,
+                min_score=min_score,
+                strict_search=strict_search,
+                entry_types=entry_types,
+            )
+        suggestions = did_you_mean(
+            name, self.mirror.get_entries_names(), limit=limit, min_score=80
+        )
+        return None, ("No match", suggestions)
@@ -0,0 +1,132 @@
+"""Cursors to save and resume long paginated iterations over ICE listings."""
+
+import json
+
+
+class PaginationCursor:
+    """Serializable position in a paginated ICE listing or search.
+
+    Cursors are returned (as ``iterator.cursor``) by the iterators of
+    ``IceClient.search``, ``IceClient.get_folder_entries`` and
+    ``IceClient.get_collection_entries`` (with ``as_iterator=True``). They are
+    updated as the items are consumed, and can be saved and used later to
+    resume the iteration where it stopped.
+
+    Examples
+    --------
+
+    >>> entries = ice.get_collection_entries("SHARED", as_iterator=True)
+    >>> for entry in entries:
+    >>>     process(entry)
+    >>>     entries.cursor.save("cursor.json")
+    >>> # Later, after a crash:
+    >>> cursor = PaginationCursor.load("cursor.json")
+    >>> for entry in cursor.resume(ice):
+    >>>     process(entry)
+
+    Parameters
+    ----------
+
+    method
+      Name of the IceClient method which created the cursor, e.g.
+      "get_collection_entries".
+
+    parameters
+      Dict of the method parameters defining the query (query text, folder
+      id, filters...).
+
+    offset
+      Number of items already consumed, i.e. offset of the next item.
+
+    batch_size
+      Number of items per page.
+
+    count
+      Total number of items found when the iteration started. Resumed
+      iterations stop at that same count.
+    """
+
+    def __init__(
+        self, method, parameters, offset=0, batch_size=15, count=None
+    ):
+        self.method = method
+        self.parameters = parameters
+        self.offset = offset
+        self.batch_size = batch_size
+        self.count = count
+
+    @property
+    def is_finished(self):
+        return (self.count is not None) and (self.offset >= self.count)
+
+    def to_dict(self):
+        return dict(
+            method=self.method,
+            parameters=self.parameters,
+            offset=self.offset,
+            batch_size=self.batch_size,
+            count=self.count,
+        )
+
+    @staticmethod
+    def from_dict(data):
+        return PaginationCursor(**data)
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    @staticmethod
+    def from_json(text):
+        return PaginationCursor.from_dict(json.loads(text))
+
+    def save(self, filepath):
+        """Write the cursor in a JSON file."""
+        with open(filepath, "w") as f:
+            f.write(self.to_json())
+
+    @staticmethod
+    def load(filepath):
+        """Read a cursor from a JSON file."""
+        with open(filepath, "r") as f:
+            return PaginationCursor.from_json(f.read())
+
+    def resume(self, ice_client, **kwargs):
+        """Return an iterator over the remaining items.
+
+        The extra keyword arguments (e.g. ``limit``, ``max_workers``) are
+        passed to the IceClient method.
+        """
+        method = getattr(ice_client, self.method)
+        parameters = dict(self.parameters)
+        parameters.update(kwargs)
+        return method(cursor=self, as_iterator=True, **parameters)
+
+    def __repr__(self):
+        return "PaginationCursor(%s, offset=%s, count=%s)" % (
+            self.method,
+            self.offset,
+            self.count,
+        )
+
+
+class PaginatedIterator:
+    """Iterator over the items of an ICE listing, with a resumable cursor.
+
+    The ``cursor`` offset is incremented every time an item is yielded.
+    """
+
+    def __init__(self, iterator, cursor):
+        self.iterator = iterator
+        self.cursor = cursor
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self.iterator)
+        self.cursor.offset += 1
+        return item
+
+    def close(self):
+        if hasattr(self.iterator, "close"):
+            self.iterator.close()
@@ -0,0 +1,268 @@
+"""Bulk audit and update of the permissions of ICE parts and folders.
+
+Principals (who gets a permission) are written "ACCOUNT:<user_id>" or
+"GROUP:<group_id>", and accesses are either "read" or "write".
+"""
+
+import pandas
+import proglog
+
+from .tools import iter_parallel
+
+PERMISSIONS_COLUMNS = [
+    "item_id",
+    "permission_id",
+    "principal",
+    "principal_name",
+    "access",
+]
+
+
+def principal(user_id=None, group_id=None):
+    """Return the principal string of a user or group."""
+    if group_id is not None:
+        return "GROUP:%s" % group_id
+    return "ACCOUNT:%s" % user_id
+
+
+def permission_to_row(item_id, permission):
+    """Return a permissions table row for a permission returned by ICE."""
+    if "article" in permission:
+        article = permission["article"]
+        article_id = permission["articleId"]
+    elif "account" in permission:
+        article, article_id = "ACCOUNT", permission["account"]["id"]
+    else:
+        article, article_id = "GROUP", permission["group"]["id"]
+    account = permission.get("account") or {}
+    group = permission.get("group") or {}
+    name = (
+        account.get("email")
+        or group.get("label")
+        or permission.get("display")
+    )
+    access = "write" if "WRITE" in permission.get("type", "") else "read"
+    return [
+        item_id,
+        permission["id"],
+        "%s:%s" % (article, article_id),
+        name,
+        access,
+    ]
+
+
+class PermissionsMatrix:
+    """Permissions of many parts or folders, for audit and bulk updates.
+
+    Examples
+    --------
+
+    >>> matrix = PermissionsMatrix.fetch(ice, part_ids, item_type="part")
+    >>> matrix.to_matrix()  # items x principals, 0=none, 1=read, 2=write
+    >>> grants, revokes = matrix.diff({1234: {"GROUP:7": "write"}})
+    >>> report = matrix.apply(ice, grants, revokes)
+
+    Parameters
+    ----------
+
+    permissions
+      A dataframe with one row per ICE permission and columns item_id,
+      permission_id, principal, principal_name and access.
+
+    item_type
+      Either "part" or "folder".
+    """
+
+    def __init__(self, permissions, item_type="part"):
+        if item_type not in ("part", "folder"):
+            raise ValueError("Unknown item type: %s" % item_type)
+        self.permissions = permissions
+        self.item_type = item_type
+
+    @classmethod
+    def fetch(
+        cls, ice_client, item_ids, item_type="part", max_workers=4, logger=None
+    ):
+        """Fetch the permissions of many parts or folders, concurrently."""
+        logger = proglog.default_bar_logger(logger)
+        get_permissions = dict(
+            part=ice_client.get_part_permissions,
+            folder=ice_client.get_folder_permissions,
+        )[item_type]
+
+        def fetch(item_id):
+            return item_id, get_permissions(item_id)
+
+        items_permissions = iter_parallel(
+            fetch, item_ids, max_workers=max_workers
+        )
+        rows = [
+            permission_to_row(item_id, permission)
+            for item_id, permissions in logger.iter_bar(
+                item=items_permissions
+            )
+            for permission in permissions
+        ]
+        permissions = pandas.DataFrame(rows, columns=PERMISSIONS_COLUMNS)
+        return cls(permissions, item_type=item_type)
+
+    def to_matrix(self):
+        """Return a compact items x principals dataframe of accesses.
+
+        Values are 0 (no access), 1 (read) or 2 (write).
+        """
+        levels = self.permissions.access.map(dict(read=1, write=2))
+        table = self.permissions.assign(level=levels)
+        matrix = table.pivot_table(
+            index="item_id",
+            columns="principal",
+            values="level",
+            aggfunc="max",
+            fill_value=0,
+        )
+        return matrix.astype("int8")
+
+    def get_principals(self):
+        """Return a dict ``{principal: principal_name}``."""
+        rows = self.permissions[["principal", "principal_name"]]
+        return dict(rows.drop_duplicates("principal").values.tolist())
+
+    def _current_permissions(self):
+        """Return ``{(item_id, principal): {access: [permission_ids]}}``."""
+        current = {}
+        for row in self.permissions.itertuples():
+            key = (row.item_id, row.principal)
+            accesses = current.setdefault(key, {})
+            accesses.setdefault(row.access, []).append(row.permission_id)
+        return current
+
+    def diff(self, target):
+        """Return the changes needed to reach the target permissions.
+
+        Parameters
+        ----------
+
+        target
+          A dict ``{item_id: {principal: access}}`` where access is "read",
+          "write" or None (no access). The principals not mentioned for an
+          item keep their current access.
+
+        Returns
+        -------
+
+        grants, revokes
+          Lists of ``(item_id, principal, access)`` permissions to create,
+          and of ``(item_id, permission_id, principal)`` permissions to
+          delete.
+        """
+        current = self._current_permissions()
+        grants, revokes = [], []
+        for item_id, principals in target.items():
+            for principal_, access in principals.items():
+                accesses = current.get((item_id, principal_), {})
+                to_revoke = []
+                if access is None:
+                    to_revoke = accesses.get("read", []) + accesses.get(
+                        "write", []
+                    )
+                elif access == "read":
+                    to_revoke = list(accesses.get("write", []))
+                    if "read" not in accesses:
+                        grants.append((item_id, principal_, "read"))
+                elif access == "write":
+                    if "write" not in accesses:
+                        grants.append((item_id, principal_, "write"))
+                else:
+                    raise ValueError("Unknown access: %s" % access)
+                revokes += [(item_id, p, principal_) for p in to_revoke]
+        return grants, revokes
+
+    def restrict_to(self, principals):
+        """Return the revokes removing all other principals' permissions.
+
+        The result can be passed to ``apply``, e.g.
+        ``matrix.apply(ice, revokes=matrix.restrict_to(["ACCOUNT:12"]))``.
+        """
+        return [
+            (row.item_id, row.permission_id, row.principal)
+            for row in self.permissions.itertuples()
+            if row.principal not in principals
+        ]
+
+    def apply(self, ice_client, grants=(), revokes=(), max_workers=4):
+        """Create and delete permissions in ICE, concurrently.
+
+        Parameters
+        ----------
+
+        ice_client
+          The IceClient used to modify the permissions.
+
+        grants, revokes
+          Lists of changes, as returned by ``diff`` or ``restrict_to``.
+
+        max_workers
+          Number of concurrent requests.
+
+        Returns
+        -------
+
+        report
+          A dataframe with one row per change and columns item_id,
+          principal, action ("grant" or "revoke"), access (for grants),
+          permission_id (for revokes) and error.
+        """
+        if self.item_type == "part":
+            create = ice_client.create_part_permission
+            delete = ice_client.delete_part_permission
+        else:
+            create = ice_client.create_folder_permission
+            delete = ice_client.delete_folder_permission
+        changes = [
+            dict(
+                item_id=item_id,
+                principal=principal_,
+                action="grant",
+                access=access,
+                permission_id=None,
+            )
+            for (item_id, principal_, access) in grants
+        ] + [
+            dict(
+                item_id=item_id,
+                principal=principal_,
+                action="revoke",
+                access=None,
+                permission_id=permission_id,
+            )
+            for (item_id, permission_id, principal_) in revokes
+        ]
+
+        def apply_change(change):
+            change = dict(change, error=None)
+            try:
+                if change["action"] == "revoke":
+                    delete(change["item_id"], change["permission_id"])
+                else:
+                    article, article_id = change["principal"].split(":", 1)
+                    create(
+                        change["item_id"],
+                        group_id=article_id if article == "GROUP" else None,
+                        user_id=article_id if article == "ACCOUNT" else None,
+                        can_write=change["access"] == "write",
+                    )
+            except IOError as err:
+                change["error"] = str(err)
+            return change
+
+        results = iter_parallel(apply_change, changes, max_workers=max_workers)
+        results = list(ice_client.logger.iter_bar(change=results))
+        columns = [
+            "item_id",
+            "principal",
+            "action",
+            "access",
+            "permission_id",
+            "error",
+        ]
+        return pandas.DataFrame(results, columns=columns)
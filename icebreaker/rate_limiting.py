@@ -0,0 +1,295 @@
+"""Client-side limitation of the rate of the requests sent to ICE.
+
+A RateLimiter holds token buckets: one global bucket, and optionally one
+per class of endpoints ("search", "parts", "files", "other"). Before each
+request, the IceClient takes a token from the global bucket and from the
+bucket of the request's class, waiting if they are empty.
+
+The state of the buckets can be kept in memory (shared by the threads of a
+process), in a local file (shared by all processes of the machine), or in
+shared memory (shared with the worker processes started by the process
+which created the limiter).
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+ENDPOINT_CLASSES = ("search", "parts", "files", "other")
+
+
+def endpoint_class(endpoint, files=None):
+    """Return the class of an ICE endpoint, e.g. "search" or "parts"."""
+    if files is not None or endpoint.startswith("file"):
+        return "files"
+    if endpoint.startswith("search"):
+        return "search"
+    if endpoint.startswith("parts"):
+        return "parts"
+    return "other"
+
+
+class TokenBucket:
+    """Token bucket kept in memory and shared by the threads of a process.
+
+    Parameters
+    ----------
+
+    rate
+      Number of tokens (requests) added per second.
+
+    burst
+      Maximal number of tokens in the bucket, i.e. number of requests
+      which can be sent at once after an idle period. Defaults to the rate
+      (or 1 for rates under 1 request/second).
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = max(1, rate) if burst is None else burst
+        self.lock = threading.Lock()
+        self.state = (self.burst, time.time())
+
+    def __getstate__(self):
+        # Thread locks can't be pickled (e.g. sent to a worker process).
+        state = dict(self.__dict__)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def _locked_state(self):
+        """Yield a one-item list with the (tokens, time) state, saved after.
+
+        Subclasses override this method to store the state elsewhere.
+        """
+        with self.lock:
+            state = [self.state]
+            yield state
+            self.state = state[0]
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available. Return 0, or the time to wait."""
+        with self._locked_state() as state:
+            available, last_time = state[0]
+            now = time.time()
+            elapsed = max(0, now - last_time)
+            available = min(self.burst, available + elapsed * self.rate)
+            if available >= tokens:
+                state[0] = (available - tokens, now)
+                return 0
+            state[0] = (available, now)
+            return (tokens - available) / self.rate
+
+    def acquire(self, tokens=1):
+        """Take tokens, waiting if needed. Return the time waited."""
+        waited = 0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket stored in a file, shared by all local processes.
+
+    The file is locked (with ``fcntl.flock``, so on Unix only) during each
+    update. All processes must use the same path, rate and burst.
+
+    Parameters
+    ----------
+
+    path
+      Path to the state file (created if needed).
+
+    rate, burst
+      See ``TokenBucket``.
+    """
+
+    def __init__(self, path, rate, burst=None):
+        TokenBucket.__init__(self, rate, burst=burst)
+        self.path = path
+
+    @contextmanager
+    def _locked_state(self):
+        try:
+            import fcntl
+        except ImportError:
+            raise ImportError(
+                "File rate limiting requires fcntl (Unix only). Use the "
+                "'memory' or 'shared_memory' backends instead."
+            )
+        with open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                initial = (self.burst, time.time())
+                state = [tuple(json.loads(content)) if content else initial]
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(list(state[0])))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SharedMemoryTokenBucket(TokenBucket):
+    """Token bucket in shared memory, inherited by child processes.
+
+    The bucket must be created before the worker processes, which inherit
+    it when they are forked, or receive it (or a RateLimiter using it) as a
+    Process argument.
+
+    Parameters
+    ----------
+
+    rate, burst
+      See ``TokenBucket``.
+
+    mp_context
+      The multiprocessing context used to start the worker processes, if
+      not the default one.
+    """
+
+    def __init__(self, rate, burst=None, mp_context=None):
+        import multiprocessing
+
+        TokenBucket.__init__(self, rate, burst=burst)
+        if mp_context is None:
+            mp_context = multiprocessing.get_context()
+        self.array = mp_context.Array("d", [self.burst, time.time()])
+
+    @contextmanager
+    def _locked_state(self):
+        with self.array.get_lock():
+            state = [tuple(self.array[:])]
+            yield state
+            self.array[:] = list(state[0])
+
+
+class RateLimiter:
+    """Global and per-endpoint-class limits on the rate of ICE requests.
+
+    Examples
+    --------
+
+    >>> limiter = RateLimiter(rate=20, classes_rates=dict(search=2))
+    >>> ice = IceClient(config, rate_limiter=limiter)
+    >>> # Limit shared by all the scripts running on the machine:
+    >>> limiter = RateLimiter(rate=20, backend="file",
+    >>>                       path="/tmp/ice_rate_limit")
+
+    Parameters
+    ----------
+
+    rate
+      Maximal number of requests per second (all classes together), or
+      None for no global limit.
+
+    burst
+      Maximal number of requests sent at once after an idle period.
+
+    classes_rates
+      Dict ``{class: rate}`` or ``{class: (rate, burst)}`` of limits for the
+      endpoint classes "search", "parts", "files" and "other".
+
+    backend
+      Where the buckets are stored: "memory" (shared by the threads of the
+      process), "file" (shared by the processes of the machine) or
+      "shared_memory" (shared with child processes).
+
+    path
+      For the "file" backend, path prefix of the buckets files.
+
+    mp_context
+      For the "shared_memory" backend, the multiprocessing context used to
+      start the worker processes, if not the default one.
+
+    A limiter with the "shared_memory" backend can be passed as an argument
+    to worker processes. Each process then counts its own metrics.
+    """
+
+    def __init__(
+        self,
+        rate=None,
+        burst=None,
+        classes_rates=None,
+        backend="memory",
+        path=None,
+        mp_context=None,
+    ):
+        if backend not in ("memory", "file", "shared_memory"):
+            raise ValueError("Unknown rate limiter backend: %s" % backend)
+        if (backend == "file") and (path is None):
+            raise ValueError("The 'file' backend requires a path.")
+        self.backend = backend
+        self.path = path
+        self.mp_context = mp_context
+        self.buckets = {}
+        if rate is not None:
+            self.buckets["all"] = self._new_bucket("all", rate, burst)
+        for class_name, class_rate in (classes_rates or {}).items():
+            if class_name not in ENDPOINT_CLASSES:
+                raise ValueError("Unknown endpoint class: %s" % class_name)
+            if isinstance(class_rate, (tuple, list)):
+                class_rate, class_burst = class_rate
+            else:
+                class_burst = None
+            self.buckets[class_name] = self._new_bucket(
+                class_name, class_rate, class_burst
+            )
+        self.lock = threading.Lock()
+        self.metrics = {
+            name: dict(requests=0, wait_time=0.0)
+            for name in ENDPOINT_CLASSES
+        }
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def _new_bucket(self, name, rate, burst):
+        if self.backend == "file":
+            path = "%s.%s.json" % (self.path, name)
+            return FileTokenBucket(path, rate, burst=burst)
+        if self.backend == "shared_memory":
+            return SharedMemoryTokenBucket(
+                rate, burst=burst, mp_context=self.mp_context
+            )
+        return TokenBucket(rate, burst=burst)
+
+    def acquire(self, method, endpoint, files=None):
+        """Wait until a request to that endpoint can be sent.
+
+        Returns the time waited, in seconds.
+        """
+        class_name = endpoint_class(endpoint, files=files)
+        waited = 0
+        for name in (class_name, "all"):
+            if name in self.buckets:
+                waited += self.buckets[name].acquire()
+        with self.lock:
+            metrics = self.metrics[class_name]
+            metrics["requests"] += 1
+            metrics["wait_time"] += waited
+        return waited
+
+    def get_metrics(self):
+        """Return the requests count and total wait time of each class."""
+        with self.lock:
+            return {
+                name: dict(metrics) for name, metrics in self.metrics.items()
+            }
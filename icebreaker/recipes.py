@@ -1,6 +1,10 @@
+import os
 import pandas
 import flametree
+from proglog import default_bar_logger
 from .utils import sample_location_string
+from .tables import write_entries_table
+from .record_hashes import write_if_changed
 
 def find_parts_locations_by_name(ice_client, part_names):
     rows = []
@@ -24,27 +28,85 @@ def find_parts_locations_by_name(ice_client, part_names):
 def download_folder_data(ice_client, folder_id=None, folder_name=None,
                          collection="SHARED",
                          columns='default', spreadsheet_file=None,
-                         genbanks_dir=None, logger='bar'):
+                         genbanks_dir=None, logger='bar', batch_size=500):
+    """Download the metadata and/or genbank records of a folder's entries.
+
+    Parameters
+    ----------
+
+    folder_id, folder_name
+      ID of the folder to download, or name of the folder (in which case
+      the folder is searched in the given ``collection``).
+
+    columns
+      List of the entry fields to export in the spreadsheet, or "default".
+
+    spreadsheet_file
+      Path to a ``.xlsx``, ``.csv``, ``.parquet`` or ``.arrow`` file. The
+      entries are streamed to the file by batches of ``batch_size`` entries,
+      so memory use does not grow with the size of the folder.
+
+    genbanks_dir
+      Directory (or zip file) where to write the genbank of each entry.
+      When re-downloading into a directory, the files whose content didn't
+      change are not re-written.
+    """
     logger = default_bar_logger(logger)
     if folder_id is None:
         folder_id = ice_client.get_folder_id(folder_name, collection)
-    entries = ice_client.get_folder_entries(folder_id)
-    
-    if spreadsheet_file is not None:
-        for entry in logger.iter_bar(entry=entries):
-            data = ice_client.get_part_infos(entry['id'])
-            entry.update(data)
-        
-        if columns == 'default':
-            columns = ('name', 'alias', 'basePairCount', 'selectionMarkers',
-                       'hasSample', 'principalInvestigator',
-                       'shortDescription')
-        df = pandas.DataFrame(entries, columns=columns)
-        df.to_excel(spreadsheet_file, index=False)
-    
+    entries = ice_client.get_folder_entries(folder_id, as_iterator=True)
+    _download_entries_data(ice_client, entries, columns=columns,
+                           spreadsheet_file=spreadsheet_file,
+                           genbanks_dir=genbanks_dir, logger=logger,
+                           batch_size=batch_size)
+
+
+def download_collection_data(ice_client, collection="SHARED",
+                             columns='default', spreadsheet_file=None,
+                             genbanks_dir=None, logger='bar',
+                             batch_size=500):
+    """Download the metadata and/or genbank records of a collection's entries.
+
+    See ``download_folder_data`` for a description of the parameters.
+    """
+    logger = default_bar_logger(logger)
+    entries = ice_client.get_collection_entries(collection, as_iterator=True)
+    _download_entries_data(ice_client, entries, columns=columns,
+                           spreadsheet_file=spreadsheet_file,
+                           genbanks_dir=genbanks_dir, logger=logger,
+                           batch_size=batch_size)
+
+
+def _download_entries_data(ice_client, entries, columns, spreadsheet_file,
+                           genbanks_dir, logger, batch_size):
+    """Process the entries in a single pass, one batch at a time."""
+    genbanks_root = None
     if genbanks_dir is not None:
-        genbanks_root = flametree.file_tree(genbanks_dir)
-        for e in logger.iter_bar(entry_record=entries):
-            seq = ice_client.get_sequence(e['id'])
-            genbanks_root._file('%s.gb' % e['name']).write(seq)
-        genbanks_root._close()
\ No newline at end of file
+        if genbanks_dir == "@memory" or genbanks_dir.lower().endswith(".zip"):
+            genbanks_root = flametree.file_tree(genbanks_dir)
+        elif not os.path.exists(genbanks_dir):
+            os.makedirs(genbanks_dir)
+
+    def completed_entries():
+        for entry in logger.iter_bar(entry=entries):
+            if spreadsheet_file is not None:
+                entry.update(ice_client.get_part_infos(entry['id']))
+            if genbanks_dir is not None:
+                seq = ice_client.get_sequence(entry['id'])
+                filename = '%s.gb' % entry['name']
+                if genbanks_root is not None:
+                    genbanks_root._file(filename).write(seq)
+                else:
+                    # Unchanged files are not re-written (nor re-timestamped)
+                    write_if_changed(os.path.join(genbanks_dir, filename),
+                                     seq)
+            yield entry
+
+    if spreadsheet_file is not None:
+        write_entries_table(completed_entries(), spreadsheet_file,
+                            columns=columns, batch_size=batch_size)
+    else:
+        for entry in completed_entries():
+            pass
+    if genbanks_root is not None:
+        genbanks_root._close()
@@ -0,0 +1,160 @@
+"""Content hashes of records, used to skip unchanged uploads and downloads.
+
+The hash of a record only depends on its sequence and features (not on the
+record's name, date, or Genbank formatting), so that a record downloaded
+from ICE has the same hash as the local record it was uploaded from.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from io import StringIO
+
+from Bio import SeqIO
+
+from .tools import ice_genbank_to_record
+
+
+def record_content_hash(
+    record=None, record_text=None, record_format="genbank"
+):
+    """Return a hash of the normalized sequence and features of a record.
+
+    Parameters
+    ----------
+
+    record
+      A Biopython record. Can be omitted if ``record_text`` is provided.
+
+    record_text
+      Genbank or FASTA text of the record.
+
+    record_format
+      Format of ``record_text``, either "genbank" or "fasta".
+    """
+    if record is None:
+        if record_format == "genbank":
+            record = ice_genbank_to_record(record_text)
+        else:
+            record = SeqIO.read(StringIO(record_text), record_format)
+    features = sorted(
+        [
+            (
+                feature.type,
+                str(feature.location),
+                sorted(
+                    (key, [str(v) for v in values])
+                    for key, values in feature.qualifiers.items()
+                ),
+            )
+            for feature in record.features
+        ],
+        key=json.dumps,
+    )
+    content = json.dumps([str(record.seq).upper(), features])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def write_if_changed(filepath, text):
+    """Write text in a file unless the file has already that exact content.
+
+    Returns True if the file was written.
+    """
+    if os.path.exists(filepath):
+        with open(filepath, "r") as f:
+            if f.read() == text:
+                return False
+    with open(filepath, "w") as f:
+        f.write(text)
+    return True
+
+
+class LocalRecordHashStore:
+    """Store of the hashes of the records attached to ICE parts, in SQLite.
+
+    The store can be shared by several threads.
+
+    Parameters
+    ----------
+
+    path
+      Path to the SQLite file (created if needed), or ":memory:".
+    """
+
+    def __init__(self, path="ice_record_hashes.sqlite"):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS record_hashes "
+            "(part_id TEXT PRIMARY KEY, hash TEXT NOT NULL)"
+        )
+        self.connection.commit()
+
+    def get(self, part_id):
+        """Return the stored hash for the part, or None."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT hash FROM record_hashes WHERE part_id=?",
+                (str(part_id),),
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, part_id, record_hash):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO record_hashes VALUES (?, ?)",
+                (str(part_id), record_hash),
+            )
+            self.connection.commit()
+
+    def delete(self, part_id):
+        with self.lock:
+            self.connection.execute(
+                "DELETE FROM record_hashes WHERE part_id=?", (str(part_id),)
+            )
+            self.connection.commit()
+
+
+class CustomFieldRecordHashStore:
+    """Store of record hashes in a custom field of the ICE parts.
+
+    Contrary to ``LocalRecordHashStore``, the hashes are visible to all the
+    users of the ICE instance, but reading a hash costs one request.
+
+    Parameters
+    ----------
+
+    ice_client
+      The IceClient used to read and write the custom fields.
+
+    field_name
+      Name of the custom field holding the hash.
+    """
+
+    def __init__(self, ice_client, field_name="icebreaker_record_hash"):
+        self.ice_client = ice_client
+        self.field_name = field_name
+
+    def _get_field(self, part_id):
+        fields = self.ice_client.get_part_custom_fields_list(part_id)
+        for field in fields:
+            if field["name"] == self.field_name:
+                return field
+        return None
+
+    def get(self, part_id):
+        field = self._get_field(part_id)
+        return None if field is None else field["value"]
+
+    def set(self, part_id, record_hash):
+        self.delete(part_id)
+        self.ice_client.set_part_custom_field(
+            part_id, self.field_name, record_hash
+        )
+
+    def delete(self, part_id):
+        field = self._get_field(part_id)
+        if field is not None:
+            self.ice_client.delete_custom_field(field["id"])
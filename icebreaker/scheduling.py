@@ -0,0 +1,182 @@
+"""Scheduling of ICE requests by priority class (interactive vs. bulk).
+
+Each request belongs to a class, given by the ``request_class`` context
+manager. Requests made from the worker threads of ``tools.iter_parallel``
+(i.e. by all bulk methods) are in the "bulk" class by default, and other
+requests are in the scheduler's default class ("interactive").
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+_REQUEST_CLASS = contextvars.ContextVar("request_class", default=None)
+
+
+@contextmanager
+def request_class(name):
+    """Context manager setting the class of the requests made inside.
+
+    Examples
+    --------
+
+    >>> with request_class("bulk"):
+    >>>     download_folder_data(ice, folder_id, "data.zip")
+    """
+    token = _REQUEST_CLASS.set(name)
+    try:
+        yield
+    finally:
+        _REQUEST_CLASS.reset(token)
+
+
+def get_request_class(default=None):
+    """Return the request class set in the current context, or a default."""
+    name = _REQUEST_CLASS.get()
+    return default if name is None else name
+
+
+def call_as_bulk(function, *args):
+    """Call the function with the "bulk" request class, unless one is set.
+
+    This is used by ``tools.iter_parallel`` in its worker threads.
+    """
+    if _REQUEST_CLASS.get() is None:
+        _REQUEST_CLASS.set("bulk")
+    return function(*args)
+
+
+class RequestScheduler:
+    """Scheduler giving request slots by priority, within class shares.
+
+    At most ``max_concurrent`` requests are sent at the same time. When a
+    slot is free, it goes to the oldest waiting request of the class with
+    the highest priority which is under its concurrency share. With the
+    default classes, interactive requests are sent before any waiting bulk
+    request, and bulk requests never use more than 3/4 of the slots, so
+    some slots are always available for interactive requests.
+
+    Examples
+    --------
+
+    >>> scheduler = RequestScheduler(max_concurrent=8)
+    >>> ice = IceClient(config, scheduler=scheduler)
+    >>> scheduler.get_metrics()["bulk"]["queue_depth"]
+
+    Parameters
+    ----------
+
+    max_concurrent
+      Total number of concurrent requests.
+
+    classes
+      Dict ``{class_name: (priority, share)}`` where requests of classes
+      with a lower priority number are sent first, and share is the
+      maximal number of concurrent requests of that class.
+
+    default_class
+      Class of the requests made outside of any ``request_class`` context,
+      or in a class which is not in ``classes``.
+    """
+
+    def __init__(
+        self,
+        max_concurrent=8,
+        classes=None,
+        default_class="interactive",
+    ):
+        if classes is None:
+            bulk_share = max(1, (3 * max_concurrent) // 4)
+            classes = dict(
+                interactive=(0, max_concurrent), bulk=(1, bulk_share)
+            )
+        if default_class not in classes:
+            raise ValueError("Unknown default class: %s" % default_class)
+        self.max_concurrent = max_concurrent
+        self.classes = classes
+        self.default_class = default_class
+        self.in_flight = 0
+        self.queues = {name: deque() for name in classes}
+        self.metrics = {
+            name: dict(
+                in_flight=0,
+                requests=0,
+                max_queue_depth=0,
+                wait_time=0.0,
+                latency=0.0,
+            )
+            for name in classes
+        }
+        self.condition = threading.Condition()
+
+    def _next_ticket(self):
+        """Return the ticket of the request which should be sent next."""
+        if self.in_flight >= self.max_concurrent:
+            return None
+        by_priority = sorted(self.classes.items(), key=lambda c: c[1][0])
+        for name, (priority, share) in by_priority:
+            queue = self.queues[name]
+            if len(queue) and (self.metrics[name]["in_flight"] < share):
+                return queue[0]
+        return None
+
+    def acquire(self, class_name=None):
+        """Wait for a request slot. Return the class name of the request.
+
+        By default, the class is the one of the current context.
+        """
+        if class_name is None:
+            class_name = get_request_class(self.default_class)
+        if class_name not in self.classes:
+            class_name = self.default_class
+        ticket = object()
+        start = time.time()
+        with self.condition:
+            queue = self.queues[class_name]
+            queue.append(ticket)
+            metrics = self.metrics[class_name]
+            metrics["max_queue_depth"] = max(
+                metrics["max_queue_depth"], len(queue)
+            )
+            while self._next_ticket() is not ticket:
+                self.condition.wait()
+            queue.popleft()
+            self.in_flight += 1
+            metrics["in_flight"] += 1
+            metrics["wait_time"] += time.time() - start
+            # Another request may now be sendable (e.g. from another class).
+            self.condition.notify_all()
+        return class_name
+
+    def release(self, class_name, latency=0):
+        """Free the slot of a request of the given class."""
+        with self.condition:
+            self.in_flight -= 1
+            metrics = self.metrics[class_name]
+            metrics["in_flight"] -= 1
+            metrics["requests"] += 1
+            metrics["latency"] += latency
+            self.condition.notify_all()
+
+    def get_metrics(self):
+        """Return the queue and latency statistics of each class.
+
+        For each class: requests sent, requests in flight, current and
+        maximal queue depths, and mean wait time and latency in seconds.
+        """
+        with self.condition:
+            result = {}
+            for name, metrics in self.metrics.items():
+                n_started = metrics["requests"] + metrics["in_flight"]
+                n_requests = max(1, metrics["requests"])
+                result[name] = dict(
+                    requests=metrics["requests"],
+                    in_flight=metrics["in_flight"],
+                    queue_depth=len(self.queues[name]),
+                    max_queue_depth=metrics["max_queue_depth"],
+                    mean_wait_time=metrics["wait_time"] / max(1, n_started),
+                    mean_latency=metrics["latency"] / n_requests,
+                )
+            return result
@@ -0,0 +1,239 @@
+"""Packed store of raw sequences, for fast bulk access to many parts.
+
+A store is made of two files: ``name.seq`` with the concatenated bases of
+all parts (uppercase ASCII, no separators), and ``name.index.json`` mapping
+each part ID to the offset, length and topology of its sequence. The
+sequences file is memory-mapped when the store is opened, so sequences are
+read as zero-copy slices, without per-part file opening or Genbank parsing.
+"""
+
+import json
+import mmap
+import os
+import re
+
+import numpy
+import proglog
+
+_NOT_BASES = re.compile(r"[^A-Za-z]")
+
+
+def genbank_bases(genbank_text):
+    """Return ``(bases, is_circular)`` from a Genbank text.
+
+    This only reads the LOCUS line and the ORIGIN section, which is much
+    faster than a full Biopython parsing.
+    """
+    first_line = genbank_text[: genbank_text.find("\n")].lower()
+    start = genbank_text.find("\nORIGIN")
+    if start == -1:
+        return "", False
+    start = genbank_text.find("\n", start + 1)
+    end = genbank_text.find("\n//", start)
+    if end == -1:
+        end = len(genbank_text)
+    bases = _NOT_BASES.sub("", genbank_text[start:end]).upper()
+    return bases, ("circular" in first_line)
+
+
+def _store_paths(path):
+    if path.endswith(".seq"):
+        path = path[: -len(".seq")]
+    return path + ".seq", path + ".index.json"
+
+
+class SequenceStoreWriter:
+    """Write sequences one after the other into a packed sequence store.
+
+    Examples
+    --------
+
+    >>> with SequenceStoreWriter("parts") as writer:
+    >>>     writer.add(1234, "ATGCTGC", circular=True)
+
+    Parameters
+    ----------
+
+    path
+      Path of the store, without extension (``.seq`` and ``.index.json``
+      files are created).
+    """
+
+    def __init__(self, path):
+        self.sequences_path, self.index_path = _store_paths(path)
+        self.sequences_file = open(self.sequences_path, "wb")
+        self.index = {}
+        self.offset = 0
+
+    def add(self, part_id, sequence, circular=False, name=None):
+        """Append the sequence (a string of bases) of a part to the store."""
+        data = sequence.upper().encode("ascii")
+        self.sequences_file.write(data)
+        self.index[str(part_id)] = [self.offset, len(data), circular, name]
+        self.offset += len(data)
+
+    def add_genbank(self, part_id, genbank_text, name=None):
+        """Append the sequence of a part, from its Genbank text."""
+        bases, circular = genbank_bases(genbank_text)
+        self.add(part_id, bases, circular=circular, name=name)
+
+    def close(self):
+        self.sequences_file.close()
+        with open(self.index_path, "w") as f:
+            json.dump(self.index, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def write_sequence_store(
+    path,
+    ice_client=None,
+    parts_ids=None,
+    genbanks=None,
+    max_workers=4,
+    logger="bar",
+):
+    """Build a packed sequence store from ICE parts (or Genbank texts).
+
+    Examples
+    --------
+
+    >>> entries = ice.get_folder_entries(folder_id)
+    >>> store_path = write_sequence_store(
+    >>>     "my_folder", ice, parts_ids=[e["id"] for e in entries])
+    >>> store = SequenceStore(store_path)
+
+    Parameters
+    ----------
+
+    path
+      Path of the store, without extension.
+
+    ice_client, parts_ids
+      The sequences of the parts are downloaded concurrently from ICE with
+      ``ice_client.iter_sequences``. Parts without sequence are skipped. The
+      client can also be an OfflineIceClient.
+
+    genbanks
+      Alternatively to ``ice_client``, an iterable of ``(part_id,
+      genbank_text)``, for instance ``IceMirror.iter_sequences()``.
+
+    max_workers
+      Number of sequences downloaded concurrently from ICE.
+
+    logger
+      Either None, "bar" for a progress bar, or a Proglog logger.
+    """
+    logger = proglog.default_bar_logger(logger)
+    if genbanks is None:
+        genbanks = ice_client.iter_sequences(
+            parts_ids, max_workers=max_workers
+        )
+    with SequenceStoreWriter(path) as writer:
+        for part_id, genbank in logger.iter_bar(part=genbanks):
+            if genbank is not None:
+                writer.add_genbank(part_id, genbank)
+    return writer.sequences_path
+
+
+class SequenceStore:
+    """Read-only access to a packed sequence store, via a memory map.
+
+    Examples
+    --------
+
+    >>> store = SequenceStore("my_folder")
+    >>> store.get_sequence(1234)  # => "ATGCTGC..."
+    >>> store[1234]  # => zero-copy memoryview of the bases
+    >>> store.get_array(1234)  # => zero-copy uint8 NumPy array
+
+    Parameters
+    ----------
+
+    path
+      Path of the store, with or without the ``.seq`` extension.
+    """
+
+    def __init__(self, path):
+        self.sequences_path, self.index_path = _store_paths(path)
+        with open(self.index_path, "r") as f:
+            self.index = json.load(f)
+        self._file = open(self.sequences_path, "rb")
+        if os.path.getsize(self.sequences_path) == 0:
+            self._mmap = None
+            self.buffer = memoryview(b"")
+        else:
+            self._mmap = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+            self.buffer = memoryview(self._mmap)
+
+    def _location(self, part_id):
+        location = self.index.get(str(part_id), None)
+        if location is None:
+            raise KeyError("Part %s is not in the store." % part_id)
+        return location
+
+    def __getitem__(self, part_id):
+        """Return a (zero-copy) memoryview of the bases of the part."""
+        offset, length, _, _ = self._location(part_id)
+        return self.buffer[offset : offset + length]
+
+    def __contains__(self, part_id):
+        return str(part_id) in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def parts_ids(self):
+        """List of the IDs of all parts in the store (as integers)."""
+        return [int(i) if i.isdigit() else i for i in self.index]
+
+    def get_sequence(self, part_id):
+        """Return the sequence of the part, as a string."""
+        return self[part_id].tobytes().decode("ascii")
+
+    def get_array(self, part_id):
+        """Return a (zero-copy) uint8 NumPy array of the part's bases."""
+        offset, length, _, _ = self._location(part_id)
+        if length == 0:
+            return numpy.zeros(0, dtype="uint8")
+        return numpy.frombuffer(
+            self._mmap, dtype="uint8", count=length, offset=offset
+        )
+
+    def is_circular(self, part_id):
+        return self._location(part_id)[2]
+
+    def items(self):
+        """Iterate over ``(part_id, memoryview)`` for all parts, in order."""
+        for part_id in self.parts_ids:
+            yield part_id, self[part_id]
+
+    def close(self):
+        """Close the store's file.
+
+        Memoryviews and arrays returned by the store remain valid after
+        closing: while some are alive, the memory map is left open, and is
+        closed when the last of them is garbage-collected.
+        """
+        self.buffer.release()
+        self.buffer = memoryview(b"")
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # Slices are still exported (see docstring).
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
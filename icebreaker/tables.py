@@ -0,0 +1,524 @@
+"""Tabular and compact representations of ICE entries metadata.
+
+The writers defined here receive rows batch by batch, so that exporting the
+metadata of very large folders or collections runs in bounded memory. The
+builders and records at the end of the file are used by the listing and
+search methods of ``IceClient`` to return compact results.
+"""
+
+import csv
+import json
+import sys
+from itertools import islice
+
+import pandas
+
+DEFAULT_COLUMNS = (
+    "name",
+    "alias",
+    "basePairCount",
+    "selectionMarkers",
+    "hasSample",
+    "principalInvestigator",
+    "shortDescription",
+)
+
+# Types of the best-known fields of ICE entries, used to build typed
+# (Arrow/Parquet) columns. Other fields are exported as strings.
+COLUMNS_TYPES = {
+    "id": "int",
+    "recordId": "str",
+    "partId": "str",
+    "name": "str",
+    "alias": "str",
+    "type": "str",
+    "status": "str",
+    "owner": "str",
+    "ownerEmail": "str",
+    "creator": "str",
+    "creatorEmail": "str",
+    "principalInvestigator": "str",
+    "shortDescription": "str",
+    "basePairCount": "int",
+    "featureCount": "int",
+    "viewCount": "int",
+    "creationTime": "int",
+    "modificationTime": "int",
+    "hasSample": "bool",
+    "hasSequence": "bool",
+    "hasOriginalSequence": "bool",
+    "visible": "str",
+    "selectionMarkers": "list",
+    "links": "list",
+}
+
+
+def _to_python_type(value, column_type):
+    if value is None:
+        return None
+    if column_type == "int":
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    if column_type == "bool":
+        return bool(value)
+    if column_type == "list":
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        return [
+            v if isinstance(v, str) else json.dumps(v, sort_keys=True)
+            for v in value
+        ]
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, sort_keys=True)
+    return str(value)
+
+
+def entry_to_row(entry, columns=DEFAULT_COLUMNS):
+    """Return a list of typed values for the given columns of an entry.
+
+    Values are converted according to ``COLUMNS_TYPES`` (lists of strings for
+    list fields, JSON strings for nested dicts, etc.).
+    """
+    return [
+        _to_python_type(entry.get(column), COLUMNS_TYPES.get(column, "str"))
+        for column in columns
+    ]
+
+
+def _flat_cell(value):
+    """Convert a cell to something spreadsheets/CSV can store."""
+    if isinstance(value, list):
+        return ", ".join(value)
+    return value
+
+
+class TableWriter:
+    """Base class for the streaming table writers.
+
+    Writers are used as context managers and receive successive batches of
+    rows (lists of values, in the order of ``columns``) via ``write_rows``.
+    """
+
+    def __init__(self, target, columns=DEFAULT_COLUMNS):
+        self.target = target
+        self.columns = list(columns)
+        self.rows_written = 0
+
+    def write_rows(self, rows):
+        rows = list(rows)
+        if len(rows):
+            self._write_rows(rows)
+            self.rows_written += len(rows)
+
+    def _write_rows(self, rows):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class CsvTableWriter(TableWriter):
+    """Write rows to a CSV file, as they arrive."""
+
+    def __init__(self, target, columns=DEFAULT_COLUMNS):
+        TableWriter.__init__(self, target, columns)
+        self.file = open(target, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.columns)
+
+    def _write_rows(self, rows):
+        self.writer.writerows([[_flat_cell(v) for v in r] for r in rows])
+
+    def close(self):
+        self.file.close()
+
+
+class XlsxTableWriter(TableWriter):
+    """Write rows to an Excel spreadsheet in constant memory.
+
+    This uses the write-only mode of openpyxl, where rows are streamed to
+    the file instead of being kept in an in-memory workbook.
+    """
+
+    def __init__(self, target, columns=DEFAULT_COLUMNS):
+        try:
+            import openpyxl
+        except ImportError:
+            raise ImportError("Install openpyxl to export to XLSX.")
+        TableWriter.__init__(self, target, columns)
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(self.columns)
+
+    def _write_rows(self, rows):
+        for row in rows:
+            self.sheet.append([_flat_cell(v) for v in row])
+
+    def close(self):
+        self.workbook.save(self.target)
+
+
+class ArrowTableWriter(TableWriter):
+    """Write rows as record batches of a typed Arrow IPC or Parquet file.
+
+    Parameters
+    ----------
+
+    target
+      Path of the file to write.
+
+    columns
+      List of the entry fields to export.
+
+    file_format
+      Either "parquet" or "arrow" (Arrow IPC file, a.k.a. Feather v2).
+
+    columns_types
+      Dict ``{column: type}`` of the columns types ("int", "bool", "str" or
+      "list"), ``COLUMNS_TYPES`` by default. Other columns are strings.
+    """
+
+    def __init__(
+        self,
+        target,
+        columns=DEFAULT_COLUMNS,
+        file_format="parquet",
+        columns_types=None,
+    ):
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError("Install pyarrow to export to Parquet/Arrow.")
+        TableWriter.__init__(self, target, columns)
+        self.pyarrow = pyarrow
+        self.schema = entries_arrow_schema(self.columns, columns_types)
+        if file_format == "parquet":
+            import pyarrow.parquet
+
+            self.writer = pyarrow.parquet.ParquetWriter(target, self.schema)
+        elif file_format == "arrow":
+            import pyarrow.ipc
+
+            self.writer = pyarrow.ipc.new_file(target, self.schema)
+        else:
+            raise ValueError("Unknown file format: %s" % file_format)
+
+    def _write_rows(self, rows):
+        arrays = [
+            self.pyarrow.array([row[i] for row in rows], type=field.type)
+            for i, field in enumerate(self.schema)
+        ]
+        batch = self.pyarrow.RecordBatch.from_arrays(
+            arrays, schema=self.schema
+        )
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+
+
+def entries_arrow_schema(columns=DEFAULT_COLUMNS, columns_types=None):
+    """Return a pyarrow schema with typed fields for the given columns.
+
+    The types are given by ``columns_types`` (``COLUMNS_TYPES`` by default).
+    """
+    import pyarrow
+
+    if columns_types is None:
+        columns_types = COLUMNS_TYPES
+    arrow_types = {
+        "int": pyarrow.int64(),
+        "bool": pyarrow.bool_(),
+        "str": pyarrow.string(),
+        "list": pyarrow.list_(pyarrow.string()),
+    }
+    return pyarrow.schema(
+        [
+            (column, arrow_types[columns_types.get(column, "str")])
+            for column in columns
+        ]
+    )
+
+
+def table_writer(target, columns=DEFAULT_COLUMNS, columns_types=None):
+    """Return a table writer adapted to the target file's extension.
+
+    Supported extensions are ``.parquet``, ``.arrow``/``.feather``,
+    ``.xlsx`` and ``.csv``. The ``columns_types`` are used for Parquet and
+    Arrow files (see ``ArrowTableWriter``).
+    """
+    extension = target.lower().split(".")[-1]
+    if extension in ("parquet", "pq"):
+        return ArrowTableWriter(
+            target, columns, "parquet", columns_types=columns_types
+        )
+    if extension in ("arrow", "feather"):
+        return ArrowTableWriter(
+            target, columns, "arrow", columns_types=columns_types
+        )
+    if extension == "xlsx":
+        return XlsxTableWriter(target, columns)
+    if extension == "csv":
+        return CsvTableWriter(target, columns)
+    raise ValueError("Unsupported table format: %s" % target)
+
+
+def write_entries_table(
+    entries, target, columns="default", batch_size=500, logger=None
+):
+    """Stream ICE entries (dicts) to a Parquet/Arrow/XLSX/CSV file.
+
+    Parameters
+    ----------
+
+    entries
+      An iterable (typically an iterator returned with ``as_iterator=True``)
+      of entries dicts.
+
+    target
+      Path to the file to write. The format is deduced from the extension.
+
+    columns
+      List of the entry fields to export, or "default".
+
+    batch_size
+      Number of entries per batch written to the file. Only that many rows
+      are ever kept in memory.
+
+    logger
+      Either None or a Proglog logger used to report progress.
+
+    Returns
+    -------
+
+    rows_written
+      The total number of entries written.
+    """
+    if columns == "default":
+        columns = DEFAULT_COLUMNS
+    if logger is not None:
+        entries = logger.iter_bar(entry=entries)
+    entries = iter(entries)
+    with table_writer(target, columns=columns) as writer:
+        while True:
+            batch = list(islice(entries, batch_size))
+            if len(batch) == 0:
+                break
+            writer.write_rows([entry_to_row(e, columns) for e in batch])
+    return writer.rows_written
+
+
+# COMPACT REPRESENTATIONS OF ENTRIES
+
+
+def get_entry_field(entry, field):
+    """Return the value of a field, which can be nested (e.g. "owner.email")
+
+    Returns None if the field (or one of its parents) is missing.
+    """
+    for key in field.split("."):
+        if not isinstance(entry, dict):
+            return None
+        entry = entry.get(key)
+    return entry
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def project_entry(entry, fields):
+    """Return a dict with only the given (possibly nested) fields."""
+    return {field: _intern(get_entry_field(entry, field)) for field in fields}
+
+
+def entry_record_class(fields):
+    """Return a lightweight slotted class storing the given fields.
+
+    Dotted (nested) field names become attributes with underscores, e.g.
+    ``owner.email`` is stored as ``owner_email``.
+    """
+    attributes = tuple(field.replace(".", "_") for field in fields)
+
+    def __init__(self, *values):
+        for attribute, value in zip(attributes, values):
+            setattr(self, attribute, value)
+
+    def __repr__(self):
+        return "EntryRecord(%s)" % ", ".join(
+            "%s=%s" % (a, repr(getattr(self, a))) for a in attributes
+        )
+
+    def _asdict(self):
+        return {a: getattr(self, a) for a in attributes}
+
+    return type(
+        "EntryRecord",
+        (object,),
+        dict(
+            __slots__=attributes,
+            __init__=__init__,
+            __repr__=__repr__,
+            _asdict=_asdict,
+            fields=tuple(fields),
+        ),
+    )
+
+
+def entries_as_records(entries, fields=None):
+    """Yield slotted records (with interned strings) from entries dicts.
+
+    If no ``fields`` are provided, the keys of the first entry are used.
+    """
+    record_class = None
+    for entry in entries:
+        if record_class is None:
+            if fields is None:
+                fields = list(entry.keys())
+            record_class = entry_record_class(fields)
+        yield record_class(
+            *[_intern(get_entry_field(entry, f)) for f in fields]
+        )
+
+
+class EntriesTableBuilder:
+    """Build a columnar table (DataFrame or Arrow) from entries, one by one.
+
+    Entries are never kept as dicts: only the projected fields are appended
+    to per-column lists (with interned strings). For Arrow output, columns
+    are converted to typed record batches every ``chunk_size`` entries.
+
+    Parameters
+    ----------
+
+    fields
+      List of (possibly nested, e.g. "owner.email") fields to keep. If None,
+      all the top-level fields encountered are kept (dataframe output), or
+      the fields of the first entry (Arrow output).
+
+    output
+      Either "dataframe" for a pandas DataFrame or "arrow" for a pyarrow
+      Table.
+
+    chunk_size
+      Number of rows converted at once to an Arrow record batch.
+    """
+
+    def __init__(self, fields=None, output="dataframe", chunk_size=1000):
+        if output not in ("dataframe", "arrow"):
+            raise ValueError("Unknown table output: %s" % output)
+        self.output = output
+        self.fields = None if fields is None else list(fields)
+        self.chunk_size = chunk_size
+        self.columns = {}
+        self.n_rows = 0
+        self.n_buffered_rows = 0
+        self.batches = []
+        if self.fields is not None:
+            self.columns = {field: [] for field in self.fields}
+
+    def add(self, entry):
+        """Append one entry (dict) to the table."""
+        if self.fields is None:
+            if self.output == "arrow":
+                self.fields = list(entry.keys())
+                self.columns = {field: [] for field in self.fields}
+            else:
+                for field in entry:
+                    if field not in self.columns:
+                        self.columns[field] = self.n_rows * [None]
+        if self.output == "arrow":
+            row = entry_to_row(
+                {f: get_entry_field(entry, f) for f in self.fields},
+                self.fields,
+            )
+            for field, value in zip(self.fields, row):
+                self.columns[field].append(_intern(value))
+        else:
+            for field, values in self.columns.items():
+                values.append(_intern(get_entry_field(entry, field)))
+        self.n_rows += 1
+        self.n_buffered_rows += 1
+        if self.output == "arrow" and self.n_buffered_rows >= self.chunk_size:
+            self._flush_arrow_batch()
+
+    def extend(self, entries):
+        """Append all entries of an iterable to the table."""
+        for entry in entries:
+            self.add(entry)
+        return self
+
+    def _flush_arrow_batch(self):
+        import pyarrow
+
+        schema = entries_arrow_schema(self.fields)
+        arrays = [
+            pyarrow.array(self.columns[f.name], type=f.type) for f in schema
+        ]
+        self.batches.append(
+            pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+        )
+        self.columns = {field: [] for field in self.fields}
+        self.n_buffered_rows = 0
+
+    def build(self):
+        """Return the final DataFrame or Arrow Table."""
+        if self.output == "dataframe":
+            return pandas.DataFrame(self.columns, columns=list(self.columns))
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError("Install pyarrow to get Arrow tables.")
+        if self.fields is None:
+            return pyarrow.table({})
+        if self.n_buffered_rows:
+            self._flush_arrow_batch()
+        return pyarrow.Table.from_batches(
+            self.batches, schema=entries_arrow_schema(self.fields)
+        )
+
+
+def format_entries(entries, output="dicts", fields=None):
+    """Convert an iterator of entries dicts into the required output.
+
+    Parameters
+    ----------
+
+    entries
+      An iterator over entries dicts.
+
+    output
+      "dicts" (plain dicts, projected on ``fields`` if provided), "records"
+      (lightweight slotted records), "dataframe" or "arrow" (columnar
+      tables built incrementally from the iterator).
+
+    fields
+      List of (possibly nested, e.g. "owner.email") fields to keep. Use None
+      to keep all the fields.
+
+    Returns
+    -------
+
+    An iterator for "dicts" and "records", a table for "dataframe" and
+    "arrow".
+    """
+    if output == "dicts":
+        if fields is None:
+            return entries
+        return (project_entry(entry, fields) for entry in entries)
+    if output == "records":
+        return entries_as_records(entries, fields=fields)
+    if output in ("dataframe", "arrow"):
+        builder = EntriesTableBuilder(fields=fields, output=output)
+        return builder.extend(entries).build()
+    raise ValueError("Unknown output: %s" % output)
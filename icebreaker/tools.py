@@ -1,8 +1,29 @@
 from io import StringIO
+from collections import deque
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor,
+                                wait, FIRST_COMPLETED)
+from functools import partial
+from itertools import islice
 from Bio import SeqIO
 from fuzzywuzzy import process
+import contextvars
+import json
+import multiprocessing
+import os
 import re
 
+from .scheduling import call_as_bulk
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 def did_you_mean(name, other_names, limit=5, min_score=50):
     results = process.extract(name, list(other_names), limit=limit)
     return [e for (e, score) in results if score >= min_score]
@@ -20,6 +41,17 @@ def ice_genbank_to_record(genbank_txt):
     genbank_txt = '\n'.join(lines)
     return SeqIO.read(StringIO(genbank_txt), format='genbank')
 
+def ice_genbank_pair_to_record(id_and_genbank):
+    """Return ``(id, record)`` for an ``(id, genbank_text)`` pair.
+
+    The record is None if the Genbank text is None. This function is used
+    to parse records in worker processes.
+    """
+    id, genbank_txt = id_and_genbank
+    if genbank_txt is None:
+        return id, None
+    return id, ice_genbank_to_record(genbank_txt)
+
 def load_record(filename, name="unnamed", fmt='auto'):
     """Load a FASTA/Genbank/... record"""
     if fmt is not 'auto':
@@ -41,3 +73,179 @@ def sanitize_well_name(well_name):
         raise ValueError("%s is not a valid well name." % well_name)
     letter, number = matches.groups()
     return letter + "%02d" % int(number)
+
+def json_loads(text):
+    """Parse JSON text or bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def _project(item, fields):
+    """Keep only the given keys (or parents of dotted nested fields)."""
+    if fields is None or not isinstance(item, dict):
+        return item
+    keys = set(field.split(".")[0] for field in fields)
+    return {key: value for key, value in item.items() if key in keys}
+
+def iter_json_items(source, items_path="", fields=None):
+    """Iterate over the elements of a JSON array, possibly incrementally.
+
+    Parameters
+    ----------
+
+    source
+      Either JSON text/bytes, or a binary file-like object (such as the raw
+      stream of an HTTP response). File-like objects are parsed
+      incrementally with ijson when it is installed, so that items are
+      yielded as they are decoded without holding the full document.
+
+    items_path
+      Dot-separated path to the array in the document, e.g. "entries" for
+      ``{"count": 10, "entries": [...]}``. Use "" for a top-level array.
+
+    fields
+      If provided, only these keys of each (dict) item are kept. For nested
+      fields like "owner.email", the whole "owner" value is kept.
+    """
+    if hasattr(source, "read"):
+        if ijson is not None:
+            prefix = (items_path + ".item") if items_path else "item"
+            for item in ijson.items(source, prefix, use_float=True):
+                yield _project(item, fields)
+            return
+        source = source.read()
+    data = json_loads(source)
+    for key in items_path.split(".") if items_path else []:
+        data = data[key]
+    for item in data:
+        yield _project(item, fields)
+
+def iter_parallel(function, items, max_workers=4, ordered=True, window=None):
+    """Yield ``function(item)`` for each item, computed in a thread pool.
+
+    Only ``window`` (default ``2 * max_workers``) items are submitted ahead
+    of the consumer, so ``items`` can be a long (or infinite) iterator.
+    If the consumer stops early, pending calls are cancelled.
+
+    Parameters
+    ----------
+
+    function
+      Function to call on each item (typically a function doing ICE
+      requests).
+
+    items
+      Iterable of items.
+
+    max_workers
+      Number of threads computing results concurrently.
+
+    ordered
+      If True, results are yielded in the order of ``items``. Else, they
+      are yielded as soon as they are computed.
+
+    The calls run in a copy of the caller's context (see
+    ``scheduling.request_class``), with the "bulk" request class if the
+    caller didn't set any.
+    """
+    if window is None:
+        window = 2 * max_workers
+
+    def call_in_context(context_and_item):
+        context, item = context_and_item
+        return context.run(call_as_bulk, function, item)
+
+    # The contexts are copied in the consumer's thread, as items are taken.
+    items = ((contextvars.copy_context(), item) for item in items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = _iter_executor_results(
+            executor, call_in_context, items, window, ordered)
+        try:
+            for result in results:
+                yield result
+        finally:
+            results.close()
+
+def _iter_executor_results(executor, function, items, window, ordered):
+    """Submit function(item) to the executor, keeping ``window`` pending."""
+    pending = deque()
+
+    def pop_results():
+        if ordered:
+            return [pending.popleft().result()]
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+        return [future.result() for future in done]
+
+    try:
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= window:
+                for result in pop_results():
+                    yield result
+        while len(pending):
+            for result in pop_results():
+                yield result
+    finally:
+        for future in pending:
+            future.cancel()
+
+def _apply_to_chunk(function, chunk):
+    return [function(item) for item in chunk]
+
+def _default_start_method():
+    # Forking a process while other threads run (e.g. the download threads
+    # of iter_parallel) can deadlock the child, so fork is never used.
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+def iter_parallel_processes(function, items, processes=None, chunk_size=20,
+                            ordered=True, window=None, start_method=None):
+    """Yield ``function(item)`` for each item, computed in a process pool.
+
+    This is the equivalent of ``iter_parallel`` for CPU-bound functions
+    (e.g. Genbank parsing). Items are sent to the processes by chunks of
+    ``chunk_size`` to limit the inter-process communication overhead, and
+    only ``window`` chunks (default ``2 * processes``) are pending at any
+    time, so that ``items`` (e.g. an ``iter_parallel`` iterator of
+    downloads) keeps being consumed while the processes work.
+
+    ``function`` and the items must be picklable (e.g. ``function`` must
+    be defined at the top level of a module).
+
+    Parameters
+    ----------
+
+    processes
+      Number of processes. Defaults to the number of CPUs.
+
+    ordered
+      If True, results are yielded in the order of ``items``. Else, chunks
+      of results are yielded as soon as they are computed.
+
+    start_method
+      Multiprocessing start method of the processes. Defaults to
+      "forkserver" where available, else "spawn" ("fork" is unsafe when
+      ``items`` is produced by threads).
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if window is None:
+        window = 2 * processes
+    items = iter(items)
+    chunks = iter(lambda: list(islice(items, chunk_size)), [])
+    if start_method is None:
+        start_method = _default_start_method()
+    mp_context = multiprocessing.get_context(start_method)
+    with ProcessPoolExecutor(max_workers=processes,
+                             mp_context=mp_context) as executor:
+        results = _iter_executor_results(
+            executor, partial(_apply_to_chunk, function), chunks, window,
+            ordered)
+        try:
+            for chunk_results in results:
+                for result in chunk_results:
+                    yield result
+        finally:
+            results.close()
@@ -16,4 +16,7 @@ setup(
     packages=find_packages(exclude='docs'),
     include_package_data=True,
     install_requires=["requests>=2.20.0", "fuzzywuzzy", "proglog", "biopython",
-                      "pandas", "pyyaml", "requests-cache", "flametree"])
+                      "pandas", "numpy", "pyyaml", "requests-cache",
+                      "flametree", 'contextvars; python_version < "3.7"'],
+    extras_require={"tables": ["pyarrow", "openpyxl"],
+                    "fast": ["orjson", "ijson>=3.1"]})
@@ -0,0 +1,297 @@
+"""IceClient answering requests from in-memory data, for offline tests."""
+
+import itertools
+import json
+import re
+import threading
+from io import BytesIO, StringIO
+
+from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+from icebreaker import IceClient
+
+
+def genbank_text(part_id, sequence="ATGCATGCAAATTTGGGCCC"):
+    record = SeqRecord(Seq(sequence), id="part_%s" % part_id)
+    record.annotations["molecule_type"] = "DNA"
+    stringio = StringIO()
+    SeqIO.write(record, stringio, "genbank")
+    return stringio.getvalue()
+
+
+class StubIceClient(IceClient):
+    """IceClient whose ``request`` method reads and writes in-memory data.
+
+    Parameters
+    ----------
+
+    parts
+      Dict ``{part_id: part_infos}``.
+
+    folders
+      Dict ``{folder_id: [part_id, ...]}``.
+
+    samples, custom_fields
+      Dicts ``{part_id: [sample, ...]}`` and ``{part_id: [field, ...]}``.
+
+    locations
+      Dict ``{location_id: [sample, ...]}`` of the plates' samples.
+
+    failing
+      Dict ``{endpoint_regex: status_code}`` of requests which fail.
+    """
+
+    def __init__(
+        self,
+        parts=None,
+        folders=None,
+        failing=None,
+        samples=None,
+        custom_fields=None,
+        locations=None,
+        **kwargs
+    ):
+        self.parts = parts or {}
+        self.folders = folders or {}
+        self.samples = samples or {}
+        self.custom_fields = custom_fields or {}
+        self.locations = locations or {}
+        self.field_ids = itertools.count(1000)
+        self.failing = failing or {}
+        self.calls = []
+        self.calls_lock = threading.Lock()
+        kwargs.setdefault("logger", None)
+        IceClient.__init__(self, dict(root="http://stub"), **kwargs)
+
+    def calls_to(self, method, pattern):
+        """Return the calls with that method and an endpoint matching."""
+        return [
+            call
+            for call in self.calls
+            if call[0] == method and re.match(pattern, call[1])
+        ]
+
+    def request(
+        self,
+        method,
+        endpoint,
+        params=None,
+        data=None,
+        files=None,
+        response_type="json",
+        items_path="",
+        fields=None,
+    ):
+        with self.calls_lock:
+            self.calls.append((method, endpoint, params, data))
+        for pattern, status in self.failing.items():
+            if re.match(pattern, endpoint):
+                raise IOError("ICE request failed with code %s" % status)
+        result = self._answer(method, endpoint, params or {}, data)
+        if response_type == "json_items":
+            for key in items_path.split(".") if items_path else []:
+                result = result[key]
+            return iter(result)
+        return result
+
+    def _answer(self, method, endpoint, params, data):
+        if endpoint == "config/site":
+            return dict(version="5.0")
+        match = re.match(r"parts/(\d+)$", endpoint)
+        if match and method == "GET":
+            part_id = int(match.group(1))
+            if part_id not in self.parts:
+                raise IOError("ICE request failed with code 404")
+            return dict(self.parts[part_id])
+        if endpoint == "parts" and method == "POST":
+            part_id = max(list(self.parts) + [0]) + 1
+            self.parts[part_id] = dict(
+                id=part_id,
+                name=data["name"],
+                type=data["type"],
+                recordId="record_%s" % part_id,
+                modificationTime=part_id,
+            )
+            return dict(id=part_id, recordId="record_%s" % part_id)
+        match = re.match(r"file/(\d+)/sequence/genbank", endpoint)
+        if match:
+            return genbank_text(match.group(1)).encode()
+        match = re.match(r"folders/(\d+)/entries$", endpoint)
+        if match and method == "GET":
+            entries_ids = self.folders[int(match.group(1))]
+            offset = int(params.get("offset", 0))
+            limit = int(params.get("limit", 15))
+            entries = [
+                dict(self.parts[i]) for i in entries_ids[offset:][:limit]
+            ]
+            return dict(count=len(entries_ids), entries=entries)
+        links_pattern = r"parts/(\d+)/links(/\d+)?\?linkType=CHILD$"
+        match = re.match(links_pattern, endpoint)
+        if match:
+            parent_id = int(match.group(1))
+            if method == "POST":
+                child_id = data["id"]
+                self.parts[parent_id].setdefault("linkedParts", [])
+                self.parts[parent_id]["linkedParts"].append(dict(id=child_id))
+                return None
+            child_id = int(match.group(2)[1:])
+            self.parts[parent_id]["linkedParts"] = [
+                child
+                for child in self.parts[parent_id].get("linkedParts", [])
+                if child["id"] != child_id
+            ]
+            return None
+        if re.match(r"collections/\w+/entries$", endpoint):
+            offset = int(params.get("offset", 0))
+            limit = int(params.get("limit", 15))
+            entries = [self.parts[i] for i in sorted(self.parts)]
+            return dict(
+                resultCount=len(entries),
+                data=[dict(e) for e in entries[offset:][:limit]],
+            )
+        if endpoint == "samples/locations":
+            offset = int(params.get("offset", 0))
+            limit = int(params.get("limit", 15))
+            return [
+                dict(id=i, type="PLATE96", name="plate_%s" % i)
+                for i in sorted(self.locations)[offset:][:limit]
+            ]
+        match = re.match(r"samples/location/(\d+)$", endpoint)
+        if match:
+            return self.locations[int(match.group(1))]
+        match = re.match(r"folders/(\d+)$", endpoint)
+        if match and method == "GET":
+            folder_id = int(match.group(1))
+            return dict(
+                id=folder_id,
+                folderName="folder_%s" % folder_id,
+                type="PRIVATE",
+                count=len(self.folders[folder_id]),
+            )
+        if re.match(r"collections/\w+/folders$", endpoint):
+            return [
+                self._answer("GET", "folders/%s" % folder_id, {}, None)
+                for folder_id in sorted(self.folders)
+            ]
+        if endpoint == "folders/entries" and method == "PUT":
+            for folder in data["destination"]:
+                entries = self.folders.setdefault(folder["id"], [])
+                entries += [e for e in data["entries"] if e not in entries]
+            return None
+        if endpoint == "search" and method == "POST":
+            parameters = data["parameters"]
+            entries = sorted(
+                self.parts.values(),
+                key=lambda part: (part["modificationTime"], part["id"]),
+                reverse=not parameters.get("sortAscending", True),
+            )
+            start = parameters["start"]
+            entries = entries[start : start + parameters["retrieveCount"]]
+            return dict(
+                resultCount=len(self.parts),
+                results=[dict(entryInfo=e, score=1.0) for e in entries],
+            )
+        if endpoint == "folders" and method == "POST":
+            folder_id = max(list(self.folders) + [0]) + 1
+            self.folders[folder_id] = []
+            return self._answer("GET", "folders/%s" % folder_id, {}, None)
+        match = re.match(r"parts/(\d+)/samples$", endpoint)
+        if match:
+            samples = self.samples.setdefault(int(match.group(1)), [])
+            if method == "POST":
+                samples.append(dict(data, id=len(samples) + 1))
+                return dict(data=samples)
+            return samples
+        match = re.match(r"custom-fields\?partId=(\d+)$", endpoint)
+        if match:
+            return self.custom_fields.get(int(match.group(1)), [])
+        if endpoint == "custom-fields" and method == "POST":
+            fields = self.custom_fields.setdefault(data["partId"], [])
+            field = dict(id=next(self.field_ids), name=data["name"], value=data["value"])
+            fields.append(field)
+            return field
+        match = re.match(r"custom-fields/(\d+)$", endpoint)
+        if match and method == "DELETE":
+            field_id = int(match.group(1))
+            for fields in self.custom_fields.values():
+                fields[:] = [f for f in fields if f.get("id") != field_id]
+            return None
+        match = re.match(r"parts/(\d+)/sequence$", endpoint)
+        if match and method == "DELETE":
+            self.parts[int(match.group(1))]["hasSequence"] = False
+            return None
+        if endpoint == "file/sequence" and method == "POST":
+            part_id = int(data["entryRecordId"].split("_")[1])
+            self.parts[part_id]["hasSequence"] = True
+            return dict(id=part_id)
+        return None
+
+
+class StreamedResponse:
+    """Successful requests.Response, whose body can be streamed."""
+
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+        self.raw = BytesIO(content)
+
+    def close(self):
+        self.raw.close()
+
+
+class StubSession:
+    """HTTP session answering all requests with the same JSON content."""
+
+    def __init__(self, content):
+        self.content = content
+        self.headers = {}
+        self.closed = False
+
+    def request(self, method, url, headers=None, **kwargs):
+        return StreamedResponse(self.content)
+
+    def close(self):
+        self.closed = True
+
+
+class StreamingIceClient(IceClient):
+    """Client whose HTTP sessions answer with the same JSON content.
+
+    The sessions opened by the client and its copies are in ``sessions``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.sessions = []
+        IceClient.__init__(self, *args, **kwargs)
+
+    def _new_session(self):
+        content = dict(version="5.0", entries=[dict(id=i) for i in range(3)])
+        self.sessions.append(StubSession(json.dumps(content).encode()))
+        return self.sessions[-1]
+
+
+def iterate_with_nested_requests(ice, timeout=5):
+    """Iterate over streamed items, making a request for each item.
+
+    Return the items' IDs, or None if the iteration is stuck.
+    """
+    ids = []
+
+    def iterate():
+        entries = ice.request(
+            "GET",
+            "folders/1/entries",
+            response_type="json_items",
+            items_path="entries",
+        )
+        for entry in entries:
+            ice.request("GET", "parts/%s" % entry["id"])
+            ids.append(entry["id"])
+
+    thread = threading.Thread(target=iterate, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return None if thread.is_alive() else ids
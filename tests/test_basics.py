@@ -27,6 +27,19 @@ def test_folder_methods():
     ice = icebreaker.IceClient(os.path.join(conf_folder, 'john_doe_token.yml'))
     folders = ice.get_collection_folders('PERSONAL')
     assert (len(folders) == 1) and (folders[0]['folderName'] == 'test_folder')
+    assert ice.get_folder_id('test_folder') == folders[0]['id']
+    entries = list(ice.crawl_collection('PERSONAL', fields=['name']))
+    assert len(entries) == len(set(e['id'] for e in entries))
+    assert all(folders[0]['id'] in e['folders'] for e in entries)
+
+def test_client_pool():
+    config = os.path.join(conf_folder, 'john_doe_token.yml')
+    pool = icebreaker.IceClientPool(config, size=2)
+    with pool.client() as ice_1, pool.client() as ice_2:
+        assert ice_1 is not ice_2
+        folders = ice_2.get_collection_folders('PERSONAL')
+        assert folders == ice_1.get_collection_folders('PERSONAL')
+    assert pool.get_metrics()['pool']['clients'] == 2
 
 def test_file_attachments():
     ice = icebreaker.IceClient(os.path.join(conf_folder, 'john_doe_auth.yml'))
@@ -0,0 +1,95 @@
+import pandas
+from ice_stub import StubIceClient, genbank_text
+
+
+def test_register_parts_bulk():
+    ice = StubIceClient(folders={5: []})
+    parts = [
+        dict(name="p1", record_text=genbank_text(1)),
+        dict(name="p2", type="PLASMID", markers=["KanR"]),
+        dict(name="p3", record_text=genbank_text(3)),
+    ]
+    report = ice.register_parts_bulk(parts, folder_id=5, chunk_size=2)
+    assert report.error.isnull().all()
+    assert report.record_attached.tolist() == [True, False, True]
+    assert sorted(ice.folders[5]) == sorted(report.part_id.tolist())
+    assert len(ice.calls_to("PUT", "folders/entries")) == 2
+
+    # DataFrame rows without a record_format get NaN, which defaults to
+    # genbank, and failed uploads are reported for their row only.
+    ice = StubIceClient(folders={5: []}, failing={"file/sequence": 500})
+    parts = pandas.DataFrame(
+        [
+            dict(name="p1", record_text=genbank_text(1)),
+            dict(name="p2", record_format="genbank"),
+        ]
+    )
+    report = ice.register_parts_bulk(parts, folder_id=5)
+    assert "500" in report.error[0]
+    assert report.error.isnull().tolist() == [False, True]
+    assert report.added_to_folder.tolist() == [True, True]
+
+    ice = StubIceClient(folders={5: []})
+    report = ice.register_parts_bulk(parts, folder_id=5)
+    assert report.error.isnull().all()
+    assert report.record_attached.tolist() == [True, False]
+
+
+def test_iter_records_and_get_records():
+    ice = StubIceClient(failing={"file/3/": 404})
+    records = ice.get_records([1, 2, 3, 4], processes=2, chunk_size=1)
+    ids = [record and record.id for record in records]
+    assert ids == ["part_1", "part_2", None, "part_4"]
+    pairs = ice.iter_records(range(1, 6), processes=0, max_workers=2)
+    assert [(i, r is None) for (i, r) in pairs] == [
+        (1, False),
+        (2, False),
+        (3, True),
+        (4, False),
+        (5, False),
+    ]
+    pairs = ice.iter_records([1, 2, 4], processes=2, ordered=False)
+    assert sorted(i for (i, r) in pairs) == [1, 2, 4]
+
+
+def test_trash_parts_bulk():
+    parts = {i: dict(id=i, name="part_%s" % i) for i in (1, 2, 3, 5)}
+    parts[1]["linkedParts"] = [dict(id=2)]
+    parts[2]["parents"] = [dict(id=1)]
+    parts[3]["linkedParts"] = [dict(id=5)]
+    ice = StubIceClient(parts=parts, failing={r"parts/3/links": 500})
+    part_ids = ["1", "2", "3", "4"]
+
+    report = ice.trash_parts_bulk(part_ids, dry_run=True)
+    assert report.part_id.tolist() == part_ids
+    assert report.links.tolist() == [1, 1, 1, 0]
+    assert report.error.isnull().tolist() == [True, True, True, False]
+    assert ice.calls_to("DELETE", "parts") == []
+    assert ice.calls_to("POST", "parts/trash") == []
+
+    report = ice.trash_parts_bulk(part_ids)
+    assert report.trashed.tolist() == [True, True, False, False]
+    assert report.links_removed.tolist() == [1, 1, 0, 0]
+    assert report.error[2].startswith("Unlink")
+    assert report.error[3].startswith("Infos")
+    [(_, _, _, trashed)] = ice.calls_to("POST", "parts/trash")
+    assert [part["id"] for part in trashed] == [1, 2]
+
+
+def test_get_plates_and_location_samples_many():
+    locations = {i: [dict(id=10 * i, location=dict(id=i))] for i in range(7)}
+    ice = StubIceClient(locations=locations)
+    plates = ice.get_plates(batch_size=3)
+    assert [p["id"] for p in plates] == list(range(7))
+    offsets = [c[2]["offset"] for c in ice.calls_to("GET", "samples/locations$")]
+    assert offsets == [0, 3, 6]
+
+    plates = ice.get_plates(batch_size=2, limit=5, max_workers=3)
+    assert [p["id"] for p in plates] == list(range(5))
+    plates = ice.get_plates(as_iterator=True, batch_size=7, fields=["id"])
+    assert next(plates) == dict(id=0)
+
+    ice.calls = []
+    samples = ice.get_location_samples_many(range(7), max_workers=3)
+    assert samples == locations
+    assert len(ice.calls_to("GET", r"samples/location/\d+")) == 7
@@ -0,0 +1,60 @@
+import os
+from icebreaker.change_feed import ChangeFeed
+from ice_stub import StubIceClient
+
+
+class CollectionStub:
+    def __init__(self, entries):
+        self.entries = entries
+        self.requests = 0
+
+    def request(self, method, url, params=None):
+        self.requests += 1
+        entries = sorted(
+            self.entries.values(), key=lambda e: -e["modificationTime"]
+        )
+        offset, limit = params["offset"], params["limit"]
+        return dict(data=[dict(e) for e in entries[offset : offset + limit]])
+
+
+def test_change_feed(tmpdir):
+    entries = {
+        i: dict(id=i, creationTime=i, modificationTime=i)
+        for i in range(1, 101)
+    }
+    ice = CollectionStub(entries)
+    state_path = os.path.join(str(tmpdir), "feed.json")
+    feed = ChangeFeed(ice, state_path=state_path, batch_size=10)
+    assert list(feed.poll()) == []
+    assert feed.watermark == 100
+    entries[5]["modificationTime"] = 200
+    entries[101] = dict(id=101, creationTime=200, modificationTime=200)
+    ice.requests = 0
+    events = [(e["event"], e["entry_id"]) for e in feed.poll()]
+    assert events == [("modified", 5), ("created", 101)]
+    assert ice.requests == 1
+
+    # A new feed resumes from the saved watermark.
+    feed = ChangeFeed(ice, state_path=state_path, batch_size=10)
+    assert list(feed.poll()) == []
+    feed = ChangeFeed(ice, start="beginning", batch_size=10)
+    assert len(list(feed.poll())) == 101
+
+
+def test_change_feed_with_search():
+    parts = {
+        i: dict(id=i, creationTime=i, modificationTime=i)
+        for i in range(1, 31)
+    }
+    ice = StubIceClient(parts=parts)
+    feed = ChangeFeed(ice, query="", batch_size=10)
+    assert list(feed.poll()) == []
+    assert feed.watermark == 30
+    parts[5]["modificationTime"] = 40
+    parts[31] = dict(id=31, creationTime=41, modificationTime=41)
+    ice.calls = []
+    events = [(e["event"], e["entry_id"]) for e in feed.poll()]
+    assert events == [("modified", 5), ("created", 31)]
+    [(_, _, _, data)] = ice.calls_to("POST", "search")
+    assert data["parameters"]["sortAscending"] is False
+    assert data["parameters"]["sortField"] == "MODIFIED"
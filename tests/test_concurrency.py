@@ -0,0 +1,68 @@
+from icebreaker import IceClientPool
+from icebreaker.concurrency import AdaptiveConcurrencyLimiter
+from icebreaker.tools import iter_parallel
+from ice_stub import StreamingIceClient, iterate_with_nested_requests
+
+
+def run_requests(limiter, n_requests, latency, error=False):
+    for i in range(n_requests):
+        limiter.acquire()
+        limiter.release(latency=latency, error=error)
+
+
+def test_adaptive_concurrency_limiter():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=16)
+    run_requests(limiter, 200, latency=0.1)
+    assert limiter.get_metrics()["limit"] == 16
+
+    # Rising latencies make the limit decrease.
+    run_requests(limiter, 50, latency=1.0)
+    metrics = limiter.get_metrics()
+    assert metrics["limit"] < 16
+    assert metrics["decreases"] > 0
+
+
+def test_adaptive_concurrency_limiter_errors():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16, max_limit=16)
+    run_requests(limiter, 20, latency=None, error=True)
+    metrics = limiter.get_metrics()
+    assert metrics["limit"] == 11
+    assert metrics["errors"] == 20
+    assert metrics["in_flight"] == 0
+
+
+def test_no_concurrency_slot_held_while_iterating():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+    ice = StreamingIceClient(
+        dict(root="http://stub"), logger=None, concurrency_limiter=limiter
+    )
+    assert iterate_with_nested_requests(ice) == [0, 1, 2]
+    metrics = limiter.get_metrics()
+    assert (metrics["in_flight"], metrics["requests"]) == (0, 5)
+
+
+def test_http_sessions_are_pooled_and_closed():
+    ice = StreamingIceClient(dict(root="http://stub"), logger=None)
+    for i in range(5):
+        list(iter_parallel(ice.get_part_infos, range(20), max_workers=4))
+    assert 1 <= len(ice.sessions) <= 4
+    pool = IceClientPool(ice_client=ice, size=2)
+    with pool.client() as client_1, pool.client() as client_2:
+        assert client_1.get_part_infos(1) == client_2.get_part_infos(1)
+    assert not any(session.closed for session in ice.sessions)
+    pool.close()
+    assert all(session.closed for session in ice.sessions)
+
+
+def test_session_has_the_authentication_headers():
+    config = dict(root="http://stub", client="bot", token="abc")
+    ice = StreamingIceClient(config, logger=None)
+    session = ice.session
+    assert session.headers["X-ICE-API-Token"] == "abc"
+    session.headers["User-Agent"] = "script"
+    ice.set_api_token("bot", "def")
+    assert ice.session is session
+    assert session.headers["X-ICE-API-Token"] == "def"
+    assert session.headers["User-Agent"] == "script"
+    ice.close()
+    assert session.closed and (ice.session is not session)
@@ -0,0 +1,81 @@
+import pytest
+from icebreaker.folder_catalog import FolderCatalog, FolderMembershipIndex
+from ice_stub import StubIceClient
+
+
+class CollectionsStub:
+    def __init__(self):
+        self.requests = 0
+        self.collections = dict(
+            PERSONAL=[dict(id=1, folderName="PRIMERS", type="PRIVATE")],
+            SHARED=[
+                dict(id=2, folderName="BACKBONES", type="SHARED"),
+                dict(id=3, folderName="PRIMERS", type="SHARED"),
+            ],
+        )
+
+    def get_collection_folders(self, collection):
+        self.requests += 1
+        return [dict(folder) for folder in self.collections[collection]]
+
+    def get_folder_infos(self, folder_id):
+        self.requests += 1
+        folders = sum(self.collections.values(), [])
+        return [dict(f) for f in folders if f["id"] == folder_id][0]
+
+
+def test_folder_catalog():
+    stub = CollectionsStub()
+    catalog = FolderCatalog(stub, ttl=None)
+    assert catalog.get_folder_id("BACKBONES") == 2
+    assert catalog.get_folder_id("PRIMERS", collection="SHARED") == 3
+    assert catalog.get_folder_infos(1)["type"] == "PRIVATE"
+    with pytest.raises(IOError):
+        catalog.get_folder_id("PRIMERS")
+    assert stub.requests == 2
+    with pytest.raises(IOError):
+        catalog.get_folder_id("BACKBONE")  # Refreshes before raising.
+    assert stub.requests == 4
+    catalog.remove_folder(2)
+    assert [f["id"] for f in catalog.get_collection_folders("SHARED")] == [3]
+    catalog.invalidate()
+    assert catalog.get_folder_id("BACKBONES") == 2
+    assert stub.requests == 6
+
+
+def test_folder_catalog_refreshes_on_misses():
+    stub = CollectionsStub()
+    catalog = FolderCatalog(stub, ttl=None)
+    assert catalog.get_folder_id("BACKBONES") == 2
+    stub.collections["SHARED"].append(
+        dict(id=4, folderName="INSERTS", type="SHARED")
+    )
+    assert catalog.get_folder_id("INSERTS") == 4
+    assert catalog.get_folder_infos(1)["type"] == "PRIVATE"
+    stub.collections["PERSONAL"][0]["type"] = "SHARED"
+    assert catalog.get_folder_infos(1, refresh=True)["type"] == "SHARED"
+    assert catalog.get_folder_infos(1)["type"] == "SHARED"
+
+
+def test_folder_membership_index():
+    index = FolderMembershipIndex({1: [10, 11], 2: [11, 12]})
+    assert index.get_part_folders_ids(11) == [1, 2]
+    assert index.get_parts_folders_ids([10, 13]) == {10: [1], 13: []}
+    index.remove_entries(2, [11])
+    assert index.get_part_folders_ids(11) == [1]
+    assert index.get_folder_entries_ids(2) == [12]
+
+
+def test_crawl_collection():
+    parts = {i: dict(id=i, name="part_%s" % i) for i in range(1, 6)}
+    ice = StubIceClient(parts=parts, folders={1: [1, 2, 3], 2: [3, 4], 3: [5]})
+    entries = list(ice.crawl_collection("SHARED", batch_size=2))
+    assert sorted(e["id"] for e in entries) == [1, 2, 3, 4, 5]
+    assert not any("folders" in e for e in entries)
+    assert len(ice.calls_to("GET", r"folders/\d+/entries")) == 4
+    entries = list(
+        ice.crawl_collection("SHARED", memberships=True, batch_size=2)
+    )
+    assert [e["folders"] for e in entries if e["id"] == 3] == [[1, 2]]
+    entries = ice.crawl_collection("SHARED", ignored_folders="folder_3")
+    assert sorted(e["id"] for e in entries) == [1, 2, 3, 4]
@@ -0,0 +1,47 @@
+import pytest
+from icebreaker.link_graph import PartLinkGraph
+from ice_stub import StubIceClient
+
+def test_part_link_graph():
+    graph = PartLinkGraph.from_parts_infos([
+        dict(id=1, linkedParts=[dict(id=2)], parents=[]),
+        dict(id=2, linkedParts=[dict(id=3), dict(id=4)], parents=[dict(id=1)]),
+        dict(id=10, linkedParts=[dict(id=11)]),
+    ])
+    assert len(graph.edges) == 4
+    assert graph.get_children(2) == [3, 4]
+    assert graph.get_descendants(1) == set([2, 3, 4])
+    assert graph.get_ancestors(4) == set([1, 2])
+    assert graph.get_connected_component(3) == set([1, 2, 3, 4])
+    assert len(graph.get_connected_components()) == 2
+    assert sorted(graph.get_part_links(2)) == [(1, 2), (2, 3), (2, 4)]
+    graph = PartLinkGraph(graph.edges | set([(4, 10)]))
+    assert graph.get_descendants(1) == set([2, 3, 4, 10, 11])
+
+
+def test_part_link_graph_link_and_unlink():
+    ice = StubIceClient(
+        parts={i: dict(id=i) for i in range(1, 6)},
+        failing={r"parts/4/links/5": 500},
+    )
+    graph = PartLinkGraph()
+    report = graph.link(ice, [(1, 2), (2, 3), (4, 5)])
+    assert report.error.isnull().all()
+    assert graph.get_descendants(1) == set([2, 3])
+    assert graph.link(ice, [(1, 2)]).empty
+    assert graph.edges == PartLinkGraph.from_parts(ice, range(1, 6)).edges
+
+    report = graph.unlink(ice, [(2, 3), (4, 5)])
+    assert report.error.isnull().tolist() == [True, False]
+    assert "500" in report.error[1]
+    assert graph.edges == set([(1, 2), (4, 5)])
+    assert ice.parts[2]["linkedParts"] == []
+
+    graph.link(ice, [(1, 3)])
+    report = graph.unlink_all(ice, [1])
+    assert sorted(zip(report.parent_id, report.child_id)) == [(1, 2), (1, 3)]
+    assert graph.edges == set([(4, 5)])
+    assert ice.parts[1]["linkedParts"] == []
+    with pytest.raises(IOError):
+        ice.trash_parts([4], remove_parts_links=True)
+    assert not ice.calls_to("POST", "parts/trash")
@@ -0,0 +1,99 @@
+from icebreaker.migration import IceMigration, MigrationJournal
+from ice_stub import StubIceClient
+
+
+def test_migration_journal():
+    journal = MigrationJournal(":memory:")
+    journal.set_entry(12, 345)
+    journal.set_entry(13, None, status="error", error="Read error")
+    assert journal.get_entry(12) == 345
+    assert journal.get_entry(13) is None
+    assert journal.get_errors() == [(13, "Read error")]
+    journal.set_in_folder(1, [12])
+    assert journal.is_in_folder(1, 12) and not journal.is_in_folder(2, 12)
+
+
+def _sample(well, plate="plate_1"):
+    well_location = dict(type="WELL", display=well)
+    location = dict(type="PLATE96", display=plate, child=well_location)
+    return dict(id=well, location=location)
+
+
+def test_migration_resumes_partially_written_entries():
+    parts = {
+        i: dict(id=i, name="part_%s" % i, type="PART", hasSequence=True)
+        for i in (1, 2)
+    }
+    tube_sample = dict(id="tube", location=dict(type="TUBE", display="T1"))
+    source = StubIceClient(
+        parts=parts,
+        folders={1: [1, 2]},
+        samples={1: [_sample("A1"), tube_sample, _sample("B2")]},
+        custom_fields={1: [dict(name="Owner", value="Ann")]},
+    )
+    destination = StubIceClient(failing={"file/sequence": 500})
+    destination.session_infos = dict(id=1, email="ann@example.com")
+    journal = MigrationJournal(":memory:")
+    migration = IceMigration(
+        source, destination, journal, copy_samples=True, logger=None
+    )
+
+    # The records uploads fail: the entries are created, but not completed.
+    migration.migrate_collection()
+    assert sorted(destination.parts) == [1, 2]
+    fields = destination.custom_fields[1]
+    assert [(f["name"], f["value"]) for f in fields] == [("Owner", "Ann")]
+    assert journal.get_entry_state(1) == (1, "custom_fields")
+    assert journal.get_entry(1) is None
+    assert len(journal.get_errors()) == 2
+    assert destination.folders == {1: []}
+
+    # The resumed migration only completes the missing steps.
+    destination.failing = {}
+    report = migration.migrate_collection()
+    assert sorted(destination.parts) == [1, 2]
+    assert len(destination.custom_fields[1]) == 1
+    assert all(part["hasSequence"] for part in destination.parts.values())
+    assert [s["code"] for s in destination.samples[1]] == ["A01", "B02"]
+    assert destination.folders == {1: [1, 2]}
+    assert report["entries_migrated"] == 2
+    assert report["samples_copied"] == 2
+    assert report["samples_failed"] == 1
+    assert journal.get_entry(1) == 1
+    [(source_id, error)] = report["errors"]
+    assert (source_id == 1) and error.startswith("Sample tube")
+
+
+class FieldFailingStubIceClient(StubIceClient):
+    """Stub client failing to set the custom fields of a given name."""
+
+    failing_field = None
+
+    def set_part_custom_field(self, part_id, field_name, value):
+        if field_name == self.failing_field:
+            raise IOError("ICE request failed with code 500")
+        return StubIceClient.set_part_custom_field(
+            self, part_id, field_name, value
+        )
+
+
+def test_migration_resumes_partially_written_custom_fields():
+    fields = [dict(name=name, value="x") for name in "ABC"]
+    source = StubIceClient(
+        parts={1: dict(id=1, name="part_1", type="PART")},
+        folders={1: [1]},
+        custom_fields={1: fields},
+    )
+    destination = FieldFailingStubIceClient()
+    destination.failing_field = "B"
+    journal = MigrationJournal(":memory:")
+    migration = IceMigration(source, destination, journal, logger=None)
+    migration.migrate_collection()
+    assert journal.get_entry_state(1) == (1, "created")
+    assert [f["name"] for f in destination.custom_fields[1]] == ["A"]
+
+    destination.failing_field = None
+    migration.migrate_collection()
+    assert journal.get_entry(1) == 1
+    names = [f["name"] for f in destination.custom_fields[1]]
+    assert names == ["A", "B", "C"]
@@ -0,0 +1,83 @@
+import pytest
+
+from icebreaker import IceMirror, OfflineIceClient
+from ice_stub import StubIceClient
+
+
+def part(part_id, modification_time=1):
+    return dict(
+        id=part_id,
+        name="part_%s" % part_id,
+        type="PART",
+        modificationTime=modification_time,
+    )
+
+
+@pytest.fixture
+def ice():
+    return StubIceClient(
+        parts={i: part(i) for i in (1, 2, 3)},
+        folders={1: [1, 2], 2: [2, 3]},
+        custom_fields={1: [dict(name="Owner", value="Ann")]},
+    )
+
+
+def test_mirror_sync_and_offline_client(ice):
+    mirror = IceMirror(":memory:", ice, logger=None)
+    stats = mirror.sync()
+    assert (stats["entries"], stats["updated_entries"]) == (3, 3)
+    assert stats["errors"] == []
+    listings = ice.calls_to("GET", r"folders/\d+/entries")
+    assert all(call[2]["limit"] == 1000 for call in listings)
+
+    offline = OfflineIceClient(mirror)
+    assert offline.get_folder_id("folder_2") == 2
+    entries = offline.get_folder_entries(2)
+    assert [e["name"] for e in entries] == ["part_2", "part_3"]
+    assert offline.get_part_custom_fields_list(1)[0]["value"] == "Ann"
+    assert offline.get_sequence(3).startswith("LOCUS")
+    entry, error = offline.find_entry_by_name("part_1")
+    assert (entry["id"], error) == (1, None)
+
+    # Delta sync: one modified entry, one removed entry.
+    ice.parts[2].update(name="part_2_v2", modificationTime=2)
+    ice.folders[2] = [2]
+    stats = mirror.sync()
+    assert (stats["entries"], stats["updated_entries"]) == (2, 1)
+    assert stats["removed_entries"] == 1
+    assert offline.get_part_infos(2)["name"] == "part_2_v2"
+    with pytest.raises(IOError):
+        offline.get_part_infos(3)
+    assert offline.get_folder_entries(2) == [offline.get_part_infos(2)]
+
+
+def test_mirror_sync_retries_failed_entries(ice):
+    mirror = IceMirror(":memory:", ice, logger=None)
+    mirror.sync()
+    ice.parts[1].update(name="part_1_v2", modificationTime=2)
+    ice.parts[4] = part(4, modification_time=2)
+    ice.folders[1].append(4)
+    ice.failing = {r"parts/(1|4)$": 403}
+    stats = mirror.sync()
+    error = "ICE request failed with code 403"
+    assert sorted(stats["errors"]) == [(1, error), (4, error)]
+    assert stats["updated_entries"] == 0
+    assert mirror.get_entry_infos(1)["name"] == "part_1"
+    assert mirror.get_entry_infos(4) is None
+    assert mirror.get_folder_entries_ids(1) == [1, 2]
+
+    ice.failing = {}
+    stats = mirror.sync()
+    assert (stats["updated_entries"], stats["errors"]) == (2, [])
+    assert mirror.get_entry_infos(1)["name"] == "part_1_v2"
+    assert mirror.get_folder_entries_ids(1) == [1, 2, 4]
+
+
+def test_mirror_sync_rolls_back_on_fatal_errors(ice):
+    mirror = IceMirror(":memory:", ice, logger=None)
+    mirror.sync()
+    ice.failing = {r"folders/2/entries": 500}
+    with pytest.raises(IOError):
+        mirror.sync()
+    assert mirror.get_folder_entries_ids(2) == [2, 3]
+    assert len(mirror.get_folders()) == 2
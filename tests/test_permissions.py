@@ -0,0 +1,22 @@
+import pandas
+from icebreaker.permissions import (PermissionsMatrix, permission_to_row,
+                                    PERMISSIONS_COLUMNS)
+
+def test_permissions_matrix():
+    rows = [
+        permission_to_row(1, dict(id=11, type="READ_ENTRY", article="ACCOUNT",
+                                  articleId=5)),
+        permission_to_row(1, dict(id=12, type="WRITE_ENTRY",
+                                  group=dict(id=7, label="lab"))),
+        permission_to_row(2, dict(id=21, type="READ_ENTRY",
+                                  account=dict(id=5, email="a@b.c"))),
+    ]
+    matrix = PermissionsMatrix(pandas.DataFrame(rows,
+                                                columns=PERMISSIONS_COLUMNS))
+    assert matrix.to_matrix().values.tolist() == [[1, 2], [1, 0]]
+    grants, revokes = matrix.diff({1: {"GROUP:7": "read", "ACCOUNT:5": None},
+                                   2: {"ACCOUNT:5": "write"}})
+    assert sorted(grants) == [(1, "GROUP:7", "read"),
+                              (2, "ACCOUNT:5", "write")]
+    assert sorted(revokes) == [(1, 11, "ACCOUNT:5"), (1, 12, "GROUP:7")]
+    assert matrix.restrict_to(["ACCOUNT:5"]) == [(1, 12, "GROUP:7")]
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import threading
+from icebreaker import rate_limiting
+from icebreaker.rate_limiting import (
+    RateLimiter,
+    FileTokenBucket,
+    endpoint_class,
+)
+from icebreaker.tools import iter_parallel
+
+
+def test_endpoint_class():
+    assert endpoint_class("search") == "search"
+    assert endpoint_class("parts/12/links") == "parts"
+    assert endpoint_class("file/12/sequence/genbank") == "files"
+    assert endpoint_class("folders/3") == "other"
+
+
+class FakeClock:
+    """Replacement of the time module where sleeping advances the time."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.lock = threading.Lock()
+
+    def time(self):
+        with self.lock:
+            return self.now
+
+    def sleep(self, duration):
+        # Like a real clock, at least a microsecond passes while sleeping.
+        with self.lock:
+            self.now += max(duration, 1e-6)
+
+
+def test_rate_limiter_threads(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiting, "time", clock)
+    classes_rates = dict(search=(20, 1))
+    limiter = RateLimiter(rate=100, burst=5, classes_rates=classes_rates)
+    list(
+        iter_parallel(
+            lambda i: limiter.acquire("GET", "parts/%d" % i),
+            range(25),
+            max_workers=4,
+        )
+    )
+    # 5 requests use the burst, the 20 others wait for new tokens.
+    elapsed = clock.now - 1000
+    assert elapsed >= 20 / 100.0 - 1e-6
+    metrics = limiter.get_metrics()
+    assert metrics["parts"]["requests"] == 25
+    assert abs(metrics["parts"]["wait_time"] - elapsed) < 1e-3
+    for i in range(3):
+        limiter.acquire("POST", "search")
+    metrics = limiter.get_metrics()
+    assert metrics["search"]["requests"] == 3
+    assert abs(metrics["search"]["wait_time"] - 2 / 20.0) < 1e-5
+
+
+def test_shared_memory_limiter_in_processes():
+    context = multiprocessing.get_context("spawn")
+    limiter = RateLimiter(
+        rate=0.01, burst=3, backend="shared_memory", mp_context=context
+    )
+    for i in range(2):
+        process = context.Process(
+            target=limiter.acquire, args=("GET", "parts/%d" % i)
+        )
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+    bucket = limiter.buckets["all"]
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() > 0
+
+
+def test_file_token_bucket(tmpdir):
+    path = os.path.join(str(tmpdir), "bucket.json")
+    bucket_1 = FileTokenBucket(path, rate=1, burst=2)
+    bucket_2 = FileTokenBucket(path, rate=1, burst=2)
+    assert bucket_1.try_acquire() == 0
+    assert bucket_2.try_acquire() == 0
+    assert bucket_1.try_acquire() > 0.5
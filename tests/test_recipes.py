@@ -0,0 +1,68 @@
+import os
+import zipfile
+from icebreaker.recipes import (
+    download_folder_data,
+    download_collection_data,
+    _download_entries_data,
+)
+from ice_stub import StubIceClient
+
+
+def _stub_ice_client():
+    parts = {
+        i: dict(id=i, name="part_%s" % i, basePairCount=20, hasSample=False)
+        for i in range(1, 6)
+    }
+    return StubIceClient(parts=parts, folders={1: [1, 2, 3], 2: [3, 4, 5]})
+
+
+def test_download_folder_data(tmpdir):
+    ice = _stub_ice_client()
+    spreadsheet = os.path.join(str(tmpdir), "folder.csv")
+    genbanks_dir = os.path.join(str(tmpdir), "genbanks")
+    download_folder_data(
+        ice,
+        folder_name="folder_1",
+        spreadsheet_file=spreadsheet,
+        genbanks_dir=genbanks_dir,
+        logger=None,
+        batch_size=2,
+    )
+    with open(spreadsheet, "r") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 4
+    assert lines[1].startswith("part_1,,20,")
+    filenames = ["part_1.gb", "part_2.gb", "part_3.gb"]
+    assert sorted(os.listdir(genbanks_dir)) == filenames
+
+    # Unchanged records are not re-written.
+    filepath = os.path.join(genbanks_dir, "part_1.gb")
+    os.utime(filepath, (0, 0))
+    download_folder_data(ice, 1, genbanks_dir=genbanks_dir, logger=None)
+    assert os.path.getmtime(filepath) == 0
+
+
+def test_download_collection_data(tmpdir):
+    ice = _stub_ice_client()
+    genbanks_zip = os.path.join(str(tmpdir), "genbanks.zip")
+    download_collection_data(ice, genbanks_dir=genbanks_zip, logger=None)
+    with zipfile.ZipFile(genbanks_zip) as f:
+        names = sorted(f.namelist())
+    assert names == ["part_%s.gb" % i for i in range(1, 6)]
+    assert not ice.calls_to("GET", r"parts/\d+$")
+
+
+def test_download_entries_data_without_outputs():
+    ice = _stub_ice_client()
+    ice.calls = []
+    entries = [dict(id=1, name="part_1"), dict(id=2, name="part_2")]
+    _download_entries_data(
+        ice,
+        iter(entries),
+        columns="default",
+        spreadsheet_file=None,
+        genbanks_dir=None,
+        logger=ice.logger,
+        batch_size=10,
+    )
+    assert ice.calls == []
@@ -0,0 +1,70 @@
+import os
+from icebreaker.record_hashes import (
+    record_content_hash,
+    write_if_changed,
+    LocalRecordHashStore,
+    CustomFieldRecordHashStore,
+)
+from ice_stub import StubIceClient, genbank_text
+
+
+def test_sync_records():
+    parts = {
+        i: dict(id=i, recordId="record_%s" % i, hasSequence=(i < 3))
+        for i in (1, 2, 3)
+    }
+    hashes = LocalRecordHashStore(":memory:")
+    hashes.set(1, record_content_hash(record_text=genbank_text(1)))
+    hashes.set(2, record_content_hash(record_text=genbank_text(2)))
+    ice = StubIceClient(parts=parts, record_hashes=hashes)
+    new_text = genbank_text(2, sequence="ATGCCCCCCCCC")
+    records = {1: genbank_text(1), 2: new_text, 3: genbank_text(3)}
+    report = ice.sync_records(records, max_workers=2)
+    assert report.error.isnull().all()
+    assert report.uploaded.tolist() == [False, True, True]
+
+    # The changed record replaces the previous one, the new one is added.
+    assert [c[1] for c in ice.calls_to("DELETE", ".")] == ["parts/2/sequence"]
+    assert len(ice.calls_to("POST", "file/sequence")) == 2
+    assert all(part["hasSequence"] for part in parts.values())
+    assert hashes.get(2) == record_content_hash(record_text=new_text)
+    assert hashes.get(3) == record_content_hash(record_text=genbank_text(3))
+
+    report = ice.sync_records(records)
+    assert not report.uploaded.any()
+
+
+def test_local_record_hash_store(tmpdir):
+    path = os.path.join(str(tmpdir), "hashes.sqlite")
+    store = LocalRecordHashStore(path)
+    store.set(12, "abc")
+    store.set("13", "def")
+    store.set(12, "ghi")
+    store = LocalRecordHashStore(path)
+    assert (store.get("12"), store.get(13)) == ("ghi", "def")
+    store.delete(12)
+    assert store.get(12) is None
+
+
+def test_custom_field_record_hash_store():
+    ice = StubIceClient(custom_fields={1: [dict(id=1, name="x", value="y")]})
+    store = CustomFieldRecordHashStore(ice, field_name="hash")
+    assert store.get(1) is None
+    store.set(1, "abc")
+    store.set(1, "def")
+    assert store.get(1) == "def"
+    assert [f["name"] for f in ice.custom_fields[1]] == ["x", "hash"]
+    store.delete(1)
+    assert store.get(1) is None
+    assert [f["name"] for f in ice.custom_fields[1]] == ["x"]
+
+
+def test_write_if_changed(tmpdir):
+    path = os.path.join(str(tmpdir), "record.gb")
+    assert write_if_changed(path, "ATGC")
+    modification_time = os.path.getmtime(path)
+    assert not write_if_changed(path, "ATGC")
+    assert os.path.getmtime(path) == modification_time
+    assert write_if_changed(path, "ATGCA")
+    with open(path, "r") as f:
+        assert f.read() == "ATGCA"
@@ -0,0 +1,74 @@
+import threading
+
+from icebreaker.scheduling import (
+    RequestScheduler,
+    request_class,
+    get_request_class,
+)
+from icebreaker.tools import iter_parallel
+from ice_stub import StreamingIceClient, iterate_with_nested_requests
+
+
+def test_request_class_in_parallel_calls():
+    def get_class(i):
+        return get_request_class("interactive")
+
+    assert set(iter_parallel(get_class, range(4))) == set(["bulk"])
+    with request_class("exports"):
+        assert set(iter_parallel(get_class, range(4))) == set(["exports"])
+    assert get_request_class("interactive") == "interactive"
+
+
+class SignalingCondition(threading.Condition):
+    """Condition releasing the ``waiting`` semaphore at each wait."""
+
+    def __init__(self):
+        threading.Condition.__init__(self)
+        self.waiting = threading.Semaphore(0)
+
+    def wait(self, timeout=None):
+        self.waiting.release()
+        return threading.Condition.wait(self, timeout)
+
+
+def test_request_scheduler_priorities():
+    scheduler = RequestScheduler(max_concurrent=2)
+    scheduler.condition = condition = SignalingCondition()
+    assert scheduler.acquire("bulk") == "bulk"
+    assert scheduler.acquire() == "interactive"
+    order = []
+
+    def request(class_name):
+        scheduler.acquire(class_name)
+        order.append(class_name)
+        scheduler.release(class_name)
+
+    threads = [
+        threading.Thread(target=request, args=(name,))
+        for name in ["bulk", "bulk", "interactive"]
+    ]
+    for thread in threads:
+        thread.start()
+        # Wait until the thread's request is queued.
+        assert condition.waiting.acquire(timeout=5)
+    assert scheduler.get_metrics()["bulk"]["queue_depth"] == 2
+    scheduler.release("interactive")
+    threads[2].join()
+    scheduler.release("bulk")
+    for thread in threads:
+        thread.join()
+    assert order == ["interactive", "bulk", "bulk"]
+    metrics = scheduler.get_metrics()
+    assert metrics["bulk"]["requests"] == 3
+    assert metrics["bulk"]["max_queue_depth"] == 2
+    assert metrics["interactive"]["in_flight"] == 0
+
+
+def test_no_scheduler_slot_held_while_iterating():
+    scheduler = RequestScheduler(max_concurrent=1)
+    ice = StreamingIceClient(
+        dict(root="http://stub"), logger=None, scheduler=scheduler
+    )
+    assert iterate_with_nested_requests(ice) == [0, 1, 2]
+    metrics = scheduler.get_metrics()["interactive"]
+    assert (metrics["in_flight"], metrics["requests"]) == (0, 5)
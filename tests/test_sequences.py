@@ -0,0 +1,70 @@
+import os
+import random
+from Bio import SeqIO
+from icebreaker.sequence_store import (SequenceStore, SequenceStoreWriter,
+                                       write_sequence_store)
+from icebreaker.kmer_index import KmerIndex
+from icebreaker.duplicates import (sequence_identity_hash,
+                                   find_duplicate_parts)
+
+RECORD_PATH = os.path.join("tests", "data", "example_record.gb")
+
+def test_sequence_store(tmpdir):
+    path = os.path.join(str(tmpdir), "store")
+    with open(RECORD_PATH, "r") as f:
+        genbank = f.read()
+    write_sequence_store(path, genbanks=[(12, genbank), (13, None)],
+                         logger=None)
+    with SequenceStoreWriter(path + "_2") as writer:
+        writer.add(1, "atgc", circular=True)
+        writer.add(2, "")
+    record = SeqIO.read(RECORD_PATH, "genbank")
+    with SequenceStore(path) as store:
+        assert store.parts_ids == [12]
+        assert store.get_sequence(12) == str(record.seq).upper()
+        assert bytes(store.get_array(12)[:5]) == bytes(store[12][:5])
+    with SequenceStore(path + "_2.seq") as store:
+        assert store.get_sequence(1) == "ATGC" and store.is_circular(1)
+        assert len(store.get_array(2)) == 0
+        assert 3 not in store
+
+def test_sequence_store_close_with_live_slices(tmpdir):
+    path = os.path.join(str(tmpdir), "store")
+    with SequenceStoreWriter(path) as writer:
+        writer.add(1, "AAATTTGGGCCCACGTTT")
+    with SequenceStore(path) as store:
+        bases, array = store[1], store.get_array(1)
+        index = KmerIndex.from_sequence_store(store, k=5)
+    assert bytes(bases[:6]) == bytes(array[:6]) == b"AAATTT"
+    assert index.find_parts("GGGCCCAC") == [1]
+
+def test_kmer_index():
+    index = KmerIndex(k=5)
+    index.add(1, "AAATTTGGGCCCACGTTT", circular=True)
+    index.add(2, "GGGCCCACGTNNAAATTTG")
+    assert index.find("CGTTTAAATT") == [
+        dict(part_id=1, position=13, strand=1)]
+    assert index.find_parts("GGGCCCAC") == [1, 2]
+    assert index.find("AATTTAAACG")[0]["strand"] == -1
+    index.remove(1)
+    assert index.find_parts("GGGCCCAC") == [2]
+
+def test_find_duplicate_parts(tmpdir):
+    path = os.path.join(str(tmpdir), "store")
+    sequence = "".join(random.Random(0).choice("ATGC") for _ in range(1000))
+    rotated_reverse = sequence[100:] + sequence[:100]
+    rotated_reverse = rotated_reverse[::-1].translate(
+        str.maketrans("ATGC", "TACG"))
+    assert sequence_identity_hash(sequence, circular=True) == \
+        sequence_identity_hash(rotated_reverse, circular=True)
+    with SequenceStoreWriter(path) as writer:
+        writer.add(1, sequence, circular=True)
+        writer.add(2, rotated_reverse, circular=True)
+        writer.add(3, sequence, circular=False)
+        writer.add(4, sequence[:500] + "N" + sequence[501:], circular=True)
+    with SequenceStore(path) as store:
+        duplicates = find_duplicate_parts(
+            sequence_store=store, near_duplicates_threshold=0.8, logger=None)
+    duplicates = duplicates[duplicates.duplicate_of == 1]
+    assert list(duplicates.part_id) == [2, 3, 4]
+    assert list(duplicates.kind) == ["identical"] + 2 * ["near-identical"]
@@ -0,0 +1,59 @@
+import os
+import pytest
+from icebreaker.tables import write_entries_table, entry_to_row, format_entries
+from icebreaker.features import write_features_table, read_features_table
+
+ENTRIES = [
+    dict(id=i, name="part_%d" % i, basePairCount=str(100 + i),
+         selectionMarkers=["KanR"], hasSample=False)
+    for i in range(25)
+]
+
+def test_entry_to_row():
+    row = entry_to_row(ENTRIES[3], ["id", "basePairCount", "selectionMarkers",
+                                    "alias", "owner"])
+    assert row == [3, 103, ["KanR"], None, None]
+
+def test_write_entries_table_csv(tmpdir):
+    target = os.path.join(str(tmpdir), "entries.csv")
+    n_rows = write_entries_table(iter(ENTRIES), target, batch_size=10)
+    assert n_rows == 25
+    with open(target, "r") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 26
+    assert lines[1].startswith("part_0,")
+
+def test_write_entries_table_parquet(tmpdir):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    target = os.path.join(str(tmpdir), "entries.parquet")
+    write_entries_table(iter(ENTRIES), target, batch_size=10,
+                        columns=["id", "name", "basePairCount"])
+    table = parquet.read_table(target)
+    assert table.num_rows == 25
+    assert table.column("basePairCount").to_pylist()[-1] == 124
+
+def test_format_entries():
+    entries = [dict(id=1, name="a", owner=dict(email="x@y.org")),
+               dict(id=2, name="b", owner=dict(email="z@y.org"), alias="B")]
+    records = list(format_entries(iter(entries), output="records",
+                                  fields=["id", "owner.email"]))
+    assert records[1].owner_email == "z@y.org"
+    assert not hasattr(records[1], "name")
+    df = format_entries(iter(entries), output="dataframe")
+    assert list(df.columns) == ["id", "name", "owner", "alias"]
+    assert df["alias"].tolist()[1] == "B"
+
+def test_write_features_table(tmpdir):
+    pytest.importorskip("pyarrow")
+    with open(os.path.join("tests", "data", "example_record.gb")) as f:
+        genbank = f.read()
+    target = os.path.join(str(tmpdir), "features.parquet")
+    rows_written = write_features_table(
+        target, genbanks=[(i, genbank) for i in range(30)], processes=2,
+        chunk_size=4, logger=None)
+    features = read_features_table(target)
+    assert len(features) == rows_written
+    assert list(features.part_id.unique()) == list(range(30))
+    assert features.start.dtype == features.strand.dtype == "int64"
+    label = features.label.dropna().iloc[0]
+    assert (read_features_table(target, label=label).label == label).all()
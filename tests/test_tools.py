@@ -1,4 +1,11 @@
-from icebreaker.tools import sanitize_well_name
+import os
+from io import BytesIO, StringIO
+from Bio import SeqIO
+from icebreaker.tools import (sanitize_well_name, iter_json_items,
+                              iter_parallel, iter_parallel_processes,
+                              load_record)
+from icebreaker.pagination import PaginationCursor, PaginatedIterator
+from icebreaker.record_hashes import record_content_hash
 
 def test_sanitize_wellname():
     assert sanitize_well_name("A1") == "A01"
@@ -6,3 +13,36 @@ def test_sanitize_wellname():
     assert sanitize_well_name("AH1") == "AH01"
     assert sanitize_well_name("AH11") == "AH11"
     
+
+def test_iter_json_items():
+    text = b'{"count": 2, "entries": [{"id": 1, "name": "a"}, {"id": 2}]}'
+    items = list(iter_json_items(BytesIO(text), "entries", fields=["id"]))
+    assert items == [{"id": 1}, {"id": 2}]
+    assert list(iter_json_items(b"[1, 2, 3]")) == [1, 2, 3]
+
+def test_iter_parallel():
+    results = iter_parallel(lambda x: x ** 2, range(100), max_workers=4)
+    assert list(results) == [x ** 2 for x in range(100)]
+    results = iter_parallel(lambda x: x, range(20), ordered=False)
+    assert sorted(results) == list(range(20))
+    results = iter_parallel_processes(abs, range(-50, 0), processes=2,
+                                      chunk_size=7)
+    assert list(results) == list(range(50, 0, -1))
+
+def test_pagination_cursor():
+    cursor = PaginationCursor("search", dict(query="GFP"), batch_size=10)
+    iterator = PaginatedIterator(iter(range(30)), cursor)
+    assert [next(iterator) for i in range(12)][-1] == 11
+    cursor = PaginationCursor.from_json(iterator.cursor.to_json())
+    assert (cursor.offset, cursor.parameters) == (12, dict(query="GFP"))
+
+def test_record_content_hash():
+    record = load_record(os.path.join("tests", "data", "example_record.gb"))
+    stringio = StringIO()
+    SeqIO.write(record, stringio, "genbank")
+    record_text = stringio.getvalue().replace(record.name, "renamed")
+    assert record_content_hash(record=record) == record_content_hash(
+        record_text=record_text)
+    record.seq = record.seq[1:] + record.seq[:1]
+    assert record_content_hash(record=record) != record_content_hash(
+        record_text=record_text)